@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterator
+from typing import Any, Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING: Any = object()
+
+
+class TTLCache(Generic[K, V]):
+    """
+    프로세스 메모리 LRU + TTL 캐시(스레드 안전).
+    - max_size를 넘으면 가장 오래 쓰지 않은 항목부터 버린다. max_size <= 0이면 아무것도 저장하지 않는다.
+    - ttl_seconds가 지난 항목은 조회 시 만료 처리한다. ttl_seconds <= 0이면 만료 없음.
+    """
+
+    def __init__(self, *, max_size: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self._max_size = max_size
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._items: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._stats: dict[str, int] = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "expirations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_size > 0
+
+    def get(self, key: K, default: Any = None) -> V | Any:
+        with self._lock:
+            value = self._get_locked(key)
+            if value is _MISSING:
+                self._stats["misses"] += 1
+                return default
+            self._stats["hits"] += 1
+            return value
+
+    def set(self, key: K, value: V, *, ttl_seconds: float | None = None) -> None:
+        if not self.enabled:
+            return
+        ttl = self._ttl if ttl_seconds is None else ttl_seconds
+        expires_at = self._clock() + ttl if ttl > 0 else float("inf")
+        with self._lock:
+            self._items[key] = (expires_at, value)
+            self._items.move_to_end(key)
+            self._stats["sets"] += 1
+            while len(self._items) > self._max_size:
+                self._items.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def pop(self, key: K, default: Any = None) -> V | Any:
+        with self._lock:
+            item = self._items.pop(key, None)
+        return default if item is None else item[1]
+
+    def pop_where(self, predicate: Callable[[K], bool]) -> int:
+        with self._lock:
+            keys = [k for k in self._items if predicate(k)]
+            for k in keys:
+                del self._items[k]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def items(self) -> Iterator[tuple[K, V]]:
+        """만료되지 않은 항목의 스냅샷(LRU 순서는 바꾸지 않는다)."""
+        now = self._clock()
+        with self._lock:
+            snapshot = [(k, v) for k, (exp, v) in self._items.items() if exp > now]
+        return iter(snapshot)
+
+    def touch(self, key: K) -> None:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            out: dict[str, Any] = dict(self._stats)
+            out.update({"size": len(self._items), "max_size": self._max_size, "ttl_seconds": self._ttl})
+        return out
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return self._get_locked(key) is not _MISSING  # type: ignore[arg-type]
+
+    def _get_locked(self, key: K) -> V | Any:
+        item = self._items.get(key)
+        if item is None:
+            return _MISSING
+        expires_at, value = item
+        if expires_at <= self._clock():
+            del self._items[key]
+            self._stats["expirations"] += 1
+            return _MISSING
+        self._items.move_to_end(key)
+        return value
@@ -21,6 +21,23 @@ def _get_env_int(name: str, default: int) -> int:
         return default
 
 
+def _get_env_float(name: str, default: float) -> float:
+    raw = _get_env(name)
+    if raw is None:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
+def _get_env_bool(name: str, default: bool) -> bool:
+    raw = _get_env(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "y", "on")
+
+
 def _get_env_list(name: str, default: list[str]) -> list[str]:
     raw = _get_env(name)
     if raw is None:
@@ -40,12 +57,61 @@ class Settings:
     mysql_user: str
     mysql_password: str
     mysql_db: str
+    mysql_pool_size: int
+    mysql_pool_max_overflow: int
+    mysql_pool_timeout: int
+    mysql_pool_recycle: int
+    mysql_pool_ping_interval: int
 
     jwt_secret: str
     jwt_expires_minutes: int
 
+    auth_cache_size: int
+    auth_cache_ttl_seconds: int
+    auth_cache_negative_ttl_seconds: int
+    auth_trust_token_claims: bool
+
     cors_origins: list[str]
 
+    ai_reply_concurrency: int
+    ai_reply_debounce_ms: int
+    ai_reply_stream: bool
+    ai_pre_decision: bool
+    ai_tool_max_rounds: int
+
+    settings_cache_poll_seconds: int
+
+    decision_cache_size: int
+    decision_cache_ttl_seconds: int
+    decision_cache_max_turns: int
+    decision_cache_similarity: float
+
+    hot_session_cache_size: int
+    hot_session_idle_seconds: int
+    hot_session_max_messages: int
+
+    summary_job_concurrency: int
+    summary_job_max_attempts: int
+
+    summary_cache_size: int
+    summary_cache_ttl_seconds: int
+    summary_cache_stale_seconds: int
+
+    context_recent_messages: int
+    context_max_tokens: int
+    context_fold_batch: int
+    context_fold_concurrency: int
+
+    ws_send_queue_size: int
+    ws_slow_consumer_policy: str
+    ws_send_timeout_seconds: float
+    ws_replay_buffer_size: int
+    ws_resume_ttl_seconds: float
+    ws_bus: str
+    ws_bus_unix_dir: str
+    ws_bus_redis_url: str
+    ws_bus_channel: str
+
 
 def load_settings() -> Settings:
     return Settings(
@@ -57,8 +123,48 @@ def load_settings() -> Settings:
         mysql_user=_get_env("MYSQL_USER", "root") or "root",
         mysql_password=_get_env("MYSQL_PASSWORD", "") or "",
         mysql_db=_get_env("MYSQL_DB", "ai3pjt") or "ai3pjt",
+        mysql_pool_size=_get_env_int("MYSQL_POOL_SIZE", 10),
+        mysql_pool_max_overflow=_get_env_int("MYSQL_POOL_MAX_OVERFLOW", 5),
+        mysql_pool_timeout=_get_env_int("MYSQL_POOL_TIMEOUT", 10),
+        mysql_pool_recycle=_get_env_int("MYSQL_POOL_RECYCLE", 1800),
+        mysql_pool_ping_interval=_get_env_int("MYSQL_POOL_PING_INTERVAL", 30),
         jwt_secret=_get_env("JWT_SECRET", "change-me") or "change-me",
         jwt_expires_minutes=_get_env_int("JWT_EXPIRES_MINUTES", 60 * 24 * 7),
+        auth_cache_size=_get_env_int("AUTH_CACHE_SIZE", 10000),
+        auth_cache_ttl_seconds=_get_env_int("AUTH_CACHE_TTL_SECONDS", 60),
+        auth_cache_negative_ttl_seconds=_get_env_int("AUTH_CACHE_NEGATIVE_TTL_SECONDS", 10),
+        auth_trust_token_claims=_get_env_bool("AUTH_TRUST_TOKEN_CLAIMS", False),
         cors_origins=_get_env_list("CORS_ORIGINS", ["http://localhost:3000"]),
+        ai_reply_concurrency=_get_env_int("AI_REPLY_CONCURRENCY", 8),
+        ai_reply_debounce_ms=_get_env_int("AI_REPLY_DEBOUNCE_MS", 300),
+        ai_reply_stream=_get_env_bool("AI_REPLY_STREAM", True),
+        ai_pre_decision=_get_env_bool("AI_PRE_DECISION", True),
+        ai_tool_max_rounds=_get_env_int("AI_TOOL_MAX_ROUNDS", 3),
+        settings_cache_poll_seconds=_get_env_int("SETTINGS_CACHE_POLL_SECONDS", 5),
+        decision_cache_size=_get_env_int("DECISION_CACHE_SIZE", 1000),
+        decision_cache_ttl_seconds=_get_env_int("DECISION_CACHE_TTL_SECONDS", 3600),
+        decision_cache_max_turns=_get_env_int("DECISION_CACHE_MAX_TURNS", 1),
+        decision_cache_similarity=_get_env_float("DECISION_CACHE_SIMILARITY", 0.0),
+        hot_session_cache_size=_get_env_int("HOT_SESSION_CACHE_SIZE", 2000),
+        hot_session_idle_seconds=_get_env_int("HOT_SESSION_IDLE_SECONDS", 900),
+        hot_session_max_messages=_get_env_int("HOT_SESSION_MAX_MESSAGES", 1000),
+        summary_job_concurrency=_get_env_int("SUMMARY_JOB_CONCURRENCY", 4),
+        summary_job_max_attempts=_get_env_int("SUMMARY_JOB_MAX_ATTEMPTS", 3),
+        summary_cache_size=_get_env_int("SUMMARY_CACHE_SIZE", 500),
+        summary_cache_ttl_seconds=_get_env_int("SUMMARY_CACHE_TTL_SECONDS", 3600),
+        summary_cache_stale_seconds=_get_env_int("SUMMARY_CACHE_STALE_SECONDS", 300),
+        context_recent_messages=_get_env_int("CONTEXT_RECENT_MESSAGES", 12),
+        context_max_tokens=_get_env_int("CONTEXT_MAX_TOKENS", 3000),
+        context_fold_batch=_get_env_int("CONTEXT_FOLD_BATCH", 8),
+        context_fold_concurrency=_get_env_int("CONTEXT_FOLD_CONCURRENCY", 2),
+        ws_send_queue_size=_get_env_int("WS_SEND_QUEUE_SIZE", 256),
+        ws_slow_consumer_policy=(_get_env("WS_SLOW_CONSUMER_POLICY", "drop_oldest") or "drop_oldest").strip().lower(),
+        ws_send_timeout_seconds=_get_env_float("WS_SEND_TIMEOUT_SECONDS", 10.0),
+        ws_replay_buffer_size=_get_env_int("WS_REPLAY_BUFFER_SIZE", 500),
+        ws_resume_ttl_seconds=_get_env_float("WS_RESUME_TTL_SECONDS", 120.0),
+        ws_bus=(_get_env("WS_BUS", "inprocess") or "inprocess").strip().lower(),
+        ws_bus_unix_dir=_get_env("WS_BUS_UNIX_DIR", "/tmp/ai3pjt-ws-bus") or "/tmp/ai3pjt-ws-bus",
+        ws_bus_redis_url=_get_env("WS_BUS_REDIS_URL", "redis://127.0.0.1:6379/0") or "redis://127.0.0.1:6379/0",
+        ws_bus_channel=_get_env("WS_BUS_CHANNEL", "ai3pjt:ws") or "ai3pjt:ws",
     )
 
@@ -2,7 +2,11 @@ from __future__ import annotations
 
 import contextlib
 import json
-from collections.abc import Generator
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Generator
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
 
@@ -15,7 +19,30 @@ from .config import load_settings
 def utc_now() -> datetime:
     # MySQL TIMESTAMP는 일반적으로 naive datetime(서버 TZ 기준)로 다루므로
     # 로컬 개발에서는 UTC 기준 naive datetime을 사용합니다.
-    return datetime.utcnow()
+    # 컬럼이 초 단위(TIMESTAMP)이므로 마이크로초를 버려, 저장한 값과 메모리에 들고 있는 값이 같게 합니다.
+    return datetime.utcnow().replace(microsecond=0)
+
+
+# 실행한 쿼리 수(프로세스 전체, 커넥션별). 요청/작업 하나가 DB를 몇 번 왕복하는지 확인하는 용도.
+_query_count = 0
+_query_count_lock = threading.Lock()
+
+
+class _CountingCursor(DictCursor):
+    def execute(self, query: str, args: Any = None) -> int:
+        global _query_count
+        with _query_count_lock:
+            _query_count += 1
+        conn = self.connection
+        conn.query_count = getattr(conn, "query_count", 0) + 1
+        return super().execute(query, args)
+
+
+def query_count(conn: pymysql.Connection | None = None) -> int:
+    """conn이 있으면 그 커넥션이 지금까지 실행한 쿼리 수, 없으면 프로세스 전체 누적치."""
+    if conn is not None:
+        return int(getattr(conn, "query_count", 0))
+    return _query_count
 
 
 def _connect() -> pymysql.Connection:
@@ -27,22 +54,244 @@ def _connect() -> pymysql.Connection:
         password=settings.mysql_password,
         database=settings.mysql_db,
         charset="utf8mb4",
-        cursorclass=DictCursor,
+        cursorclass=_CountingCursor,
         autocommit=False,
     )
 
 
+class PoolTimeoutError(RuntimeError):
+    pass
+
+
+@dataclass
+class _PooledConn:
+    conn: pymysql.Connection
+    created_at: float
+    last_used_at: float
+
+
+class ConnectionPool:
+    """
+    스레드 안전한 PyMySQL 커넥션 풀.
+    - size개까지는 유휴 커넥션으로 보관하고, max_overflow개까지는 임시로 더 연다(반납 시 close).
+    - 모두 사용 중이면 timeout초까지 대기 후 PoolTimeoutError.
+    - recycle초가 지난 커넥션은 폐기 후 재연결, ping_interval초 이상 쉬었던 커넥션은 ping으로 확인.
+    """
+
+    def __init__(
+        self,
+        *,
+        size: int,
+        max_overflow: int,
+        timeout: float,
+        recycle: float,
+        ping_interval: float,
+        connect: Callable[[], pymysql.Connection] = _connect,
+    ) -> None:
+        self._size = max(1, size)
+        self._max_overflow = max(0, max_overflow)
+        self._timeout = max(0.0, timeout)
+        self._recycle = recycle
+        self._ping_interval = ping_interval
+        self._connect = connect
+
+        self._cond = threading.Condition()
+        self._idle: deque[_PooledConn] = deque()
+        self._in_use: dict[int, _PooledConn] = {}
+        self._connecting = 0
+        self._closed = False
+
+        self._stats: dict[str, float] = {
+            "acquired": 0,
+            "created": 0,
+            "recycled": 0,
+            "ping_failures": 0,
+            "discarded": 0,
+            "waits": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "timeouts": 0,
+        }
+
+    @property
+    def capacity(self) -> int:
+        return self._size + self._max_overflow
+
+    @property
+    def _total(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._connecting
+
+    def acquire(self) -> pymysql.Connection:
+        started = time.monotonic()
+        deadline = started + self._timeout
+        waited = False
+        entry: _PooledConn | None = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError("커넥션 풀이 종료되었습니다.")
+                # 슬롯을 먼저 예약하고, 점검/연결(핸드셰이크)은 락 밖에서 수행한다.
+                if self._idle:
+                    entry = self._idle.pop()
+                    self._connecting += 1
+                    break
+                if self._total < self._size + self._max_overflow:
+                    self._connecting += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeoutError(f"DB 커넥션을 {self._timeout:.1f}초 안에 얻지 못했습니다.")
+                waited = True
+                self._cond.wait(remaining)
+
+            if waited:
+                wait_seconds = time.monotonic() - started
+                self._stats["waits"] += 1
+                self._stats["wait_seconds_total"] += wait_seconds
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait_seconds)
+            self._stats["acquired"] += 1
+
+        try:
+            entry = self._new_entry() if entry is None else self._checked(entry)
+        except Exception:
+            with self._cond:
+                self._connecting -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._connecting -= 1
+            self._in_use[id(entry.conn)] = entry
+        return entry.conn
+
+    def release(self, conn: pymysql.Connection, *, discard: bool = False) -> None:
+        with self._cond:
+            entry = self._in_use.pop(id(conn), None)
+            if entry is None:
+                return
+            keep = (
+                not discard
+                and not self._closed
+                and len(self._idle) < self._size
+                and not self._expired(entry, time.monotonic())
+            )
+            if keep:
+                entry.last_used_at = time.monotonic()
+                self._idle.append(entry)
+            else:
+                self._stats["discarded"] += 1
+            self._cond.notify()
+        if not keep:
+            _close_quietly(conn)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for entry in idle:
+            _close_quietly(entry.conn)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            out: dict[str, Any] = dict(self._stats)
+            out.update(
+                {
+                    "size": self._size,
+                    "max_overflow": self._max_overflow,
+                    "idle": len(self._idle),
+                    "in_use": len(self._in_use),
+                }
+            )
+        return out
+
+    def _new_entry(self) -> _PooledConn:
+        conn = self._connect()
+        now = time.monotonic()
+        with self._cond:
+            self._stats["created"] += 1
+        return _PooledConn(conn=conn, created_at=now, last_used_at=now)
+
+    def _expired(self, entry: _PooledConn, now: float) -> bool:
+        return self._recycle > 0 and now - entry.created_at >= self._recycle
+
+    def _checked(self, entry: _PooledConn) -> _PooledConn:
+        now = time.monotonic()
+        if self._expired(entry, now):
+            _close_quietly(entry.conn)
+            with self._cond:
+                self._stats["recycled"] += 1
+            return self._new_entry()
+        if self._ping_interval >= 0 and now - entry.last_used_at >= self._ping_interval:
+            try:
+                entry.conn.ping(reconnect=False)
+            except Exception:
+                _close_quietly(entry.conn)
+                with self._cond:
+                    self._stats["ping_failures"] += 1
+                return self._new_entry()
+        return entry
+
+
+def _close_quietly(conn: pymysql.Connection) -> None:
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                settings = load_settings()
+                _pool = ConnectionPool(
+                    size=settings.mysql_pool_size,
+                    max_overflow=settings.mysql_pool_max_overflow,
+                    timeout=settings.mysql_pool_timeout,
+                    recycle=settings.mysql_pool_recycle,
+                    ping_interval=settings.mysql_pool_ping_interval,
+                )
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+def pool_stats() -> dict[str, Any]:
+    pool = _pool
+    out = pool.stats() if pool is not None else {}
+    out["queries"] = _query_count
+    return out
+
+
 @contextlib.contextmanager
 def db_conn() -> Generator[pymysql.Connection, None, None]:
-    conn = _connect()
+    pool = get_pool()
+    conn = pool.acquire()
+    broken = False
     try:
         yield conn
         conn.commit()
     except Exception:
-        conn.rollback()
+        try:
+            conn.rollback()
+        except Exception:
+            broken = True
         raise
     finally:
-        conn.close()
+        pool.release(conn, discard=broken)
 
 
 def fetch_one(conn: pymysql.Connection, sql: str, params: tuple[Any, ...]) -> dict[str, Any] | None:
@@ -64,6 +313,13 @@ def execute(conn: pymysql.Connection, sql: str, params: tuple[Any, ...]) -> int:
         return cur.execute(sql, params)
 
 
+def execute_insert_id(conn: pymysql.Connection, sql: str, params: tuple[Any, ...]) -> int:
+    """INSERT의 AUTO_INCREMENT 값 또는 UPDATE ... LAST_INSERT_ID(expr)로 돌려받은 값."""
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        return int(cur.lastrowid or 0)
+
+
 def json_dumps(value: Any) -> str:
     return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
 
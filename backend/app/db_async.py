@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+import threading
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+import pymysql
+
+from . import db
+from .config import load_settings
+from .db import PoolTimeoutError, get_pool
+
+T = TypeVar("T")
+
+# async 라우트에서 사용하는 DB 헬퍼.
+# - 쿼리는 전용 executor에서 실행해 이벤트 루프(WebSocket 포함)를 막지 않는다.
+# - executor 스레드 수 = 풀 최대 커넥션 수이고, db_conn() 진입을 같은 수의 세마포어로 제한한다.
+#   커넥션을 기다리는 코루틴은 스레드가 아니라 이벤트 루프에서 대기하므로(back-pressure)
+#   스레드가 모자라 커밋/반납이 밀리는 교착이 생기지 않는다.
+# - 단, db_conn()을 잡은 채로(같은 요청/태스크 안에서든 그 태스크가 기다리는 다른 태스크에서든) 다시 db_conn()을
+#   열면 안 된다. 동시에 그런 요청이 슬롯 수만큼 몰리면 모두 다른 요청이 놓아야 할 슬롯을 기다리며
+#   PoolTimeoutError가 날 때까지 멈춘다. 긴 외부 호출(GPT 등)은 커넥션을 놓고 한 뒤 새 트랜잭션에서 반영한다.
+
+_executor: ThreadPoolExecutor | None = None
+_slots: asyncio.Semaphore | None = None
+_slots_loop: asyncio.AbstractEventLoop | None = None
+_init_lock = threading.Lock()
+
+
+def _capacity() -> int:
+    return get_pool().capacity
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _init_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=_capacity(), thread_name_prefix="db-async")
+    return _executor
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots, _slots_loop
+    loop = asyncio.get_running_loop()
+    if _slots is None or _slots_loop is not loop:
+        _slots = asyncio.Semaphore(_capacity())
+        _slots_loop = loop
+    return _slots
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _init_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+async def _acquire(pool: db.ConnectionPool) -> pymysql.Connection:
+    # 기다리던 태스크가 취소돼도(클라이언트 연결 끊김, wait_for 등) executor의 acquire는 끝까지 실행된다.
+    # 그 커넥션을 받을 곳이 없으므로 완료되면 바로 풀에 돌려준다.
+    future = asyncio.get_running_loop().run_in_executor(_get_executor(), pool.acquire)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        future.add_done_callback(functools.partial(_release_orphan, pool))
+        raise
+
+
+def _release_orphan(pool: db.ConnectionPool, future: asyncio.Future[pymysql.Connection]) -> None:
+    if not future.cancelled() and future.exception() is None:
+        pool.release(future.result())
+
+
+async def run_in_db(fn: Callable[..., T], *args: Any) -> T:
+    """동기 DB 헬퍼(get_settings_map 등)를 DB 전용 executor에서 실행한다."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args))
+
+
+@contextlib.asynccontextmanager
+async def db_conn() -> AsyncIterator[pymysql.Connection]:
+    slots = _get_slots()
+    timeout = float(load_settings().mysql_pool_timeout)
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout=timeout)
+    except asyncio.TimeoutError as e:
+        raise PoolTimeoutError(f"DB 커넥션을 {timeout:.1f}초 안에 얻지 못했습니다.") from e
+    try:
+        pool = get_pool()
+        conn = await _acquire(pool)
+        broken = False
+        try:
+            yield conn
+            await run_in_db(conn.commit)
+        except BaseException:
+            try:
+                await run_in_db(conn.rollback)
+            except BaseException:
+                broken = True
+            raise
+        finally:
+            pool.release(conn, discard=broken)
+    finally:
+        slots.release()
+
+
+async def fetch_one(conn: pymysql.Connection, sql: str, params: tuple[Any, ...]) -> dict[str, Any] | None:
+    return await run_in_db(db.fetch_one, conn, sql, params)
+
+
+async def fetch_all(conn: pymysql.Connection, sql: str, params: tuple[Any, ...]) -> list[dict[str, Any]]:
+    return await run_in_db(db.fetch_all, conn, sql, params)
+
+
+async def execute(conn: pymysql.Connection, sql: str, params: tuple[Any, ...]) -> int:
+    return await run_in_db(db.execute, conn, sql, params)
+
+
+async def execute_insert_id(conn: pymysql.Connection, sql: str, params: tuple[Any, ...]) -> int:
+    return await run_in_db(db.execute_insert_id, conn, sql, params)
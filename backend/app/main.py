@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import contextlib
 import os
+from collections.abc import AsyncIterator
 
 from dotenv import load_dotenv
 from fastapi import FastAPI, WebSocket
@@ -9,9 +11,20 @@ from fastapi.staticfiles import StaticFiles
 from starlette.websockets import WebSocketDisconnect
 
 from .config import load_settings
+from .db import close_pool, pool_stats
+from .db_async import shutdown_executor
 from .routes import admin, auth, chatbot, chats, orders
 from .security import decode_token
-from .ws import manager
+from .services.chat_ai import pre_decision_stats
+from .services.context_window import context_folder_stats, start_context_folder, stop_context_folder
+from .services.decision_cache import decision_cache_stats
+from .services.gpt_client import aclose_http_clients
+from .services.reply_worker import reply_worker_stats, start_reply_worker, stop_reply_worker
+from .services.session_cache import session_cache_stats
+from .services.summary_cache import summary_cache_stats
+from .services.summary_worker import start_summary_worker, stop_summary_worker, summary_worker_stats
+from .services.tool_executor import tool_stats
+from .ws import bucket_topic, manager, session_topic
 
 
 def create_app() -> FastAPI:
@@ -20,7 +33,24 @@ def create_app() -> FastAPI:
     uploads_dir = os.path.join(os.path.dirname(__file__), "..", "uploads")
     os.makedirs(uploads_dir, exist_ok=True)
 
-    app = FastAPI(title="ai3pjt-backend", version="0.1.0")
+    @contextlib.asynccontextmanager
+    async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+        # 다른 프로세스(scripts/create_user.py)가 계정을 바꾸면 버스로 알려 모든 워커의 인증 캐시를 비운다.
+        manager.on_control(auth.PRINCIPAL_INVALIDATE_KIND, auth.invalidate_users)
+        await manager.start_bus()
+        await start_reply_worker()
+        await start_context_folder()
+        await start_summary_worker()
+        yield
+        await stop_summary_worker()
+        await stop_context_folder()
+        await stop_reply_worker()
+        await manager.stop_bus()
+        await aclose_http_clients()
+        shutdown_executor()
+        close_pool()
+
+    app = FastAPI(title="ai3pjt-backend", version="0.1.0", lifespan=lifespan)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.cors_origins or ["http://localhost:3000"],
@@ -41,6 +71,22 @@ def create_app() -> FastAPI:
     def health() -> dict[str, str]:
         return {"status": "ok"}
 
+    @app.get("/health/db")
+    def health_db() -> dict[str, object]:
+        return {
+            "status": "ok",
+            "pool": pool_stats(),
+            "ai_reply_worker": reply_worker_stats(),
+            "hot_sessions": session_cache_stats(),
+            "summary_worker": summary_worker_stats(),
+            "decision_cache": decision_cache_stats(),
+            "ai_pre_decision": pre_decision_stats(),
+            "ai_tools": tool_stats(),
+            "summary_cache": summary_cache_stats(),
+            "context_folder": context_folder_stats(),
+            "ws": manager.stats(),
+        }
+
     @app.websocket("/ws")
     async def websocket_endpoint(websocket: WebSocket) -> None:
         token = websocket.query_params.get("token")
@@ -58,7 +104,13 @@ def create_app() -> FastAPI:
             await websocket.close(code=4401)
             return
 
-        await manager.connect(websocket, user_id=user_id, role=role)
+        # 재연결 시 마지막으로 받은 이벤트 seq와 ws_hello의 epoch/conn(없거나 잘못되면 일반 연결)
+        raw_resume = (websocket.query_params.get("resume_from") or "").strip()
+        resume_from = int(raw_resume) if raw_resume.isdigit() else None
+        epoch = (websocket.query_params.get("epoch") or "").strip()[:64] or None
+        conn_token = (websocket.query_params.get("conn") or "").strip()[:64] or None
+
+        await manager.connect(websocket, user_id=user_id, role=role, resume_from=resume_from, epoch=epoch, conn_token=conn_token)
         try:
             while True:
                 msg = await websocket.receive_json()
@@ -69,17 +121,30 @@ def create_app() -> FastAPI:
                     chat_type = str(data.get("chat_type") or "")
                     if chat_type in ("active", "pending", "completed"):
                         await manager.set_subscription(websocket, chat_type)
+                elif msg_type == "subscribe_session" and role == "admin":
+                    # 상담 화면을 연 동안 그 세션의 메시지(new_message, customer_message)를 받는다.
+                    session_id = str(data.get("session_id") or "")
+                    if session_id and len(session_id) <= 64:
+                        if not await manager.subscribe(websocket, session_topic(session_id)):
+                            await manager.send(websocket, {"type": "error", "data": {"message": "구독 가능한 개수를 넘었습니다."}})
+                elif msg_type == "unsubscribe" and role == "admin":
+                    session_id = str(data.get("session_id") or "")
+                    chat_type = str(data.get("chat_type") or "")
+                    if session_id:
+                        await manager.unsubscribe(websocket, session_topic(session_id))
+                    if chat_type:
+                        await manager.unsubscribe(websocket, bucket_topic(chat_type))
                 elif msg_type == "typing":
                     # 현재는 서버 단에서 별도 브로드캐스트하지 않음
                     continue
                 elif msg_type == "agent_message" and role == "admin":
                     # 프론트가 WS로 보내도 되지만, 저장은 REST(/api/chats/messages)로 통일 권장
                     # 여기서는 클라이언트에게 "받았다" 정도의 최소 ACK만 제공
-                    await websocket.send_json({"type": "ack", "data": {"ok": True}})
+                    await manager.send(websocket, {"type": "ack", "data": {"ok": True}})
                 elif msg_type == "send_message" and role == "customer":
-                    await websocket.send_json({"type": "ack", "data": {"ok": True}})
+                    await manager.send(websocket, {"type": "ack", "data": {"ok": True}})
                 else:
-                    await websocket.send_json({"type": "error", "data": {"message": "지원하지 않는 이벤트입니다."}})
+                    await manager.send(websocket, {"type": "error", "data": {"message": "지원하지 않는 이벤트입니다."}})
         except WebSocketDisconnect:
             pass
         finally:
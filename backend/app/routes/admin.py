@@ -1,15 +1,23 @@
 from __future__ import annotations
 
+import base64
+import json
 import uuid
 from datetime import datetime, timedelta, timezone
+from typing import Any, Literal
 
 from fastapi import APIRouter, Depends, HTTPException
 
+from .. import db_async as adb
 from ..db import db_conn, execute, fetch_all, fetch_one, utc_now
 from ..db import json_loads
 from ..schemas import ApiResponse, CompleteRequest, MessageOut, ProvideInfoRequest, TakeoverRequest, UserOut
 from ..services.chat_ai import decide_ai_reply
-from ..services.chat_summary import build_admin_summary, build_completed_summary_text
+from ..services.context_window import build_context_window, estimate_tokens
+from ..services.message_seq import next_message_seq
+from ..services.session_cache import evict_session, load_session_context, record_message
+from ..services.summary_cache import get_admin_summary
+from ..services.summary_worker import enqueue_summary_job, submit_summary_job
 from ..ws import manager
 from .auth import get_current_user
 from .chatbot import get_settings_map
@@ -37,6 +45,7 @@ def _to_message_out(row: dict) -> dict:
     return MessageOut(
         id=row["id"],
         session_id=row.get("session_id"),
+        seq=row.get("seq"),
         sender_type=row["sender_type"],
         sender_id=row.get("sender_id"),
         content=row["content"],
@@ -46,20 +55,166 @@ def _to_message_out(row: dict) -> dict:
     ).model_dump()
 
 
+def _message_row(msg_id: str, session_id: str, seq: int, sender_type: str, content: str, created_at: datetime) -> dict:
+    # INSERT한 값으로 messages 행을 만든다(관리자/AI 메시지는 sender_id, 첨부 없이 읽음 상태로 저장한다).
+    return {
+        "id": msg_id,
+        "session_id": session_id,
+        "seq": seq,
+        "sender_type": sender_type,
+        "sender_id": None,
+        "content": content,
+        "attachments": None,
+        "is_read": True,
+        "created_at": created_at,
+    }
+
+
+# 목록 API는 필터를 SQL로 처리하고 keyset 커서로 나눠서 돌려준다.
+# - 정렬은 (정렬 시각, id)로 고정해 같은 시각의 세션도 페이지 사이에서 빠지거나 겹치지 않는다.
+# - cursor는 마지막 행의 (정렬 시각, id)를 base64url(JSON)로 감싼 불투명 문자열이다.
+# - 진행 중/처리 대기 목록은 현재 부하만큼만 있으므로 limit을 주지 않으면 전부 돌려준다(대시보드가 한 번에 보여 준다).
+#   계속 쌓이는 종료 목록만 기본 DEFAULT_LIST_LIMIT개씩 나눈다.
+DEFAULT_LIST_LIMIT = 50
+MAX_LIST_LIMIT = 200
+
+_LIST_SORT = {
+    # status: (정렬 식, 내림차순 여부). 커서 비교가 되도록 정렬 식은 NULL이 나오지 않게 한다.
+    "active": ("COALESCE(m.last_message_at, s.started_at)", True),
+    # 오래 기다린 순(대기 시간 내림차순)
+    "pending": ("COALESCE(s.pending_at, s.started_at)", False),
+    # completed_at이 없는 예전 종료 세션은 시작 시각으로 정렬한다.
+    "completed": ("COALESCE(s.completed_at, s.started_at)", True),
+}
+
+
+def _clamp_limit(limit: int | None, *, default: int | None = DEFAULT_LIST_LIMIT) -> int | None:
+    if limit is None:
+        return default
+    return max(1, min(int(limit), MAX_LIST_LIMIT))
+
+
+def _encode_cursor(sort_value: datetime, session_id: str) -> str:
+    raw = json.dumps([sort_value.isoformat(), session_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_raw, session_id = json.loads(raw.decode("utf-8"))
+        if not isinstance(sort_raw, str) or not session_id:
+            raise ValueError("cursor 값 없음")
+        return datetime.fromisoformat(sort_raw), str(session_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="cursor가 올바르지 않습니다.")
+
+
+def _like_pattern(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _date_cutoff(date_range: str) -> datetime | None:
+    now = utc_now()
+    if date_range == "today":
+        cutoff = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    elif date_range == "week":
+        cutoff = now - timedelta(days=7)
+    elif date_range == "month":
+        cutoff = now - timedelta(days=30)
+    else:
+        return None
+    # DB의 TIMESTAMP는 naive UTC로 비교한다.
+    return cutoff.astimezone(timezone.utc).replace(tzinfo=None) if cutoff.tzinfo is not None else cutoff
+
+
+def _list_filters(
+    status: str,
+    *,
+    category: str = "all",
+    search: str = "",
+    handler: str = "all",
+    date_range: str = "all",
+) -> tuple[list[str], list[Any]]:
+    where = ["s.status=%s"]
+    params: list[Any] = [status]
+    if category != "all":
+        where.append("s.category=%s")
+        params.append(category)
+    if handler != "all":
+        where.append("s.handler_type=%s")
+        params.append("ai" if handler == "AI" else "agent")
+    cutoff = _date_cutoff(date_range) if status == "completed" else None
+    if cutoff is not None:
+        where.append("s.completed_at >= %s")
+        params.append(cutoff)
+    search = (search or "").strip().lower()
+    if search:
+        where.append("u.email LIKE %s")
+        params.append(_like_pattern(search))
+    return where, params
+
+
+def _fetch_list_page(
+    conn,
+    status: str,
+    columns: str,
+    where: list[str],
+    params: list[Any],
+    *,
+    cursor: str | None,
+    limit: int | None,
+) -> tuple[list[dict[str, Any]], str | None]:
+    """limit이 None이면 나누지 않고 전부(next_cursor는 None)."""
+    sort_expr, desc = _LIST_SORT[status]
+    where = list(where)
+    params = list(params)
+    if cursor:
+        sort_value, last_id = _decode_cursor(cursor)
+        op = "<" if desc else ">"
+        where.append(f"({sort_expr} {op} %s OR ({sort_expr} = %s AND s.id {op} %s))")
+        params.extend([sort_value, sort_value, last_id])
+    direction = "DESC" if desc else "ASC"
+    rows = fetch_all(
+        conn,
+        f"""
+        SELECT {columns}, {sort_expr} AS sort_at
+        FROM chat_sessions s
+        JOIN users u ON u.id = s.customer_id
+        LEFT JOIN chat_session_metadata m ON m.session_id = s.id
+        WHERE {" AND ".join(where)}
+        ORDER BY {sort_expr} {direction}, s.id {direction}
+        {"LIMIT %s" if limit is not None else ""}
+        """,
+        (*params, limit + 1) if limit is not None else tuple(params),
+    )
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        sort_at = rows[-1].get("sort_at")
+        # 정렬 식이 NULL을 내지 않게 했지만, 혹시 NULL이면 풀 수 없는 커서를 주지 않는다.
+        if sort_at is not None:
+            next_cursor = _encode_cursor(sort_at, rows[-1]["id"])
+    return rows, next_cursor
+
+
 @router.get("/chats/active", response_model=ApiResponse)
 def list_active_chats(
     category: str = "all",
     search: str = "",
+    cursor: str | None = None,
+    limit: int | None = None,
     current_user: UserOut = Depends(get_current_user),
 ) -> ApiResponse:
     _require_admin(current_user)
-    search = (search or "").strip().lower()
+    where, params = _list_filters("active", category=category, search=search)
 
     with db_conn() as conn:
-        rows = fetch_all(
+        rows, next_cursor = _fetch_list_page(
             conn,
+            "active",
             """
-            SELECT
               s.id,
               s.customer_id,
               u.email AS customer_name,
@@ -68,26 +223,15 @@ def list_active_chats(
               m.last_message_at,
               s.handler_type,
               m.unread_count
-            FROM chat_sessions s
-            JOIN users u ON u.id = s.customer_id
-            LEFT JOIN chat_session_metadata m ON m.session_id = s.id
-            WHERE s.status='active'
-            ORDER BY COALESCE(m.last_message_at, s.started_at) DESC
             """,
-            (),
+            where,
+            params,
+            cursor=cursor,
+            limit=_clamp_limit(limit, default=None),
         )
 
-    def match(r: dict) -> bool:
-        if category != "all" and (r.get("category") or "") != category:
-            return False
-        if search and search not in (r.get("customer_name") or "").lower():
-            return False
-        return True
-
     chats = []
     for r in rows:
-        if not match(r):
-            continue
         chats.append(
             {
                 "id": r["id"],
@@ -100,23 +244,25 @@ def list_active_chats(
                 "unread": int(r.get("unread_count") or 0),
             }
         )
-    return ApiResponse(success=True, data={"chats": chats})
+    return ApiResponse(success=True, data={"chats": chats, "next_cursor": next_cursor})
 
 
 @router.get("/chats/pending", response_model=ApiResponse)
 def list_pending_chats(
     category: str = "all",
     search: str = "",
+    cursor: str | None = None,
+    limit: int | None = None,
     current_user: UserOut = Depends(get_current_user),
 ) -> ApiResponse:
     _require_admin(current_user)
-    search = (search or "").strip().lower()
+    where, params = _list_filters("pending", category=category, search=search)
 
     with db_conn() as conn:
-        rows = fetch_all(
+        rows, next_cursor = _fetch_list_page(
             conn,
+            "pending",
             """
-            SELECT
               s.id,
               s.customer_id,
               u.email AS customer_name,
@@ -126,13 +272,11 @@ def list_pending_chats(
               m.last_message,
               m.last_message_at,
               m.priority
-            FROM chat_sessions s
-            JOIN users u ON u.id = s.customer_id
-            LEFT JOIN chat_session_metadata m ON m.session_id = s.id
-            WHERE s.status='pending'
-            ORDER BY COALESCE(m.last_message_at, s.pending_at, s.started_at) DESC
             """,
-            (),
+            where,
+            params,
+            cursor=cursor,
+            limit=_clamp_limit(limit, default=None),
         )
         settings = get_settings_map(conn)
 
@@ -147,10 +291,6 @@ def list_pending_chats(
     now = utc_now()
     chats = []
     for r in rows:
-        if category != "all" and (r.get("category") or "") != category:
-            continue
-        if search and search not in (r.get("customer_name") or "").lower():
-            continue
         pending_at: datetime | None = r.get("pending_at")
         if pending_at:
             pending_at_aware = pending_at.replace(tzinfo=timezone.utc) if pending_at.tzinfo is None else pending_at.astimezone(timezone.utc)
@@ -177,8 +317,7 @@ def list_pending_chats(
                 "priority": priority,
             }
         )
-    chats.sort(key=lambda c: c["wait_time"], reverse=True)
-    return ApiResponse(success=True, data={"chats": chats})
+    return ApiResponse(success=True, data={"chats": chats, "next_cursor": next_cursor})
 
 
 @router.get("/chats/completed", response_model=ApiResponse)
@@ -187,16 +326,18 @@ def list_completed_chats(
     handler: str = "all",
     dateRange: str = "all",
     search: str = "",
+    cursor: str | None = None,
+    limit: int | None = None,
     current_user: UserOut = Depends(get_current_user),
 ) -> ApiResponse:
     _require_admin(current_user)
-    search = (search or "").strip().lower()
+    where, params = _list_filters("completed", category=category, search=search, handler=handler, date_range=dateRange)
 
     with db_conn() as conn:
-        rows = fetch_all(
+        rows, next_cursor = _fetch_list_page(
             conn,
+            "completed",
             """
-            SELECT
               s.id,
               s.customer_id,
               u.email AS customer_name,
@@ -204,57 +345,62 @@ def list_completed_chats(
               s.handler_type,
               s.duration_minutes,
               s.completed_at,
-              s.summary,
-              m.last_message_at
-            FROM chat_sessions s
-            JOIN users u ON u.id = s.customer_id
-            LEFT JOIN chat_session_metadata m ON m.session_id = s.id
-            WHERE s.status='completed'
-            ORDER BY COALESCE(m.last_message_at, s.completed_at, s.started_at) DESC
+              s.summary
             """,
-            (),
+            where,
+            params,
+            cursor=cursor,
+            limit=_clamp_limit(limit),
         )
 
     chats = []
-    cutoff: datetime | None = None
-    if dateRange == "today":
-        now = utc_now()
-        cutoff = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    elif dateRange == "week":
-        cutoff = utc_now() - timedelta(days=7)
-    elif dateRange == "month":
-        cutoff = utc_now() - timedelta(days=30)
-
-    cutoff_aware: datetime | None = None
-    if cutoff is not None:
-        cutoff_aware = cutoff.replace(tzinfo=timezone.utc) if cutoff.tzinfo is None else cutoff
-
     for r in rows:
-        if category != "all" and (r.get("category") or "") != category:
-            continue
-        handled_by = "AI" if r.get("handler_type") == "ai" else "상담원"
-        if handler != "all" and handler != handled_by:
-            continue
-        if search and search not in (r.get("customer_name") or "").lower():
-            continue
-        completed_at = r.get("completed_at")
-        if cutoff_aware and isinstance(completed_at, datetime):
-            completed_at_aware = completed_at.replace(tzinfo=timezone.utc) if completed_at.tzinfo is None else completed_at
-            if completed_at_aware < cutoff_aware:
-                continue
         chats.append(
             {
                 "id": r["id"],
                 "customer_id": r["customer_id"],
                 "customer_name": r.get("customer_name"),
                 "category": r.get("category") or "미분류",
-                "handled_by": handled_by,
+                "handled_by": "AI" if r.get("handler_type") == "ai" else "상담원",
                 "duration": int(r.get("duration_minutes") or 0),
                 "completed_at": _dt_to_iso(r.get("completed_at")),
                 "summary": r.get("summary") or "",
             }
         )
-    return ApiResponse(success=True, data={"chats": chats})
+    return ApiResponse(success=True, data={"chats": chats, "next_cursor": next_cursor})
+
+
+@router.get("/chats/counts", response_model=ApiResponse)
+def count_chats(
+    status: Literal["active", "pending", "completed"],
+    handler: str = "all",
+    dateRange: str = "all",
+    search: str = "",
+    current_user: UserOut = Depends(get_current_user),
+) -> ApiResponse:
+    """목록과 같은 필터(카테고리 제외)로 전체/카테고리별 건수를 돌려준다."""
+    _require_admin(current_user)
+    where, params = _list_filters(status, search=search, handler=handler, date_range=dateRange)
+    join_users = "JOIN users u ON u.id = s.customer_id" if (search or "").strip() else ""
+
+    with db_conn() as conn:
+        rows = fetch_all(
+            conn,
+            f"""
+            SELECT s.category, COUNT(*) AS count
+            FROM chat_sessions s
+            {join_users}
+            WHERE {" AND ".join(where)}
+            GROUP BY s.category
+            """,
+            tuple(params),
+        )
+
+    by_category: dict[str, int] = {}
+    for r in rows:
+        key = r.get("category") or "미분류"
+        by_category[key] = by_category.get(key, 0) + int(r.get("count") or 0)
+    return ApiResponse(success=True, data={"total": sum(by_category.values()), "by_category": by_category})
 
 
 @router.post("/chats/{session_id}/takeover", response_model=ApiResponse)
@@ -267,11 +413,11 @@ async def takeover(
     if req.agent_id != current_user.id:
         raise HTTPException(status_code=403, detail="agent_id가 현재 사용자와 일치하지 않습니다.")
 
-    with db_conn() as conn:
-        session = fetch_one(conn, "SELECT * FROM chat_sessions WHERE id=%s", (session_id,))
+    async with adb.db_conn() as conn:
+        session = await adb.fetch_one(conn, "SELECT * FROM chat_sessions WHERE id=%s", (session_id,))
         if not session:
             return ApiResponse(success=False, message="세션을 찾을 수 없습니다.")
-        execute(
+        await adb.execute(
             conn,
             "UPDATE chat_sessions SET handler_type='agent', assigned_agent_id=%s, status='active', pending_at=NULL WHERE id=%s",
             (current_user.id, session_id),
@@ -292,119 +438,121 @@ async def provide_info(
 ) -> ApiResponse:
     _require_admin(current_user)
 
-    with db_conn() as conn:
-        session = fetch_one(conn, "SELECT * FROM chat_sessions WHERE id=%s", (session_id,))
-        if not session:
+    # 세 단계로 나눠 GPT 판단(도구 호출 포함) 동안에는 커넥션과 세션/메타데이터 행 잠금을 잡지 않는다.
+    # 1) 관리자 지침 저장 + active 복귀(짧은 트랜잭션) 2) 판단(커넥션 없음) 3) 결과 반영(짧은 트랜잭션).
+    async with adb.db_conn() as conn:
+        # 세션/대화/고객 프로필은 조인 조회 한 번(+새 메시지가 있으면 한 번 더)으로 가져온다.
+        ctx = await load_session_context(conn, session_id)
+        if not ctx:
             return ApiResponse(success=False, message="세션을 찾을 수 없습니다.")
+        session = ctx.session
 
         # pending → active로 복귀시키고, 관리자 지침을 그대로 전달
         now = utc_now()
-        execute(conn, "UPDATE chat_sessions SET status='active', handler_type='ai', pending_at=NULL WHERE id=%s", (session_id,))
+        await adb.execute(conn, "UPDATE chat_sessions SET status='active', handler_type='ai', pending_at=NULL WHERE id=%s", (session_id,))
 
         admin_reply = req.info.strip()
         msg_id = uuid.uuid4().hex
-        execute(
+        seq = await adb.run_in_db(next_message_seq, conn, session_id)
+        await adb.execute(
             conn,
-            "INSERT INTO messages (id, session_id, sender_type, sender_id, content, attachments, is_read, created_at) VALUES (%s,%s,'agent',NULL,%s,NULL,TRUE,%s)",
-            (msg_id, session_id, admin_reply, now),
+            "INSERT INTO messages (id, session_id, seq, sender_type, sender_id, content, attachments, is_read, created_at) VALUES (%s,%s,%s,'agent',NULL,%s,NULL,TRUE,%s)",
+            (msg_id, session_id, seq, admin_reply, now),
         )
-        execute(
+        await adb.execute(
             conn,
             "UPDATE chat_session_metadata SET last_message=%s, last_message_at=%s WHERE session_id=%s",
             (admin_reply, now, session_id),
         )
+        agent_row = _message_row(msg_id, session_id, seq, "agent", admin_reply, now)
+        settings = await adb.run_in_db(get_settings_map, conn)
 
-        # 대화 맥락과 설정을 불러와 GPT로 실제 고객 응답을 생성
-        messages = fetch_all(conn, "SELECT sender_type, content, created_at FROM messages WHERE session_id=%s ORDER BY created_at ASC", (session_id,))
-        settings = get_settings_map(conn)
-        customer_profile = ""
-        try:
-            user_row = fetch_one(conn, "SELECT email, name FROM users WHERE id=%s", (session.get("customer_id"),))
-            if user_row:
-                customer_profile = f"id={session.get('customer_id')}, email={user_row.get('email')}, name={user_row.get('name')}"
-        except Exception:
-            customer_profile = f"id={session.get('customer_id')}"
-
-        last_user_row = fetch_one(
-            conn,
-            "SELECT content FROM messages WHERE session_id=%s AND sender_type='user' ORDER BY created_at DESC LIMIT 1",
-            (session_id,),
-        )
-        last_user_message = (last_user_row or {}).get("content") or admin_reply
-
-        decision = await decide_ai_reply(
-            session_id=session_id,
-            user_message=last_user_message,
-            conversation_rows=messages,
-            current_category=session.get("category"),
-            settings=settings,
-            customer_id=session.get("customer_id"),
-            customer_profile=customer_profile,
-            admin_instruction=admin_reply,
-        )
+    record_message(session_id, agent_row)
+    await manager.broadcast_to_admins({"type": "session_status_changed", "data": {"session_id": session_id, "status": "active", "handler_type": "ai"}})
 
-        if decision.category and decision.category != session.get("category"):
-            execute(conn, "UPDATE chat_sessions SET category=%s WHERE id=%s", (decision.category, session_id))
+    # 대화 맥락과 설정으로 GPT가 실제 고객 응답을 생성(커넥션 없이)
+    messages = [*ctx.rows, agent_row]
+    last_user_message = next(
+        (r.get("content") for r in reversed(messages) if r.get("sender_type") == "user" and r.get("content")),
+        admin_reply,
+    )
+    decision = await decide_ai_reply(
+        session_id=session_id,
+        user_message=last_user_message,
+        conversation_rows=messages,
+        current_category=session.get("category"),
+        settings=settings,
+        customer_id=session.get("customer_id"),
+        customer_profile=ctx.customer_profile,
+        admin_instruction=admin_reply,
+        context=build_context_window(messages, ctx.stored_summary, reserve_tokens=estimate_tokens(last_user_message)),
+    )
 
-        # 종료 판단 시 완료 처리
+    # 판단 결과 반영. 그 사이 다른 관리자가 개입/종료했으면(낙관적 동시성) AI 응답을 버린다.
+    reply_at = utc_now()
+    category = decision.category or session.get("category")
+    expected_status = "active"
+    ai_row: dict[str, Any] | None = None
+    async with adb.db_conn() as conn:
+        applied = 1
         if decision.complete:
-            try:
-                completed_summary = await build_completed_summary_text(session_id)
-            except Exception:
-                completed_summary = decision.summary or ""
-
+            # 종료 요약은 요약 작업이 만들어 summary_updated로 알린다.
             started_at: datetime | None = session.get("started_at")
             duration = 0
             if started_at:
-                now_naive = now.astimezone(timezone.utc).replace(tzinfo=None) if now.tzinfo is not None else now
+                now_naive = reply_at.astimezone(timezone.utc).replace(tzinfo=None) if reply_at.tzinfo is not None else reply_at
                 started_at_naive = started_at.astimezone(timezone.utc).replace(tzinfo=None) if started_at.tzinfo is not None else started_at
                 duration = int((now_naive - started_at_naive).total_seconds() // 60)
-
-            execute(
+            applied = await adb.execute(
                 conn,
-                "UPDATE chat_sessions SET status='completed', completed_at=%s, duration_minutes=%s, summary=%s WHERE id=%s",
-                (now, duration, completed_summary or None, session_id),
+                "UPDATE chat_sessions SET status='completed', completed_at=%s, duration_minutes=%s, summary=%s, category=%s "
+                "WHERE id=%s AND status='active' AND handler_type='ai'",
+                (reply_at, duration, decision.summary or None, category, session_id),
             )
-
-            ai_msg_id = uuid.uuid4().hex
-            execute(
+            expected_status = "completed"
+            if applied:
+                await enqueue_summary_job(conn, session_id, "completed")
+        elif category != session.get("category"):
+            await adb.execute(
                 conn,
-                "INSERT INTO messages (id, session_id, sender_type, sender_id, content, attachments, is_read, created_at) VALUES (%s,%s,'ai',NULL,%s,NULL,TRUE,%s)",
-                (ai_msg_id, session_id, decision.response, now),
-            )
-            execute(
-                conn,
-                "UPDATE chat_session_metadata SET last_message=%s, last_message_at=%s WHERE session_id=%s",
-                (decision.response, now, session_id),
+                "UPDATE chat_sessions SET category=%s WHERE id=%s AND status='active' AND handler_type='ai'",
+                (category, session_id),
             )
-            ai_row = fetch_one(conn, "SELECT * FROM messages WHERE id=%s", (ai_msg_id,))
-            ai_out = _to_message_out(ai_row) if ai_row else {"id": ai_msg_id, "content": decision.response}
-        else:
+
+        if applied:
             ai_msg_id = uuid.uuid4().hex
-            execute(
+            seq = await adb.run_in_db(next_message_seq, conn, session_id)
+            applied = await adb.execute(
                 conn,
-                "INSERT INTO messages (id, session_id, sender_type, sender_id, content, attachments, is_read, created_at) VALUES (%s,%s,'ai',NULL,%s,NULL,TRUE,%s)",
-                (ai_msg_id, session_id, decision.response, now),
+                "INSERT INTO messages (id, session_id, seq, sender_type, sender_id, content, attachments, is_read, created_at) "
+                "SELECT %s, id, %s, 'ai', NULL, %s, NULL, TRUE, %s FROM chat_sessions WHERE id=%s AND status=%s AND handler_type='ai'",
+                (ai_msg_id, seq, decision.response, reply_at, session_id, expected_status),
             )
-            execute(
+        if applied:
+            await adb.execute(
                 conn,
                 "UPDATE chat_session_metadata SET last_message=%s, last_message_at=%s WHERE session_id=%s",
-                (decision.response, now, session_id),
+                (decision.response, reply_at, session_id),
             )
-            ai_row = fetch_one(conn, "SELECT * FROM messages WHERE id=%s", (ai_msg_id,))
-            ai_out = _to_message_out(ai_row) if ai_row else {"id": ai_msg_id, "content": decision.response}
+            ai_row = _message_row(ai_msg_id, session_id, seq, "ai", decision.response, reply_at)
+
+    if ai_row is None:
+        return ApiResponse(success=True, message="AI에게 정보를 전달했습니다. 그 사이 상담 상태가 바뀌어 AI 응답은 보내지 않았습니다.")
+
+    ai_out = _to_message_out(ai_row)
+    if decision.complete:
+        evict_session(session_id)
+        submit_summary_job(session_id)
+    else:
+        record_message(session_id, ai_row)
 
     # 고객에게는 GPT가 생성한 응답만 전달한다.
     await manager.send_to_user(session["customer_id"], {"type": "new_message", "data": {"message": ai_out}})
-    await manager.broadcast_to_admins({"type": "session_status_changed", "data": {"session_id": session_id, "status": "active", "handler_type": "ai"}})
     if decision.complete:
         await manager.send_to_user(session["customer_id"], {"type": "session_completed", "data": {"session_id": session_id, "message": decision.response}})
-        await manager.broadcast_to_admins({"type": "session_status_changed", "data": {"session_id": session_id, "status": "completed", "handler_type": session.get("handler_type")}})
+        await manager.broadcast_to_admins({"type": "session_status_changed", "data": {"session_id": session_id, "status": "completed", "handler_type": "ai"}})
     else:
-        await manager.broadcast_to_admins(
-            {"type": "new_message", "data": {"session_id": session_id, "message": ai_out}},
-            require_subscription="active",
-        )
+        await manager.publish_message(session_id, ai_out, bucket="active")
 
     return ApiResponse(success=True, message="AI에게 정보를 전달했습니다. AI가 고객에게 응답했습니다.")
 
@@ -418,8 +566,8 @@ async def complete_chat(
     _require_admin(current_user)
     now = utc_now()
 
-    with db_conn() as conn:
-        session = fetch_one(conn, "SELECT * FROM chat_sessions WHERE id=%s", (session_id,))
+    async with adb.db_conn() as conn:
+        session = await adb.fetch_one(conn, "SELECT * FROM chat_sessions WHERE id=%s", (session_id,))
         if not session:
             return ApiResponse(success=False, message="세션을 찾을 수 없습니다.")
         started_at: datetime | None = session.get("started_at")
@@ -438,29 +586,27 @@ async def complete_chat(
         if not summary_text:
             # pydantic에서 min_length=1이라 보통 비어있지 않지만, 안전하게 fallback 처리
             summary_text = "상담이 종료되었습니다."
-        # 가능하면 종료 요약을 GPT로 생성해 저장한다(실패 시 요청 값 유지).
-        try:
-            gpt_summary = await build_completed_summary_text(session_id)
-            if (gpt_summary or "").strip():
-                summary_text = gpt_summary.strip()
-        except Exception:
-            pass
-
-        execute(
+
+        # 요청 값을 먼저 저장하고, GPT 종료 요약은 요약 작업이 만들어 덮어쓴다(실패 시 요청 값 유지).
+        await adb.execute(
             conn,
             "UPDATE chat_sessions SET status='completed', completed_at=%s, duration_minutes=%s, summary=%s WHERE id=%s",
             (now, duration, summary_text, session_id),
         )
+        await enqueue_summary_job(conn, session_id, "completed")
 
-        settings = get_settings_map(conn)
+        settings = await adb.run_in_db(get_settings_map, conn)
         farewell = settings.get("farewell") or "상담이 완료되었습니다. 좋은 하루 되세요!"
         msg_id = uuid.uuid4().hex
-        execute(
+        seq = await adb.run_in_db(next_message_seq, conn, session_id)
+        await adb.execute(
             conn,
-            "INSERT INTO messages (id, session_id, sender_type, sender_id, content, attachments, is_read, created_at) VALUES (%s,%s,'ai',NULL,%s,NULL,TRUE,%s)",
-            (msg_id, session_id, farewell, now),
+            "INSERT INTO messages (id, session_id, seq, sender_type, sender_id, content, attachments, is_read, created_at) VALUES (%s,%s,%s,'ai',NULL,%s,NULL,TRUE,%s)",
+            (msg_id, session_id, seq, farewell, now),
         )
 
+    evict_session(session_id)
+    submit_summary_job(session_id)
     await manager.send_to_user(session["customer_id"], {"type": "session_completed", "data": {"session_id": session_id, "message": farewell}})
     await manager.broadcast_to_admins({"type": "session_status_changed", "data": {"session_id": session_id, "status": "completed", "handler_type": session.get("handler_type")}})
     return ApiResponse(success=True, message="상담이 종료되었습니다.")
@@ -470,7 +616,8 @@ async def complete_chat(
 async def get_summary(session_id: str, current_user: UserOut = Depends(get_current_user)) -> ApiResponse:
     _require_admin(current_user)
     try:
-        s = await build_admin_summary(session_id)
+        cached = await get_admin_summary(session_id)
+        s = cached.summary
         return ApiResponse(
             success=True,
             data={
@@ -478,6 +625,8 @@ async def get_summary(session_id: str, current_user: UserOut = Depends(get_curre
                     "core_summary": s.core_summary,
                     "current_issues": s.current_issues,
                     "customer_info": {"email": s.customer_email, "started_at": s.started_at},
+                    # true면 이전 대화 기준 요약이며 최신 요약은 백그라운드에서 생성 중이다.
+                    "stale": cached.stale,
                 }
             },
         )
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import uuid
+from typing import Any
 
 from fastapi import APIRouter, Depends, Header, HTTPException
 
+from ..cache import TTLCache
+from ..config import load_settings
 from ..db import db_conn, execute, fetch_one
 from ..schemas import ApiResponse, LoginRequest, LoginResponseData, UserOut
 from ..security import create_access_token, hash_password, verify_password, decode_token
@@ -23,6 +26,46 @@ def _get_bearer_token(authorization: str | None) -> str | None:
     return token.strip()
 
 
+# 인증된 사용자 캐시(user_id -> UserOut). 없는 사용자도 짧게 기억한다(negative caching).
+# 다른 프로세스(scripts/create_user.py 등)에서 바꾼 내용은 WebSocket 이벤트 버스의
+# PRINCIPAL_INVALIDATE_KIND Envelope로 모든 워커가 바로 비운다(버스가 inprocess면 TTL 안에 반영).
+PRINCIPAL_INVALIDATE_KIND = "auth_invalidate"
+_NOT_FOUND: Any = object()
+_principals: TTLCache[str, Any] | None = None
+
+
+def _principal_cache() -> TTLCache[str, Any]:
+    global _principals
+    if _principals is None:
+        settings = load_settings()
+        _principals = TTLCache(max_size=settings.auth_cache_size, ttl_seconds=settings.auth_cache_ttl_seconds)
+    return _principals
+
+
+def invalidate_user(user_id: str | None = None) -> None:
+    """사용자 정보/권한을 바꾼 뒤 호출한다. user_id가 없으면 전체를 비운다."""
+    if user_id is None:
+        _principal_cache().clear()
+    else:
+        _principal_cache().pop(user_id)
+
+
+def invalidate_users(user_ids: tuple[str, ...]) -> None:
+    """버스로 받은 PRINCIPAL_INVALIDATE_KIND 처리. 대상이 없으면 전체를 비운다."""
+    if not user_ids:
+        invalidate_user()
+    for user_id in user_ids:
+        invalidate_user(user_id)
+
+
+def _user_from_claims(payload: dict[str, Any]) -> UserOut | None:
+    # 신뢰 모드: 서명된 토큰의 클레임만으로 사용자를 만든다(만료 전까지 권한 변경이 반영되지 않는다).
+    try:
+        return UserOut(id=str(payload["sub"]), email=payload["email"], name=payload["name"], role=payload["role"])
+    except Exception:
+        return None
+
+
 def get_current_user(authorization: str | None = Header(default=None)) -> UserOut:
     token = _get_bearer_token(authorization)
     if not token:
@@ -34,15 +77,31 @@ def get_current_user(authorization: str | None = Header(default=None)) -> UserOu
     user_id = str(payload.get("sub") or "")
     if not user_id:
         raise HTTPException(status_code=401, detail="토큰이 유효하지 않습니다.")
-    with db_conn() as conn:
-        row = fetch_one(
-            conn,
-            "SELECT id, email, name, role FROM users WHERE id=%s",
-            (user_id,),
+
+    settings = load_settings()
+    if settings.auth_trust_token_claims:
+        user = _user_from_claims(payload)
+        if user is not None:
+            return user
+
+    cache = _principal_cache()
+    cached = cache.get(user_id)
+    if cached is None:
+        with db_conn() as conn:
+            row = fetch_one(
+                conn,
+                "SELECT id, email, name, role FROM users WHERE id=%s",
+                (user_id,),
+            )
+        cached = UserOut(**row) if row else _NOT_FOUND
+        cache.set(
+            user_id,
+            cached,
+            ttl_seconds=settings.auth_cache_ttl_seconds if row else settings.auth_cache_negative_ttl_seconds,
         )
-    if not row:
+    if cached is _NOT_FOUND:
         raise HTTPException(status_code=401, detail="사용자를 찾을 수 없습니다.")
-    return UserOut(**row)
+    return cached.model_copy()
 
 
 @router.post("/login", response_model=ApiResponse)
@@ -81,7 +140,7 @@ def login(req: LoginRequest) -> ApiResponse:
         if not verify_password(req.password, user["password_hash"]):
             return ApiResponse(success=False, message="이메일 또는 비밀번호가 올바르지 않습니다.")
 
-        token = create_access_token(user_id=user["id"], role=user["role"], email=user["email"])
+        token = create_access_token(user_id=user["id"], role=user["role"], email=user["email"], name=user["name"])
         data = LoginResponseData(user=UserOut(id=user["id"], email=user["email"], name=user["name"], role=user["role"]), token=token)
         return ApiResponse(success=True, data=data.model_dump())
 
@@ -1,12 +1,17 @@
 from __future__ import annotations
 
 import json
+import threading
+import time
+from dataclasses import dataclass
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException
 
+from ..config import load_settings
 from ..db import db_conn, execute, fetch_all, fetch_one, json_dumps, json_loads
 from ..schemas import ApiResponse, ChatbotSettingsOut, ChatbotSettingsUpdate, UserOut
+from ..services.decision_cache import invalidate_decision_cache
 from .auth import get_current_user
 
 router = APIRouter(prefix="/api/admin/chatbot", tags=["chatbot"])
@@ -28,12 +33,31 @@ def _require_admin(user: UserOut) -> None:
         raise HTTPException(status_code=403, detail="관리자만 접근할 수 있습니다.")
 
 
-def get_settings_map(conn) -> dict[str, Any]:
+# 설정은 고객 메시지마다 읽히므로 프로세스 메모리에 캐시한다.
+# - chatbot_settings의 '_version' 행을 저장할 때마다 1씩 올리고, 캐시는 이 값만 주기적으로 확인한다.
+# - 이 프로세스에서 저장하면 즉시 무효화하고, 다른 프로세스는 settings_cache_poll_seconds 안에 따라온다.
+SETTINGS_VERSION_KEY = "_version"
+
+
+@dataclass
+class _SettingsSnapshot:
+    version: int
+    data: dict[str, Any]
+    checked_at: float
+
+
+_settings_cache: _SettingsSnapshot | None = None
+_settings_lock = threading.Lock()
+
+
+def _load_settings_map(conn) -> dict[str, Any]:
     rows = fetch_all(conn, "SELECT setting_key, setting_value FROM chatbot_settings", ())
     data: dict[str, Any] = dict(DEFAULT_SETTINGS)
     for r in rows:
         key = r["setting_key"]
         val = r["setting_value"]
+        if key == SETTINGS_VERSION_KEY:
+            continue
         if key in ("categories",):
             data[key] = json_loads(val) or DEFAULT_SETTINGS[key]
         elif key in ("response_wait_time",):
@@ -48,6 +72,57 @@ def get_settings_map(conn) -> dict[str, Any]:
     return data
 
 
+def _read_settings_version(conn) -> int:
+    row = fetch_one(conn, "SELECT setting_value FROM chatbot_settings WHERE setting_key=%s", (SETTINGS_VERSION_KEY,))
+    try:
+        return int((row or {}).get("setting_value") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _copy_settings(data: dict[str, Any]) -> dict[str, Any]:
+    out = dict(data)
+    if isinstance(out.get("categories"), list):
+        out["categories"] = list(out["categories"])
+    return out
+
+
+def get_settings_map(conn, *, fresh: bool = False) -> dict[str, Any]:
+    """
+    챗봇 설정(dict 복사본). 기본은 캐시를 쓰고, 버전 확인 주기가 지났을 때만 버전 행 하나를 조회한다.
+    fresh=True면 캐시를 건너뛰고 DB에서 다시 읽는다(설정 저장 시 read-modify-write 용).
+    """
+    global _settings_cache
+    snap = _settings_cache
+    now = time.monotonic()
+    if not fresh and snap is not None and now - snap.checked_at < load_settings().settings_cache_poll_seconds:
+        return _copy_settings(snap.data)
+
+    version = _read_settings_version(conn)
+    if not fresh and snap is not None and snap.version == version:
+        snap.checked_at = now
+        return _copy_settings(snap.data)
+
+    data = _load_settings_map(conn)
+    with _settings_lock:
+        if _settings_cache is None or _settings_cache.version <= version:
+            _settings_cache = _SettingsSnapshot(version=version, data=data, checked_at=now)
+    return _copy_settings(data)
+
+
+def get_settings_version(conn) -> int:
+    """현재 설정 버전(get_settings_map과 같은 주기로 확인한다). 설정에 의존하는 캐시의 키로 쓴다."""
+    get_settings_map(conn)
+    snap = _settings_cache
+    return snap.version if snap is not None else _read_settings_version(conn)
+
+
+def invalidate_settings_cache() -> None:
+    global _settings_cache
+    with _settings_lock:
+        _settings_cache = None
+
+
 def _upsert_setting(conn, key: str, value: str, updated_by: str | None) -> None:
     exists = fetch_one(conn, "SELECT id FROM chatbot_settings WHERE setting_key=%s", (key,))
     if exists:
@@ -77,7 +152,7 @@ def get_settings(current_user: UserOut = Depends(get_current_user)) -> ApiRespon
 def update_settings(payload: ChatbotSettingsUpdate, current_user: UserOut = Depends(get_current_user)) -> ApiResponse:
     _require_admin(current_user)
     with db_conn() as conn:
-        current = get_settings_map(conn)
+        current = get_settings_map(conn, fresh=True)
 
         greeting = payload.greeting if payload.greeting is not None else current.get("greeting")
         farewell = payload.farewell if payload.farewell is not None else current.get("farewell")
@@ -112,4 +187,13 @@ def update_settings(payload: ChatbotSettingsUpdate, current_user: UserOut = Depe
         _upsert_setting(conn, "human_intervention_rules", human_rules, current_user.id)
         _upsert_setting(conn, "response_wait_time", str(wait_time_int), current_user.id)
         _upsert_setting(conn, "auto_close", "true" if auto_close_bool else "false", current_user.id)
+        execute(
+            conn,
+            "INSERT INTO chatbot_settings (setting_key, setting_value, updated_by) VALUES (%s,'1',%s) "
+            "ON DUPLICATE KEY UPDATE setting_value=CAST(setting_value AS UNSIGNED)+1, updated_by=VALUES(updated_by)",
+            (SETTINGS_VERSION_KEY, current_user.id),
+        )
+    invalidate_settings_cache()
+    # 정책/카테고리가 바뀌면 이전 설정으로 만든 AI 판단 캐시는 쓰지 않는다.
+    invalidate_decision_cache()
     return ApiResponse(success=True, message="설정이 저장되었습니다.")
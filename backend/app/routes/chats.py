@@ -1,16 +1,19 @@
 from __future__ import annotations
 
+import functools
 import os
 import uuid
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, Request
 
+from .. import db_async as adb
 from ..db import db_conn, execute, fetch_all, fetch_one, json_dumps, json_loads, utc_now
 from ..schemas import ApiResponse, MessageOut, SendMessageRequest, SessionOut, UserOut
-from ..services.chat_ai import decide_ai_reply
-from ..services.chat_summary import build_completed_summary_text, build_pending_summary_text
-from ..ws import manager
+from ..services.message_seq import next_message_seq
+from ..services.reply_worker import enqueue_reply_job, submit_reply_job
+from ..services.session_cache import record_message
+from ..ws import manager, session_topic
 from .auth import get_current_user
 from .chatbot import get_settings_map
 
@@ -37,6 +40,7 @@ def _to_message_out(row: dict) -> MessageOut:
     return MessageOut(
         id=row["id"],
         session_id=row.get("session_id"),
+        seq=row.get("seq"),
         sender_type=row["sender_type"],
         sender_id=row.get("sender_id"),
         content=row["content"],
@@ -46,6 +50,43 @@ def _to_message_out(row: dict) -> MessageOut:
     )
 
 
+MAX_MESSAGE_PAGE = 500
+
+
+def _fetch_messages_page(
+    conn,
+    session_id: str,
+    *,
+    after: int | None = None,
+    before: int | None = None,
+    limit: int | None = None,
+) -> tuple[list[dict], bool]:
+    """
+    세션 메시지를 seq 순서로 돌려준다. (rows, has_more)
+    - after: 그 이후의 새 메시지(재연결 후 증분 동기화). has_more는 더 새 메시지가 남았는지.
+    - before: 그 이전 메시지 중 최신 limit개(위로 스크롤). has_more는 더 오래된 메시지가 남았는지.
+    - 둘 다 없으면 limit이 있을 때 최신 limit개, 없으면 전체.
+    """
+    if limit is not None:
+        limit = max(1, min(int(limit), MAX_MESSAGE_PAGE))
+    if after is not None:
+        sql = "SELECT * FROM messages WHERE session_id=%s AND seq > %s ORDER BY seq ASC"
+        params: tuple = (session_id, after)
+        if limit is None:
+            return fetch_all(conn, sql, params), False
+        rows = fetch_all(conn, sql + " LIMIT %s", (*params, limit + 1))
+        return rows[:limit], len(rows) > limit
+    if before is None and limit is None:
+        return fetch_all(conn, "SELECT * FROM messages WHERE session_id=%s ORDER BY seq ASC", (session_id,)), False
+
+    where = "session_id=%s" + (" AND seq < %s" if before is not None else "")
+    params = (session_id, before) if before is not None else (session_id,)
+    page = limit or MAX_MESSAGE_PAGE
+    rows = fetch_all(conn, f"SELECT * FROM messages WHERE {where} ORDER BY seq DESC LIMIT %s", (*params, page + 1))
+    has_more = len(rows) > page
+    return list(reversed(rows[:page])), has_more
+
+
 def _to_session_out(row: dict) -> SessionOut:
     started_at = row.get("started_at")
     if isinstance(started_at, datetime) and started_at.tzinfo is None:
@@ -71,8 +112,8 @@ async def upload_file(
     if not file.filename:
         raise HTTPException(status_code=400, detail="파일명이 비어 있습니다.")
 
-    with db_conn() as conn:
-        session = fetch_one(conn, "SELECT * FROM chat_sessions WHERE id=%s", (session_id,))
+    async with adb.db_conn() as conn:
+        session = await adb.fetch_one(conn, "SELECT * FROM chat_sessions WHERE id=%s", (session_id,))
         if not session:
             raise HTTPException(status_code=404, detail="세션을 찾을 수 없습니다.")
         if current_user.role == "customer" and session["customer_id"] != current_user.id:
@@ -120,65 +161,66 @@ async def upload_file(
 
 
 @router.get("/session", response_model=ApiResponse)
-async def get_or_create_session(current_user: UserOut = Depends(get_current_user)) -> ApiResponse:
+async def get_or_create_session(limit: int | None = None, current_user: UserOut = Depends(get_current_user)) -> ApiResponse:
     if current_user.role != "customer":
         raise HTTPException(status_code=403, detail="고객만 접근할 수 있습니다.")
 
-    with db_conn() as conn:
-        session = fetch_one(
+    async with adb.db_conn() as conn:
+        session = await adb.fetch_one(
             conn,
             "SELECT * FROM chat_sessions WHERE customer_id=%s AND status IN ('active','pending') ORDER BY started_at DESC LIMIT 1",
             (current_user.id,),
         )
         if session:
-            messages = fetch_all(
-                conn,
-                "SELECT * FROM messages WHERE session_id=%s ORDER BY created_at ASC",
-                (session["id"],),
+            messages, has_more = await adb.run_in_db(
+                functools.partial(_fetch_messages_page, conn, session["id"], limit=limit)
             )
             return ApiResponse(
                 success=True,
                 data={
                     "session": _to_session_out(session).model_dump(),
                     "messages": [_to_message_out(m).model_dump() for m in messages],
+                    "has_more": has_more,
                 },
             )
 
         session_id = uuid.uuid4().hex
         now = utc_now()
-        execute(
+        await adb.execute(
             conn,
             "INSERT INTO chat_sessions (id, customer_id, status, handler_type, started_at) VALUES (%s,%s,'active','ai',%s)",
             (session_id, current_user.id, now),
         )
-        execute(
+        await adb.execute(
             conn,
             "INSERT INTO chat_session_metadata (session_id, unread_count, last_message, last_message_at, priority, wait_time_minutes) VALUES (%s,0,NULL,NULL,'medium',0)",
             (session_id,),
         )
 
-        settings = get_settings_map(conn)
+        settings = await adb.run_in_db(get_settings_map, conn)
         greeting = settings.get("greeting") or "안녕하세요! 채팅 상담 서비스입니다. 무엇을 도와드릴까요?"
         msg_id = uuid.uuid4().hex
-        execute(
+        seq = await adb.run_in_db(next_message_seq, conn, session_id)
+        await adb.execute(
             conn,
-            "INSERT INTO messages (id, session_id, sender_type, sender_id, content, attachments, is_read, created_at) VALUES (%s,%s,'ai',NULL,%s,NULL,TRUE,%s)",
-            (msg_id, session_id, greeting, now),
+            "INSERT INTO messages (id, session_id, seq, sender_type, sender_id, content, attachments, is_read, created_at) VALUES (%s,%s,%s,'ai',NULL,%s,NULL,TRUE,%s)",
+            (msg_id, session_id, seq, greeting, now),
         )
-        execute(
+        await adb.execute(
             conn,
             "UPDATE chat_session_metadata SET last_message=%s, last_message_at=%s WHERE session_id=%s",
             (greeting, now, session_id),
         )
 
-        session_row = fetch_one(conn, "SELECT * FROM chat_sessions WHERE id=%s", (session_id,))
-        messages = fetch_all(conn, "SELECT * FROM messages WHERE session_id=%s ORDER BY created_at ASC", (session_id,))
+        session_row = await adb.fetch_one(conn, "SELECT * FROM chat_sessions WHERE id=%s", (session_id,))
+        messages = await adb.fetch_all(conn, "SELECT * FROM messages WHERE session_id=%s ORDER BY seq ASC", (session_id,))
 
     return ApiResponse(
         success=True,
         data={
             "session": _to_session_out(session_row).model_dump() if session_row else {"id": session_id},
             "messages": [_to_message_out(m).model_dump() for m in messages],
+            "has_more": False,
         },
     )
 
@@ -189,8 +231,10 @@ async def send_message(req: SendMessageRequest, current_user: UserOut = Depends(
     if not content:
         return ApiResponse(success=False, message="메시지 내용이 비어있습니다.")
 
-    with db_conn() as conn:
-        session = fetch_one(conn, "SELECT * FROM chat_sessions WHERE id=%s", (req.session_id,))
+    # 메시지 저장 + (필요 시) AI 응답 작업 등록까지 한 트랜잭션으로 커밋하고 바로 응답한다.
+    # AI 응답은 reply_worker가 생성해 WebSocket(new_message)으로 전달한다.
+    async with adb.db_conn() as conn:
+        session = await adb.fetch_one(conn, "SELECT * FROM chat_sessions WHERE id=%s", (req.session_id,))
         if not session:
             return ApiResponse(success=False, message="세션을 찾을 수 없습니다.")
 
@@ -200,197 +244,86 @@ async def send_message(req: SendMessageRequest, current_user: UserOut = Depends(
         sender_type = "user" if current_user.role == "customer" else "agent"
         msg_id = uuid.uuid4().hex
         now = utc_now()
-        execute(
+        attachments = json_dumps(req.attachments or []) if req.attachments is not None else None
+        seq = await adb.run_in_db(next_message_seq, conn, req.session_id)
+        await adb.execute(
             conn,
-            "INSERT INTO messages (id, session_id, sender_type, sender_id, content, attachments, is_read, created_at) VALUES (%s,%s,%s,%s,%s,%s,FALSE,%s)",
+            "INSERT INTO messages (id, session_id, seq, sender_type, sender_id, content, attachments, is_read, created_at) VALUES (%s,%s,%s,%s,%s,%s,%s,FALSE,%s)",
             (
                 msg_id,
                 req.session_id,
+                seq,
                 sender_type,
                 current_user.id,
                 content,
-                json_dumps(req.attachments or []) if req.attachments is not None else None,
+                attachments,
                 now,
             ),
         )
-        execute(
-            conn,
-            "UPDATE chat_session_metadata SET last_message=%s, last_message_at=%s WHERE session_id=%s",
-            (content, now, req.session_id),
-        )
-        if sender_type == "user":
-            execute(
-                conn,
-                "UPDATE chat_session_metadata SET unread_count = unread_count + 1 WHERE session_id=%s",
-                (req.session_id,),
-            )
-
-        message_row = fetch_one(conn, "SELECT * FROM messages WHERE id=%s", (msg_id,))
-        message_out = _to_message_out(message_row).model_dump() if message_row else {"id": msg_id, "content": content}
-
-        await manager.send_to_user(session["customer_id"], {"type": "new_message", "data": {"message": message_out}})
-        await manager.broadcast_to_admins(
-            {"type": "new_message", "data": {"session_id": req.session_id, "message": message_out}},
-            require_subscription=session["status"],
-        )
+        # 메타데이터 갱신은 한 번의 UPDATE로 끝낸다. 고객 메시지면 증가한 unread_count를 LAST_INSERT_ID로 받아
+        # 다시 SELECT하지 않는다.
+        unread_count = 0
         if sender_type == "user":
-            await manager.broadcast_to_admins(
-                {"type": "customer_message", "data": {"session_id": req.session_id, "message": message_out}},
-                require_subscription=session["status"],
-            )
-            meta = fetch_one(conn, "SELECT unread_count FROM chat_session_metadata WHERE session_id=%s", (req.session_id,))
-            await manager.broadcast_to_admins(
-                {"type": "unread_count_updated", "data": {"session_id": req.session_id, "unread_count": int((meta or {}).get('unread_count') or 0)}},
-                require_subscription=session["status"],
-            )
-
-        if sender_type == "agent":
-            # 상담원 메시지는 여기서 종료
-            return ApiResponse(success=True, data={"message": message_out})
-
-        # pending/completed 상태에서는 AI가 추가 응답하지 않는다(사람/처리 대기 흐름 유지).
-        if session["handler_type"] == "agent" or session["status"] != "active":
-            return ApiResponse(success=True, data={"message": message_out})
-
-        settings = get_settings_map(conn)
-        conversation_rows = fetch_all(
-            conn,
-            "SELECT sender_type, content, created_at FROM messages WHERE session_id=%s ORDER BY created_at ASC",
-            (req.session_id,),
-        )
-        admin_instruction_row = fetch_one(
-            conn,
-            "SELECT content FROM messages WHERE session_id=%s AND sender_type='agent' ORDER BY created_at DESC LIMIT 1",
-            (req.session_id,),
-        )
-        admin_instruction = (admin_instruction_row or {}).get("content")
-        customer_profile = ""
-        try:
-            user_row = fetch_one(conn, "SELECT email, name FROM users WHERE id=%s", (session.get("customer_id"),))
-            if user_row:
-                customer_profile = f"id={session.get('customer_id')}, email={user_row.get('email')}, name={user_row.get('name')}"
-        except Exception:
-            customer_profile = f"id={session.get('customer_id')}"
-
-        decision = await decide_ai_reply(
-            session_id=req.session_id,
-            user_message=content,
-            conversation_rows=conversation_rows,
-            current_category=session.get("category"),
-            settings=settings,
-            customer_id=session.get("customer_id"),
-            customer_profile=customer_profile,
-            admin_instruction=admin_instruction,
-        )
-
-        if decision.category and decision.category != session.get("category"):
-            execute(conn, "UPDATE chat_sessions SET category=%s WHERE id=%s", (decision.category, req.session_id))
-
-        next_admin_bucket = "active"
-        if decision.needs_human and session["status"] != "pending":
-            execute(
-                conn,
-                "UPDATE chat_sessions SET status='pending', pending_at=%s WHERE id=%s",
-                (now, req.session_id),
-            )
-            next_admin_bucket = "pending"
-            # pending 요약은 항상 별도 요약기로 생성(모델이 summary에 'pending' 같은 값을 넣는 경우 방지)
-            try:
-                pending_summary = await build_pending_summary_text(req.session_id, latest_user_message=content)
-            except Exception:
-                pending_summary = ""
-            if pending_summary:
-                execute(conn, "UPDATE chat_sessions SET summary=%s WHERE id=%s", (pending_summary, req.session_id))
-            await manager.broadcast_to_admins(
-                {
-                    "type": "session_status_changed",
-                    "data": {"session_id": req.session_id, "status": "pending", "handler_type": "ai"},
-                }
-            )
-            customer = fetch_one(conn, "SELECT email FROM users WHERE id=%s", (session["customer_id"],))
-            await manager.broadcast_to_admins(
-                {
-                    "type": "new_chat_session",
-                    "data": {
-                        "session": {
-                            "id": req.session_id,
-                            "customer_name": (customer or {}).get("email"),
-                            "category": decision.category,
-                            "started_at": _dt_to_iso(session.get("started_at")),
-                        }
-                    },
-                },
-                require_subscription="pending",
-            )
-
-        # AI가 종료를 판단한 경우: 종료 멘트 + 세션 완료 처리(고객 입력 잠금/자동 로그아웃 UX 트리거)
-        if decision.complete:
-            completed_summary = (decision.summary or "").strip()
-            if not completed_summary:
-                try:
-                    completed_summary = await build_completed_summary_text(req.session_id)
-                except Exception:
-                    completed_summary = ""
-
-            started_at = session.get("started_at")
-            duration = 0
-            if started_at:
-                now_naive = now.astimezone(timezone.utc).replace(tzinfo=None) if now.tzinfo is not None else now
-                started_at_naive = (
-                    started_at.astimezone(timezone.utc).replace(tzinfo=None) if started_at.tzinfo is not None else started_at
-                )
-                duration = int((now_naive - started_at_naive).total_seconds() // 60)
-
-            execute(
-                conn,
-                "UPDATE chat_sessions SET status='completed', completed_at=%s, duration_minutes=%s, summary=%s WHERE id=%s",
-                (now, duration, completed_summary or None, req.session_id),
-            )
-
-            ai_msg_id = uuid.uuid4().hex
-            execute(
+            unread_count = await adb.execute_insert_id(
                 conn,
-                "INSERT INTO messages (id, session_id, sender_type, sender_id, content, attachments, is_read, created_at) VALUES (%s,%s,'ai',NULL,%s,NULL,TRUE,%s)",
-                (ai_msg_id, req.session_id, decision.response, now),
+                "UPDATE chat_session_metadata SET last_message=%s, last_message_at=%s, "
+                "unread_count=LAST_INSERT_ID(unread_count + 1) WHERE session_id=%s",
+                (content, now, req.session_id),
             )
-            execute(
+        else:
+            await adb.execute(
                 conn,
                 "UPDATE chat_session_metadata SET last_message=%s, last_message_at=%s WHERE session_id=%s",
-                (decision.response, now, req.session_id),
+                (content, now, req.session_id),
             )
-            await manager.send_to_user(
-                session["customer_id"],
-                {"type": "session_completed", "data": {"session_id": req.session_id, "message": decision.response}},
-            )
-            await manager.broadcast_to_admins(
-                {"type": "session_status_changed", "data": {"session_id": req.session_id, "status": "completed", "handler_type": "ai"}}
-            )
-            return ApiResponse(success=True, data={"message": message_out})
 
-        ai_msg_id = uuid.uuid4().hex
-        execute(
-            conn,
-            "INSERT INTO messages (id, session_id, sender_type, sender_id, content, attachments, is_read, created_at) VALUES (%s,%s,'ai',NULL,%s,NULL,TRUE,%s)",
-            (ai_msg_id, req.session_id, decision.response, now),
+        # 방금 넣은 값으로 메시지 행을 만든다(다시 SELECT하지 않는다).
+        message_row = {
+            "id": msg_id,
+            "session_id": req.session_id,
+            "seq": seq,
+            "sender_type": sender_type,
+            "sender_id": current_user.id,
+            "content": content,
+            "attachments": attachments,
+            "is_read": False,
+            "created_at": now,
+        }
+        message_out = _to_message_out(message_row).model_dump()
+
+        # pending/completed 상태에서는 AI가 추가 응답하지 않는다(사람/처리 대기 흐름 유지).
+        needs_ai = sender_type == "user" and session["handler_type"] != "agent" and session["status"] == "active"
+        if needs_ai:
+            await enqueue_reply_job(conn, req.session_id, msg_id)
+
+    # 워커가 DB를 다시 읽지 않도록 커밋된 메시지를 세션 캐시에 먼저 반영한다.
+    record_message(req.session_id, message_row)
+    if needs_ai:
+        submit_reply_job(req.session_id)
+
+    await manager.send_to_user(session["customer_id"], {"type": "new_message", "data": {"message": message_out}})
+    # 메시지 본문은 이 세션을 열어 둔 관리자에게만, 상태 목록 구독자에게는 미리보기만 보낸다.
+    await manager.publish_message(req.session_id, message_out, bucket=session["status"])
+    if sender_type == "user":
+        await manager.publish(
+            [session_topic(req.session_id)],
+            {"type": "customer_message", "data": {"session_id": req.session_id, "message": message_out}},
         )
-        execute(
-            conn,
-            "UPDATE chat_session_metadata SET last_message=%s, last_message_at=%s WHERE session_id=%s",
-            (decision.response, now, req.session_id),
+        await manager.broadcast_to_admins(
+            {"type": "unread_count_updated", "data": {"session_id": req.session_id, "unread_count": unread_count}},
+            require_subscription=session["status"],
         )
-        ai_row = fetch_one(conn, "SELECT * FROM messages WHERE id=%s", (ai_msg_id,))
-        ai_out = _to_message_out(ai_row).model_dump() if ai_row else {"id": ai_msg_id, "content": decision.response}
-
-    await manager.send_to_user(session["customer_id"], {"type": "new_message", "data": {"message": ai_out}})
-    await manager.broadcast_to_admins(
-        {"type": "new_message", "data": {"session_id": req.session_id, "message": ai_out}},
-        require_subscription=next_admin_bucket,
-    )
     return ApiResponse(success=True, data={"message": message_out})
 
 
 @router.get("/messages/{session_id}", response_model=ApiResponse)
-def list_messages(session_id: str, current_user: UserOut = Depends(get_current_user)) -> ApiResponse:
+def list_messages(
+    session_id: str,
+    after: int | None = None,
+    before: int | None = None,
+    limit: int | None = None,
+    current_user: UserOut = Depends(get_current_user),
+) -> ApiResponse:
     with db_conn() as conn:
         session = fetch_one(conn, "SELECT * FROM chat_sessions WHERE id=%s", (session_id,))
         if not session:
@@ -400,5 +333,8 @@ def list_messages(session_id: str, current_user: UserOut = Depends(get_current_u
         if current_user.role == "admin":
             execute(conn, "UPDATE chat_session_metadata SET unread_count=0 WHERE session_id=%s", (session_id,))
             execute(conn, "UPDATE messages SET is_read=TRUE WHERE session_id=%s AND sender_type='user'", (session_id,))
-        messages = fetch_all(conn, "SELECT * FROM messages WHERE session_id=%s ORDER BY created_at ASC", (session_id,))
-        return ApiResponse(success=True, data={"messages": [_to_message_out(m).model_dump() for m in messages]})
+        messages, has_more = _fetch_messages_page(conn, session_id, after=after, before=before, limit=limit)
+        return ApiResponse(
+            success=True,
+            data={"messages": [_to_message_out(m).model_dump() for m in messages], "has_more": has_more},
+        )
@@ -39,6 +39,7 @@ class SendMessageRequest(BaseModel):
 class MessageOut(BaseModel):
     id: str
     session_id: str | None = None
+    seq: int | None = None  # 세션 내 순번(증분 동기화 커서)
     sender_type: Literal["user", "ai", "agent"]
     sender_id: str | None = None
     content: str
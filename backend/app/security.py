@@ -41,7 +41,7 @@ def verify_password(password: str, stored: str) -> bool:
     return hmac.compare_digest(dk, expected)
 
 
-def create_access_token(*, user_id: str, role: str, email: str) -> str:
+def create_access_token(*, user_id: str, role: str, email: str, name: str | None = None) -> str:
     settings = load_settings()
     now = datetime.now(timezone.utc)
     exp = now + timedelta(minutes=settings.jwt_expires_minutes)
@@ -49,6 +49,7 @@ def create_access_token(*, user_id: str, role: str, email: str) -> str:
         "sub": user_id,
         "role": role,
         "email": email,
+        "name": name,
         "iat": int(now.timestamp()),
         "exp": int(exp.timestamp()),
     }
@@ -1,17 +1,32 @@
 from __future__ import annotations
 
-import asyncio
 import json
 import logging
 import os
 import re
+from collections.abc import Awaitable, Callable
 from dataclasses import dataclass
 from typing import Any
 from datetime import datetime
 
-from ..db import db_conn, fetch_all, fetch_one
+from ..config import load_settings
+from ..db import fetch_all, fetch_one
 from .ai import AiResult, process_message
-from .gpt_client import GptError, ToolCall, call_gpt_with_tools, parse_json_from_model
+from .context_window import ContextWindow, build_context_window, estimate_tokens
+from .decision_cache import get_decision_cache
+from .gpt_client import (
+    GptError,
+    GptToolResponse,
+    JsonFieldStreamer,
+    ToolCall,
+    call_gpt_with_tools_async,
+    call_gpt_with_tools_stream_async,
+    parse_json_from_model,
+)
+from .tool_executor import ToolExecutor
+
+# (delta, reset): reset=True면 이전에 보낸 조각을 버리고 delta부터 다시 그린다(도구 호출 후 재생성 등).
+ResponseDeltaCallback = Callable[[str, bool], Awaitable[None]]
 
 
 @dataclass(frozen=True)
@@ -23,6 +38,7 @@ class ChatAiDecision:
     reason: str | None = None
     complete: bool = False
     summary: str | None = None
+    action_items: tuple[str, ...] = ()
 
 
 def _logger() -> logging.Logger:
@@ -96,6 +112,64 @@ def _user_says_no_more(conversation_rows: list[dict[str, Any]]) -> bool:
     return any(re.search(pat, last_user) for pat in negative_patterns)
 
 
+_GREETING_ONLY_RE = re.compile(
+    r"(네|넵|저기요|여보세요)?(안녕(하세요|하십니까|하신가요)?|반갑습니다|하이|헬로|hi|hello|hey)(요)?"
+)
+_GREETING_STRIP_RE = re.compile(r"[\s\.,!\?~…^;:'\"ㅎㅋ]+")
+_GREETING_REPLY = "네, 안녕하세요! 어떤 점을 도와드릴까요?"
+
+# GPT 호출 없이 규칙으로 확정한 횟수(/health/db에 노출).
+_pre_decision_stats: dict[str, int] = {"evaluated": 0, "skipped_farewell": 0, "skipped_greeting": 0, "model_calls": 0}
+
+
+def pre_decision_stats() -> dict[str, Any]:
+    out: dict[str, Any] = dict(_pre_decision_stats)
+    out["skipped_total"] = out["skipped_farewell"] + out["skipped_greeting"]
+    return out
+
+
+def _is_greeting_only(text: str) -> bool:
+    return bool(_GREETING_ONLY_RE.fullmatch(_GREETING_STRIP_RE.sub("", text.strip().lower())))
+
+
+def _has_earlier_user_turn(conversation_rows: list[dict[str, Any]], user_message: str) -> bool:
+    user_rows = [r for r in conversation_rows if (r.get("sender_type") or "") == "user"]
+    # worker는 최신 발화를 포함한 rows를 넘기므로 마지막 같은 발화는 제외하고 본다.
+    if user_rows and (user_rows[-1].get("content") or "").strip() == user_message.strip():
+        user_rows = user_rows[:-1]
+    return bool(user_rows)
+
+
+def _decide_without_model(
+    *,
+    user_message: str,
+    conversation_rows: list[dict[str, Any]],
+    conversation_for_reasoning: list[dict[str, Any]],
+    admin_instruction: str | None,
+    farewell: str,
+    auto_close: bool,
+) -> ChatAiDecision | None:
+    """
+    결과가 규칙으로 이미 정해지는 경우 GPT를 호출하지 않고 결정을 돌려준다(아니면 None).
+    - 고객이 더 문의할 것이 없다고 하면: GPT 결과와 무관하게 종료 멘트로 대체되므로 바로 종료 멘트.
+    - 첫 고객 발화가 인사뿐이면: 고정 인사 응답(관리자 지침이 있으면 모델에 맡긴다).
+    """
+    if not load_settings().ai_pre_decision:
+        return None
+    _pre_decision_stats["evaluated"] += 1
+    if _user_says_no_more(conversation_for_reasoning):
+        _pre_decision_stats["skipped_farewell"] += 1
+        return ChatAiDecision(category=None, needs_human=False, response=farewell, complete=auto_close)
+    if (
+        not (admin_instruction or "").strip()
+        and _is_greeting_only(user_message)
+        and not _has_earlier_user_turn(conversation_rows, user_message)
+    ):
+        _pre_decision_stats["skipped_greeting"] += 1
+        return ChatAiDecision(category=None, needs_human=False, response=_GREETING_REPLY)
+    return None
+
+
 def _to_serializable(obj: Any) -> Any:
     """datetime 등을 JSON 직렬화 가능한 값으로 변환한다."""
     if isinstance(obj, datetime):
@@ -107,6 +181,84 @@ def _to_serializable(obj: Any) -> Any:
     return obj
 
 
+# 판단 응답 형식. strict 모드라 모든 필드가 필수이며, 해당 없는 값은 빈 문자열/빈 배열로 받는다.
+# 구조화 출력을 지원하지 않는 모델이면 gpt_client가 response_format을 빼고 다시 보낸다(프롬프트의 스키마로 유도).
+_DECISION_RESPONSE_FORMAT: dict[str, Any] = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "chat_decision",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "category": {"type": "string"},
+                "needs_human": {"type": "boolean"},
+                "response": {"type": "string"},
+                "reason": {"type": "string"},
+                "complete": {"type": "boolean"},
+                "summary": {"type": "string"},
+                "action_items": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["category", "needs_human", "response", "reason", "complete", "summary", "action_items"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+class _ResponseStream:
+    """GPT 호출마다 JSON의 response 필드만 뽑아 콜백으로 흘려보낸다."""
+
+    def __init__(self, callback: ResponseDeltaCallback) -> None:
+        self._callback = callback
+        self._sent_any = False
+
+    def on_delta_for_call(self) -> Callable[[str], Awaitable[None]]:
+        extractor = JsonFieldStreamer("response")
+        started = False
+
+        async def on_delta(chunk: str) -> None:
+            nonlocal started
+            text = extractor.feed(chunk)
+            if not text:
+                return
+            reset = self._sent_any and not started
+            started = True
+            self._sent_any = True
+            await self._callback(text, reset)
+
+        return on_delta
+
+
+async def _call_tools(
+    *,
+    messages: list[dict[str, Any]],
+    tools: list[dict[str, Any]],
+    stream: _ResponseStream | None,
+    tool_choice: str = "auto",
+) -> GptToolResponse:
+    if stream is None:
+        return await call_gpt_with_tools_async(
+            messages=messages,
+            tools=tools,
+            model="gpt-5-mini",
+            max_output_tokens=900,
+            response_format=_DECISION_RESPONSE_FORMAT,
+            tool_choice=tool_choice,
+            parallel_tool_calls=True,
+        )
+    return await call_gpt_with_tools_stream_async(
+        messages=messages,
+        tools=tools,
+        model="gpt-5-mini",
+        on_delta=stream.on_delta_for_call(),
+        max_output_tokens=900,
+        response_format=_DECISION_RESPONSE_FORMAT,
+        tool_choice=tool_choice,
+        parallel_tool_calls=True,
+    )
+
+
 def _tool_defs() -> list[dict[str, Any]]:
     return [
         {
@@ -200,114 +352,165 @@ def _tool_defs() -> list[dict[str, Any]]:
     ]
 
 
-def _run_tool(tc: ToolCall, default_customer_id: str | None) -> dict[str, Any]:
+# 한 라운드에서 실행하는 도구 호출 수 상한(넘는 호출은 버린다).
+_MAX_TOOL_CALLS_PER_ROUND = 8
+
+
+def _run_tool(conn, tc: ToolCall, default_customer_id: str | None) -> dict[str, Any]:
+    """ToolExecutor가 풀 커넥션과 함께 DB executor에서 호출한다."""
     name = tc.name
     args = tc.arguments or {}
     resolved_customer_id = str(args.get("customer_id") or default_customer_id or "").strip()
     if "customer_id" in args and not resolved_customer_id:
         return {"ok": False, "message": "customer_id가 필요합니다."}
 
-    with db_conn() as conn:
-        if name == "get_order_by_number":
-            order_no = str(args.get("order_number") or "").strip()
-            if not order_no:
-                return {"ok": False, "message": "order_number가 비어 있습니다."}
-            row = fetch_one(
-                conn,
-                "SELECT id, order_number, product_name, customer_id, ordered_at, shipping_status, updated_at FROM orders WHERE order_number=%s",
-                (order_no,),
-            )
-            if not row:
-                return {"ok": False, "message": "주문을 찾을 수 없습니다."}
-            return {"ok": True, "order": _to_serializable(row)}
-
-        if name == "list_recent_orders":
-            customer_id = resolved_customer_id
-            limit = args.get("limit")
-            try:
-                limit_int = int(limit)
-            except Exception:
-                limit_int = 5
-            if limit_int <= 0 or limit_int > 20:
-                limit_int = 5
-            if not customer_id:
-                return {"ok": False, "message": "customer_id가 필요합니다."}
-            rows = fetch_all(
-                conn,
-                "SELECT id, order_number, product_name, customer_id, ordered_at, shipping_status, updated_at "
-                "FROM orders WHERE customer_id=%s ORDER BY ordered_at DESC LIMIT %s",
-                (customer_id, limit_int),
-            )
-            return {"ok": True, "orders": _to_serializable(rows)}
-
-        if name == "get_latest_order_summary":
-            customer_id = resolved_customer_id
-            if not customer_id:
-                return {"ok": False, "message": "customer_id가 필요합니다."}
-            row = fetch_one(
-                conn,
-                "SELECT order_number, product_name, shipping_status, ordered_at FROM orders WHERE customer_id=%s ORDER BY ordered_at DESC LIMIT 1",
-                (customer_id,),
-            )
-            if not row:
-                return {"ok": False, "message": "주문을 찾을 수 없습니다."}
-            return {"ok": True, "order": _to_serializable(row)}
-
-        if name == "list_order_numbers":
-            customer_id = resolved_customer_id
-            limit = args.get("limit")
-            try:
-                limit_int = int(limit)
-            except Exception:
-                limit_int = 5
-            if limit_int <= 0 or limit_int > 20:
-                limit_int = 5
-            if not customer_id:
-                return {"ok": False, "message": "customer_id가 필요합니다."}
-            rows = fetch_all(
-                conn,
-                "SELECT order_number, product_name, shipping_status, ordered_at FROM orders WHERE customer_id=%s ORDER BY ordered_at DESC LIMIT %s",
-                (customer_id, limit_int),
-            )
-            return {"ok": True, "orders": _to_serializable(rows)}
-
-        if name == "list_orders_by_status":
-            customer_id = resolved_customer_id
-            status = str(args.get("shipping_status") or "").strip()
-            if status not in ("preparing", "shipped", "delivered", "cancelled"):
-                return {"ok": False, "message": "shipping_status가 올바르지 않습니다."}
-            limit = args.get("limit")
-            try:
-                limit_int = int(limit)
-            except Exception:
-                limit_int = 10
-            if limit_int <= 0 or limit_int > 20:
-                limit_int = 10
-            if not customer_id:
-                return {"ok": False, "message": "customer_id가 필요합니다."}
-            rows = fetch_all(
-                conn,
-                "SELECT order_number, product_name, shipping_status, ordered_at FROM orders WHERE customer_id=%s AND shipping_status=%s "
-                "ORDER BY ordered_at DESC LIMIT %s",
-                (customer_id, status, limit_int),
-            )
-            return {"ok": True, "orders": _to_serializable(rows)}
-
-        if name == "get_shipping_status_counts":
-            customer_id = resolved_customer_id
-            if not customer_id:
-                return {"ok": False, "message": "customer_id가 필요합니다."}
-            rows = fetch_all(
-                conn,
-                "SELECT shipping_status, COUNT(*) AS count FROM orders WHERE customer_id=%s GROUP BY shipping_status",
-                (customer_id,),
-            )
-            counts = {r["shipping_status"]: int(r["count"]) for r in rows}
-            return {"ok": True, "counts": counts}
+    if name == "get_order_by_number":
+        order_no = str(args.get("order_number") or "").strip()
+        if not order_no:
+            return {"ok": False, "message": "order_number가 비어 있습니다."}
+        row = fetch_one(
+            conn,
+            "SELECT id, order_number, product_name, customer_id, ordered_at, shipping_status, updated_at FROM orders WHERE order_number=%s",
+            (order_no,),
+        )
+        if not row:
+            return {"ok": False, "message": "주문을 찾을 수 없습니다."}
+        return {"ok": True, "order": _to_serializable(row)}
+
+    if name == "list_recent_orders":
+        customer_id = resolved_customer_id
+        limit = args.get("limit")
+        try:
+            limit_int = int(limit)
+        except Exception:
+            limit_int = 5
+        if limit_int <= 0 or limit_int > 20:
+            limit_int = 5
+        if not customer_id:
+            return {"ok": False, "message": "customer_id가 필요합니다."}
+        rows = fetch_all(
+            conn,
+            "SELECT id, order_number, product_name, customer_id, ordered_at, shipping_status, updated_at "
+            "FROM orders WHERE customer_id=%s ORDER BY ordered_at DESC LIMIT %s",
+            (customer_id, limit_int),
+        )
+        return {"ok": True, "orders": _to_serializable(rows)}
+
+    if name == "get_latest_order_summary":
+        customer_id = resolved_customer_id
+        if not customer_id:
+            return {"ok": False, "message": "customer_id가 필요합니다."}
+        row = fetch_one(
+            conn,
+            "SELECT order_number, product_name, shipping_status, ordered_at FROM orders WHERE customer_id=%s ORDER BY ordered_at DESC LIMIT 1",
+            (customer_id,),
+        )
+        if not row:
+            return {"ok": False, "message": "주문을 찾을 수 없습니다."}
+        return {"ok": True, "order": _to_serializable(row)}
+
+    if name == "list_order_numbers":
+        customer_id = resolved_customer_id
+        limit = args.get("limit")
+        try:
+            limit_int = int(limit)
+        except Exception:
+            limit_int = 5
+        if limit_int <= 0 or limit_int > 20:
+            limit_int = 5
+        if not customer_id:
+            return {"ok": False, "message": "customer_id가 필요합니다."}
+        rows = fetch_all(
+            conn,
+            "SELECT order_number, product_name, shipping_status, ordered_at FROM orders WHERE customer_id=%s ORDER BY ordered_at DESC LIMIT %s",
+            (customer_id, limit_int),
+        )
+        return {"ok": True, "orders": _to_serializable(rows)}
+
+    if name == "list_orders_by_status":
+        customer_id = resolved_customer_id
+        status = str(args.get("shipping_status") or "").strip()
+        if status not in ("preparing", "shipped", "delivered", "cancelled"):
+            return {"ok": False, "message": "shipping_status가 올바르지 않습니다."}
+        limit = args.get("limit")
+        try:
+            limit_int = int(limit)
+        except Exception:
+            limit_int = 10
+        if limit_int <= 0 or limit_int > 20:
+            limit_int = 10
+        if not customer_id:
+            return {"ok": False, "message": "customer_id가 필요합니다."}
+        rows = fetch_all(
+            conn,
+            "SELECT order_number, product_name, shipping_status, ordered_at FROM orders WHERE customer_id=%s AND shipping_status=%s "
+            "ORDER BY ordered_at DESC LIMIT %s",
+            (customer_id, status, limit_int),
+        )
+        return {"ok": True, "orders": _to_serializable(rows)}
+
+    if name == "get_shipping_status_counts":
+        customer_id = resolved_customer_id
+        if not customer_id:
+            return {"ok": False, "message": "customer_id가 필요합니다."}
+        rows = fetch_all(
+            conn,
+            "SELECT shipping_status, COUNT(*) AS count FROM orders WHERE customer_id=%s GROUP BY shipping_status",
+            (customer_id,),
+        )
+        counts = {r["shipping_status"]: int(r["count"]) for r in rows}
+        return {"ok": True, "counts": counts}
 
     return {"ok": False, "message": f"알 수 없는 함수 호출: {name}"}
 
 
+async def _ask_model(
+    *,
+    system: str,
+    user: str,
+    customer_id: str | None,
+    stream: _ResponseStream | None,
+) -> tuple[dict[str, Any], bool]:
+    """
+    GPT 판단 JSON과 도구 사용 여부를 돌려준다.
+    도구 호출은 ai_tool_max_rounds번까지 이어서 받고, 마지막 라운드에서는 도구 없이 답하도록 한다.
+    """
+    tools = _tool_defs()
+    max_rounds = max(0, load_settings().ai_tool_max_rounds)
+    executor = ToolExecutor(_run_tool, customer_id)
+    messages: list[dict[str, Any]] = [{"role": "system", "content": system}, {"role": "user", "content": user}]
+    used_tools = False
+    text = ""
+    for round_no in range(max_rounds + 1):
+        final = round_no == max_rounds
+        resp = await _call_tools(messages=messages, tools=tools, stream=stream, tool_choice="none" if final else "auto")
+        text = resp.message_text or text
+        if not resp.tool_calls or final:
+            break
+        used_tools = True
+        calls = resp.tool_calls[:_MAX_TOOL_CALLS_PER_ROUND]
+        results = await executor.run_all(calls)
+        messages.append(
+            {
+                "role": "assistant",
+                "content": resp.message_text or None,
+                "tool_calls": [
+                    {
+                        "id": tc.id,
+                        "type": "function",
+                        "function": {"name": tc.name, "arguments": json.dumps(tc.arguments, ensure_ascii=False)},
+                    }
+                    for tc in calls
+                ],
+            }
+        )
+        messages.extend(
+            {"role": "tool", "tool_call_id": tc.id, "name": tc.name, "content": json.dumps(result, ensure_ascii=False)}
+            for tc, result in zip(calls, results)
+        )
+    return parse_json_from_model(text), used_tools
+
+
 async def decide_ai_reply(
     *,
     session_id: str | None = None,
@@ -318,10 +521,17 @@ async def decide_ai_reply(
     admin_instruction: str | None = None,
     customer_id: str | None = None,
     customer_profile: str | None = None,
+    context: ContextWindow | None = None,
+    on_response_delta: ResponseDeltaCallback | None = None,
 ) -> ChatAiDecision:
     """
     GPT 기반으로 다음 응답/상태 전환을 결정한다.
     - 실패 시 기존 규칙 기반(process_message)으로 fallback.
+    - on_response_delta가 있으면 모델 출력 중 response 필드를 조각 단위로 전달한다(미리보기용).
+      최종 응답은 후처리로 달라질 수 있으므로 호출 측은 반환값으로 초안을 대체해야 한다.
+    - context가 있으면 프롬프트에는 그 요약 + 최근 메시지만 넣는다(없으면 conversation_rows로 바로 만든다).
+      규칙 판단(환불 정보 확보, 종료 의사)은 conversation_rows 전체로 한다.
+    - 규칙만으로 결과가 정해지면(종료 의사, 첫 인사) GPT를 호출하지 않는다.
     """
     categories = settings.get("categories") or ["주문 문의", "환불 요청", "기술 지원", "계정 관리"]
     if not isinstance(categories, list) or not categories:
@@ -338,7 +548,24 @@ async def decide_ai_reply(
     # 최신 사용자 발화를 포함한 리스트를 만들어 모델/판단에 사용한다.
     conversation_for_reasoning = list(conversation_rows)
     conversation_for_reasoning.append({"sender_type": "user", "content": user_message})
-    conversation = _format_conversation(conversation_for_reasoning)
+    decided = _decide_without_model(
+        user_message=user_message,
+        conversation_rows=conversation_rows,
+        conversation_for_reasoning=conversation_for_reasoning,
+        admin_instruction=admin_instruction,
+        farewell=farewell,
+        auto_close=auto_close,
+    )
+    if decided is not None:
+        if _debug_enabled():
+            _logger().info(f"[AI] engine=rule session_id={session_id or ''} complete={decided.complete}")
+        return decided
+
+    if context is None:
+        context = build_context_window(conversation_rows, reserve_tokens=estimate_tokens(user_message))
+    conversation = context.render(
+        _format_conversation([*context.rows, {"sender_type": "user", "content": user_message}])
+    )
 
     system = (
         "너는 한국어 고객 상담 채팅을 처리하는 상담 어시스턴트다.\n"
@@ -363,6 +590,10 @@ async def decide_ai_reply(
         "  정책에 대한 질문이 들어오면, 한 번에 모든 정책을 알려주지 않는다.\n"
         "  auto_close가 true이고 상담이 확실히 마무리된 경우에만 complete=true로 설정한다.\n"
         "  추가로 도울 필요가 없냐고 물어보고 고객이 없다고 했을 때 대화 종료.\n"
+        "- needs_human=true이거나 complete=true이면 summary에 관리자용 요약을 2~3문장으로 쓴다.\n"
+        "  최근 고객 메시지의 구체적 요청/문제를 첫 문장에 넣고, 인사/정책 안내 같은 템플릿 문구는 넣지 않는다.\n"
+        "  action_items에는 관리자가 추가로 확인할 사항을 대화에서 실제로 언급된 것만 적는다(없으면 빈 배열).\n"
+        "  그 외에는 summary는 빈 문자열, action_items는 빈 배열로 둔다.\n"
         "- 출력은 반드시 JSON만. 다른 텍스트 금지.\n"
         "출력 스키마:\n"
         "{\n"
@@ -371,16 +602,27 @@ async def decide_ai_reply(
         '  \"response\": \"고객에게 보낼 응답\",\n'
         '  \"reason\": \"needs_human 판단 이유(선택)\",\n'
         '  \"complete\": true|false,\n'
-        '  \"summary\": \"pending/complete 시 관리자용 요약(선택)\"\n'
+        '  \"summary\": \"pending/complete 시 관리자용 요약(아니면 빈 문자열)\",\n'
+        '  \"action_items\": [\"확인할 것1\"]\n'
         "}\n"
     )
 
+    cache = get_decision_cache()
+    cache_key = cache.make_key(
+        settings=settings,
+        conversation=conversation_for_reasoning,
+        current_category=current_category,
+        admin_instruction=admin_instruction,
+    )
+    # 캐시 대상 턴의 판단은 다른 고객에게도 재사용되므로 고객 정보를 프롬프트에 넣지 않는다.
+    profile_text = "" if cache_key is not None else (customer_profile or "").strip()
+
     user = (
         f"categories: {categories}\n"
         f"current_category: {current_category or ''}\n"
         f"response_guidelines:\n{response_guidelines}\n\n"
         f"human_intervention_rules:\n{human_rules}\n\n"
-        f"customer_profile:\n{(customer_profile or '').strip()}\n\n"
+        f"customer_profile:\n{profile_text}\n\n"
         f"auto_close: {auto_close}\n"
         f"admin_instruction: {(admin_instruction or '').strip()}\n\n"
         f"conversation:\n{conversation}\n\n"
@@ -390,54 +632,22 @@ async def decide_ai_reply(
     try:
         if _debug_enabled():
             _logger().info(f"[AI] engine=gpt request session_id={session_id or ''}")
-        tools = _tool_defs()
-        resp = await asyncio.to_thread(
-            call_gpt_with_tools,
-            messages=[{"role": "system", "content": system}, {"role": "user", "content": user}],
-            tools=tools,
-            model="gpt-5-mini",
-            max_output_tokens=700,
-        )
-
-        if resp.tool_calls:
-            tool_msgs: list[dict[str, Any]] = []
-            for tc in resp.tool_calls:
-                result = _run_tool(tc, customer_id)
-                tool_msgs.append(
-                    {
-                        "role": "tool",
-                        "tool_call_id": tc.id,
-                        "name": tc.name,
-                        "content": json.dumps(result, ensure_ascii=False),
-                    }
-                )
-            follow_messages = [
-                {"role": "system", "content": system},
-                {"role": "user", "content": user},
-                {
-                    "role": "assistant",
-                    "content": resp.message_text or None,
-                    "tool_calls": [
-                        {
-                            "id": tc.id,
-                            "type": "function",
-                            "function": {"name": tc.name, "arguments": json.dumps(tc.arguments, ensure_ascii=False)},
-                        }
-                        for tc in resp.tool_calls
-                    ],
-                },
-                *tool_msgs,
-            ]
-            resp2 = await asyncio.to_thread(
-                call_gpt_with_tools,
-                messages=follow_messages,
-                tools=tools,
-                model="gpt-5-mini",
-                max_output_tokens=700,
-            )
-            data = parse_json_from_model(resp2.message_text or resp.message_text)
+        data = cache.get(cache_key) if cache_key is not None else None
+        if data is not None:
+            if _debug_enabled():
+                _logger().info(f"[AI] engine=cache hit session_id={session_id or ''}")
         else:
-            data = parse_json_from_model(resp.message_text)
+            # 종료 멘트로 대체될 것이 확실하면 초안을 흘려보내지 않는다.
+            stream = (
+                _ResponseStream(on_response_delta)
+                if on_response_delta is not None and not _user_says_no_more(conversation_for_reasoning)
+                else None
+            )
+            _pre_decision_stats["model_calls"] += 1
+            data, used_tools = await _ask_model(system=system, user=user, customer_id=customer_id, stream=stream)
+            # 주문 조회 등 고객별 데이터를 본 응답은 캐시하지 않는다.
+            if cache_key is not None and not used_tools and str(data.get("response") or "").strip():
+                cache.put(cache_key, data)
 
         category_raw = str(data.get("category") or "").strip()
         category = category_raw if category_raw else None
@@ -449,6 +659,8 @@ async def decide_ai_reply(
         reason = str(data.get("reason") or "").strip() or None
         complete = bool(data.get("complete")) if isinstance(data.get("complete"), (bool, int)) else False
         summary = str(data.get("summary") or "").strip() or None
+        items = data.get("action_items") if isinstance(data.get("action_items"), list) else []
+        action_items = tuple(str(x).strip() for x in items if str(x).strip())[:10]
 
         # 관리자 지침이 있으면 재대기시키지 않고 바로 안내하도록 한다.
         if admin_instruction:
@@ -464,6 +676,7 @@ async def decide_ai_reply(
             needs_human = False
             reason = None
             summary = None
+            action_items = ()
             response_text = _strip_wait_message(response_text, response_wait_time)
 
         # 고객이 명확히 “더 이상 없음”을 표현하면 후속 질문 없이 바로 종료 멘트로 마무리
@@ -492,6 +705,7 @@ async def decide_ai_reply(
             reason=reason,
             complete=complete and auto_close,
             summary=summary,
+            action_items=action_items,
         )
     except Exception as e:
         _logger().warning(f"[AI] engine=fallback session_id={session_id or ''} reason={type(e).__name__}: {str(e)[:180]}")
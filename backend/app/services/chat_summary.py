@@ -1,15 +1,15 @@
 from __future__ import annotations
 
-import asyncio
 import logging
 import os
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Any
 
-from ..db import db_conn, fetch_all, fetch_one
+from .. import db_async as adb
 from ..routes.chatbot import get_settings_map
-from .gpt_client import GptError, call_gpt_text, parse_json_from_model
+from .context_window import ContextWindow, build_context_window, estimate_tokens, load_stored_summary
+from .gpt_client import GptError, call_gpt_text_async, parse_json_from_model
 
 
 @dataclass(frozen=True)
@@ -18,6 +18,8 @@ class AdminSummary:
     current_issues: list[str]
     customer_email: str | None
     started_at: str | None
+    # GPT 호출 실패로 마지막 고객 발화 등으로 대신한 요약(캐시하지 않는다).
+    fallback: bool = False
 
 
 def _logger() -> logging.Logger:
@@ -52,6 +54,26 @@ def _format_conversation(rows: list[dict[str, Any]]) -> str:
     return "\n".join(lines).strip()
 
 
+# 모델이 요약 대신 상태값/자리표시자를 넣는 경우(예: "pending")는 요약으로 쓰지 않는다.
+_PLACEHOLDER_SUMMARIES = {"pending", "complete", "completed", "none", "null", "n/a", "-", "요약", "없음"}
+
+
+def format_pending_summary(summary: str | None, action_items: list[str] | tuple[str, ...] = ()) -> str:
+    """처리 대기 요약 + 확인 사항 bullet. 쓸 만한 요약이 아니면 빈 문자열."""
+    summary = (summary or "").strip()
+    if len(summary) < 5 or summary.lower() in _PLACEHOLDER_SUMMARIES:
+        return ""
+    return _with_action_items(summary, action_items)
+
+
+def _with_action_items(summary: str, action_items: list[str] | tuple[str, ...]) -> str:
+    items = [str(x).strip() for x in action_items if str(x).strip()]
+    if items:
+        bullets = "\n".join([f"- {x}" for x in items[:10]])
+        return (summary + "\n" + bullets).strip()
+    return summary
+
+
 def _is_user(sender: str) -> bool:
     s = (sender or "").lower()
     return s in ("user", "customer")
@@ -79,9 +101,23 @@ def _debug_log_rows(session_id: str, rows: list[dict[str, Any]]) -> None:
     _logger().warning(f"[SUMMARY-PENDING-ROWS] session={session_id} rows={preview}")
 
 
+async def _load_conversation(
+    conn, session_id: str, latest_user_message: str | None = None
+) -> tuple[list[dict[str, Any]], ContextWindow]:
+    # 전체 메시지(규칙/fallback용)와 프롬프트에 넣을 맥락(누적 요약 + 최근 메시지)을 함께 돌려준다.
+    rows = await adb.fetch_all(
+        conn,
+        "SELECT seq, sender_type, content, created_at FROM messages WHERE session_id=%s ORDER BY seq ASC",
+        (session_id,),
+    )
+    stored = await load_stored_summary(conn, session_id)
+    window = build_context_window(rows, stored, reserve_tokens=estimate_tokens(latest_user_message or ""))
+    return rows, window
+
+
 async def build_admin_summary(session_id: str, latest_user_message: str | None = None) -> AdminSummary:
-    with db_conn() as conn:
-        session = fetch_one(
+    async with adb.db_conn() as conn:
+        session = await adb.fetch_one(
             conn,
             """
             SELECT s.id, s.customer_id, s.started_at, u.email AS customer_email, s.category
@@ -94,17 +130,14 @@ async def build_admin_summary(session_id: str, latest_user_message: str | None =
         if not session:
             raise ValueError("세션을 찾을 수 없습니다.")
 
-        settings = get_settings_map(conn)
-        rows = fetch_all(
-            conn,
-            "SELECT sender_type, content, created_at FROM messages WHERE session_id=%s ORDER BY created_at ASC",
-            (session_id,),
-        )
+        settings = await adb.run_in_db(get_settings_map, conn)
+        rows, window = await _load_conversation(conn, session_id, latest_user_message)
 
-    conversation = _format_conversation(rows)
+    conversation = _format_conversation(window.rows)
     if latest_user_message and latest_user_message.strip():
         # 대화 목록에 아직 반영되지 않은 최신 사용자 발화를 포함
         conversation = (conversation + f"\n고객: {latest_user_message.strip()}").strip()
+    conversation = window.render(conversation)
     categories = settings.get("categories") or []
     category = session.get("category") or "미분류"
 
@@ -127,8 +160,7 @@ async def build_admin_summary(session_id: str, latest_user_message: str | None =
     try:
         if _debug_enabled():
             _logger().info(f"[SUMMARY] engine=gpt request session_id={session_id}")
-        resp = await asyncio.to_thread(
-            call_gpt_text,
+        resp = await call_gpt_text_async(
             model="gpt-5-mini",
             system=system,
             user=user,
@@ -161,23 +193,28 @@ async def build_admin_summary(session_id: str, latest_user_message: str | None =
             current_issues=[],
             customer_email=session.get("customer_email"),
             started_at=_dt_to_iso(session.get("started_at")),
+            fallback=True,
         )
 
 
-async def build_pending_summary_text(session_id: str, latest_user_message: str | None = None) -> str:
-    with db_conn() as conn:
-        rows = fetch_all(
-            conn,
-            "SELECT sender_type, content, created_at FROM messages WHERE session_id=%s ORDER BY created_at ASC",
-            (session_id,),
-        )
+async def build_pending_summary_text(
+    session_id: str, latest_user_message: str | None = None, *, fallback: bool = True
+) -> str:
+    """
+    판단 응답에 쓸 만한 summary가 없을 때 쓰는 별도 요약기.
+    fallback=False면 GPT 실패 시 대체 문구 대신 예외를 올린다(요약 작업 재시도용).
+    """
+    async with adb.db_conn() as conn:
+        rows, window = await _load_conversation(conn, session_id, latest_user_message)
     _debug_log_rows(session_id, rows)
-    conversation = _format_conversation(rows)
+    conversation = _format_conversation(window.rows)
     if latest_user_message and latest_user_message.strip():
         conversation = (conversation + f"\n고객: {latest_user_message.strip()}").strip()
+    conversation = window.render(conversation)
+    # 오래된 사용자 발화는 누적 요약에 들어 있으므로 맥락 창 안의 발화만 모은다.
     user_only_list = [
         (r.get("content") or "").strip()
-        for r in rows
+        for r in window.rows
         if _is_user(r.get("sender_type") or "") and (r.get("content") or "").strip()
     ]
     if latest_user_message and latest_user_message.strip():
@@ -191,7 +228,7 @@ async def build_pending_summary_text(session_id: str, latest_user_message: str |
     _debug_log_conversation(session_id, conversation, user_only, latest_user or latest_user_message or "")
 
     # 사용자 발화가 전혀 없으면 GPT를 호출하지 않고 안내만 반환
-    if not user_only:
+    if not user_only and not window.summary:
         return "사용자 문의가 아직 입력되지 않았습니다."
 
     system = (
@@ -216,8 +253,7 @@ async def build_pending_summary_text(session_id: str, latest_user_message: str |
     )
 
     try:
-        resp = await asyncio.to_thread(
-            call_gpt_text,
+        resp = await call_gpt_text_async(
             model="gpt-5-mini",
             system=system,
             user=user,
@@ -230,11 +266,10 @@ async def build_pending_summary_text(session_id: str, latest_user_message: str |
         if not summary:
             # summary가 비면 최신 사용자 메시지를 그대로 요약으로 활용
             summary = latest_user or "관리자 확인이 필요합니다."
-        if items_out:
-            bullets = "\n".join([f"- {x}" for x in items_out[:10]])
-            return (summary + "\n" + bullets).strip()
-        return summary
+        return _with_action_items(summary, items_out)
     except Exception:
+        if not fallback:
+            raise
         # fallback: 마지막 고객 메시지
         last_user = ""
         for r in reversed(rows):
@@ -244,15 +279,11 @@ async def build_pending_summary_text(session_id: str, latest_user_message: str |
         return last_user or "관리자 확인이 필요합니다."
 
 
-async def build_completed_summary_text(session_id: str) -> str:
-    with db_conn() as conn:
-        settings = get_settings_map(conn)
-        rows = fetch_all(
-            conn,
-            "SELECT sender_type, content, created_at FROM messages WHERE session_id=%s ORDER BY created_at ASC",
-            (session_id,),
-        )
-    conversation = _format_conversation(rows)
+async def build_completed_summary_text(session_id: str, *, fallback: bool = True) -> str:
+    async with adb.db_conn() as conn:
+        settings = await adb.run_in_db(get_settings_map, conn)
+        _, window = await _load_conversation(conn, session_id)
+    conversation = window.render(_format_conversation(window.rows))
     system = (
         "너는 상담 종료 요약을 작성한다.\n"
         "대화 전체를 보고, 핵심을 3~6줄 내로 요약해라.\n"
@@ -266,8 +297,7 @@ async def build_completed_summary_text(session_id: str) -> str:
     )
 
     try:
-        resp = await asyncio.to_thread(
-            call_gpt_text,
+        resp = await call_gpt_text_async(
             model="gpt-5-mini",
             system=system,
             user=user,
@@ -277,4 +307,6 @@ async def build_completed_summary_text(session_id: str) -> str:
         summary = str(data.get("summary") or "").strip()
         return summary or "상담이 종료되었습니다."
     except Exception:
+        if not fallback:
+            raise
         return "상담이 종료되었습니다."
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import logging
+import unicodedata
+from dataclasses import dataclass
+from typing import Any
+
+from .. import db_async as adb
+from ..config import load_settings
+from .gpt_client import GptError, call_gpt_text_async, parse_json_from_model
+from .workers import KeyedWorkerPool
+
+# 프롬프트에 넣는 대화 맥락의 크기를 제한한다.
+# - 최근 context_recent_messages개 메시지는 그대로 넣는다.
+# - 그보다 오래된 메시지는 세션별 누적 요약(chat_session_metadata.context_summary)으로 대체한다.
+#   요약은 context_summary_seq까지의 메시지를 반영하며, 접히지 않은 오래된 메시지가
+#   context_fold_batch개 이상 쌓이면 백그라운드에서 기존 요약 + 새 메시지로 갱신한다.
+# - 요약이 갱신되기 전까지는 접히지 않은 메시지도 토큰 예산 안에서 그대로 넣는다.
+# - 전체 크기는 context_max_tokens(로컬 추정치) 안으로 맞추고, 넘치면 오래된 메시지부터 뺀다.
+
+_MESSAGE_OVERHEAD_TOKENS = 4
+_SUMMARY_MAX_CHARS = 1200
+
+
+def _logger() -> logging.Logger:
+    return logging.getLogger("uvicorn.error")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토크나이저 없이 쓰는 보수적인 토큰 수 추정.
+    ASCII는 약 4자당 1토큰, 한글 등 그 밖의 문자는 1자당 1토큰으로 센다.
+    """
+    if not text:
+        return 0
+    ascii_chars = 0
+    other = 0
+    for ch in text:
+        if ord(ch) < 128:
+            ascii_chars += 1
+        elif unicodedata.category(ch)[0] != "Z":
+            other += 1
+    return (ascii_chars + 3) // 4 + other
+
+
+def _row_tokens(row: dict[str, Any]) -> int:
+    return estimate_tokens(str(row.get("content") or "")) + _MESSAGE_OVERHEAD_TOKENS
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    # 오래된 쪽(앞)을 자르고 최근 내용(뒤)을 남긴다.
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if estimate_tokens(text[mid:]) + 1 <= max_tokens:
+            hi = mid
+        else:
+            lo = mid + 1
+    return "…" + text[lo:]
+
+
+@dataclass(frozen=True)
+class StoredSummary:
+    text: str
+    seq: int
+
+
+@dataclass(frozen=True)
+class ContextWindow:
+    summary: str
+    rows: list[dict[str, Any]]
+    dropped: int
+    unfolded: int
+    est_tokens: int
+
+    @property
+    def needs_fold(self) -> bool:
+        return self.unfolded >= load_settings().context_fold_batch
+
+    def render(self, conversation: str) -> str:
+        """호출 측에서 rows를 포맷한 대화 문자열 앞에 요약을 붙인다."""
+        if not self.summary:
+            return conversation
+        return f"[이전 대화 요약]\n{self.summary}\n\n[최근 대화]\n{conversation}".strip()
+
+
+def build_context_window(
+    rows: list[dict[str, Any]],
+    stored: StoredSummary | None = None,
+    *,
+    reserve_tokens: int = 0,
+) -> ContextWindow:
+    """
+    rows는 seq 오름차순 메시지(sender_type, content, seq).
+    reserve_tokens는 같은 프롬프트에 함께 들어갈 대화 외 텍스트(정책, 최신 발화 등)의 추정치.
+    """
+    settings = load_settings()
+    recent_n = max(1, settings.context_recent_messages)
+    summary = (stored.text if stored else "").strip()
+    summarized_seq = stored.seq if stored and summary else 0
+
+    # 요약에 이미 반영된 메시지는 제외한다(seq가 없는 행은 남긴다).
+    candidates = [r for r in rows if not summarized_seq or int(r.get("seq") or 0) > summarized_seq]
+    unfolded = max(0, len(candidates) - recent_n)
+
+    budget = max(1, settings.context_max_tokens - reserve_tokens)
+    summary_tokens = estimate_tokens(summary)
+    if summary_tokens > budget // 2:
+        summary = _truncate_to_tokens(summary, budget // 2)
+        summary_tokens = estimate_tokens(summary)
+    remaining = budget - summary_tokens
+
+    # 최근 메시지부터 거꾸로 채운다. 마지막 메시지는 잘라서라도 반드시 넣는다.
+    kept: list[dict[str, Any]] = []
+    used = 0
+    for row in reversed(candidates):
+        cost = _row_tokens(row)
+        if used + cost > remaining:
+            if not kept:
+                content = _truncate_to_tokens(str(row.get("content") or ""), max(1, remaining - _MESSAGE_OVERHEAD_TOKENS))
+                row = {**row, "content": content}
+                kept.append(row)
+                used += _row_tokens(row)
+            break
+        kept.append(row)
+        used += cost
+    kept.reverse()
+
+    return ContextWindow(
+        summary=summary,
+        rows=kept,
+        dropped=len(candidates) - len(kept),
+        unfolded=unfolded,
+        est_tokens=summary_tokens + used,
+    )
+
+
+async def load_stored_summary(conn, session_id: str) -> StoredSummary | None:
+    row = await adb.fetch_one(
+        conn,
+        "SELECT context_summary, context_summary_seq FROM chat_session_metadata WHERE session_id=%s",
+        (session_id,),
+    )
+    if not row or not (row.get("context_summary") or "").strip():
+        return None
+    return StoredSummary(text=str(row["context_summary"]), seq=int(row.get("context_summary_seq") or 0))
+
+
+def _format_for_fold(rows: list[dict[str, Any]]) -> str:
+    lines: list[str] = []
+    for r in rows:
+        prefix = "고객" if (r.get("sender_type") or "") == "user" else "상담"
+        content = (r.get("content") or "").strip()
+        if content:
+            lines.append(f"{prefix}: {content}")
+    return "\n".join(lines)
+
+
+async def fold_context_summary(session_id: str) -> None:
+    """오래된 메시지를 세션 요약에 접어 넣는다(최근 메시지는 남긴다)."""
+    settings = load_settings()
+    recent_n = max(1, settings.context_recent_messages)
+    async with adb.db_conn() as conn:
+        stored = await load_stored_summary(conn, session_id)
+        base_seq = stored.seq if stored else 0
+        rows = await adb.fetch_all(
+            conn,
+            "SELECT seq, sender_type, content FROM messages WHERE session_id=%s AND seq > %s ORDER BY seq ASC",
+            (session_id, base_seq),
+        )
+    to_fold = rows[:-recent_n] if len(rows) > recent_n else []
+    if len(to_fold) < settings.context_fold_batch:
+        return
+
+    # 한 번에 넘기는 새 메시지도 예산 안으로 자른다(남은 부분은 다음 갱신에서 접힌다).
+    budget = max(200, settings.context_max_tokens)
+    batch: list[dict[str, Any]] = []
+    used = 0
+    for r in to_fold:
+        cost = _row_tokens(r)
+        if batch and used + cost > budget:
+            break
+        batch.append(r)
+        used += cost
+    new_seq = int(batch[-1]["seq"])
+
+    system = (
+        "너는 고객 상담 대화의 누적 요약을 관리한다.\n"
+        "기존 요약과 그 이후의 대화를 합쳐 하나의 요약으로 갱신하라.\n"
+        "- 고객의 요청/문제, 확인된 정보(주문번호, 사유, 상품명, 날짜 등), 안내한 내용과 남은 이슈를 빠짐없이 남긴다.\n"
+        "- 인사말/반복 표현은 뺀다.\n"
+        f"- {_SUMMARY_MAX_CHARS}자 이내.\n"
+        "- JSON만 출력.\n"
+        '출력 스키마: { "summary": "갱신된 요약" }\n'
+    )
+    user = f"기존 요약:\n{(stored.text if stored else '') or '(없음)'}\n\n이후 대화:\n{_format_for_fold(batch)}\n"
+    try:
+        resp = await call_gpt_text_async(model="gpt-5-mini", system=system, user=user, max_output_tokens=700)
+        summary = str(parse_json_from_model(resp.output_text).get("summary") or "").strip()
+    except GptError as e:
+        _logger().warning(f"[CONTEXT] fold failed session_id={session_id} reason={str(e)[:180]}")
+        return
+    if not summary:
+        return
+
+    async with adb.db_conn() as conn:
+        # 다른 프로세스가 먼저 갱신했으면 덮어쓰지 않는다.
+        await adb.execute(
+            conn,
+            "UPDATE chat_session_metadata SET context_summary=%s, context_summary_seq=%s "
+            "WHERE session_id=%s AND context_summary_seq=%s",
+            (summary[: _SUMMARY_MAX_CHARS * 2], new_seq, session_id, base_seq),
+        )
+
+
+def schedule_context_fold(session_id: str) -> None:
+    _get_pool().submit(session_id)
+
+
+async def start_context_folder() -> None:
+    await _get_pool().start()
+
+
+async def stop_context_folder() -> None:
+    await _get_pool().stop()
+
+
+def context_folder_stats() -> dict[str, Any]:
+    return _get_pool().stats()
+
+
+_pool: KeyedWorkerPool | None = None
+
+
+def _get_pool() -> KeyedWorkerPool:
+    global _pool
+    if _pool is None:
+        _pool = KeyedWorkerPool("context-fold", fold_context_summary, concurrency=load_settings().context_fold_concurrency)
+    return _pool
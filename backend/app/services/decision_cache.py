@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from typing import Any
+
+from ..cache import TTLCache
+from ..config import load_settings
+
+# 대화 초반의 거의 같은 질문("배송 언제 와요?", "환불 어떻게 하나요?")에 대한 GPT 판단 결과 캐시.
+# - 키: 챗봇 설정 해시 + 현재 카테고리 + 정규화한 대화 전체(최대 decision_cache_max_turns개의 고객 발화).
+# - 1단계는 정확히 일치, 2단계(선택)는 마지막 고객 발화의 문자 n-gram 유사도로 찾는다.
+# - 주문 조회 등 도구를 쓴 응답, 관리자 지침이 있는 대화, 상담원이 개입한 대화는 캐시하지 않는다.
+# - 캐시 대상 턴은 고객 프로필 없이 판단하고(chat_ai), 관리자용 summary/action_items는 저장하지도 돌려주지도 않는다.
+# - 마지막 발화에 숫자/식별자(주문번호, 이메일 등)가 있으면 유사도 단계를 쓰지 않는다("12345"와 "12346"은 다른 질문).
+# - 설정 변경(PUT /api/admin/chatbot/settings) 시 전체를 비운다(설정 해시가 바뀌므로 어차피 일치하지 않는다).
+
+_NGRAM = 2
+_PUNCT_RE = re.compile(r"[\s\.,!\?~…·'\"`ㅠㅜㅋㅎ^;:()\[\]{}<>/\\|*_+=-]+")
+# 정규화 뒤에도 남는 숫자/이메일/해시태그성 문자
+_IDENTIFIER_RE = re.compile(r"[0-9@#]")
+# 대화마다 다른 관리자용 필드
+_UNCACHED_FIELDS = ("summary", "action_items")
+
+
+@dataclass(frozen=True)
+class _Key:
+    settings_hash: str
+    category: str
+    prefix: tuple[tuple[str, str], ...]
+    last_user: str
+
+
+@dataclass(frozen=True)
+class _Entry:
+    data: dict[str, Any]
+    grams: frozenset[str]
+
+
+def settings_fingerprint(settings: dict[str, Any]) -> str:
+    raw = json.dumps(settings, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _normalize(text: str) -> str:
+    # 띄어쓰기/문장부호/이모티콘성 자모 차이는 같은 질문으로 본다.
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return _PUNCT_RE.sub("", text)
+
+
+def _grams(text: str) -> frozenset[str]:
+    if len(text) <= _NGRAM:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i : i + _NGRAM] for i in range(len(text) - _NGRAM + 1))
+
+
+def _shareable(data: dict[str, Any]) -> dict[str, Any]:
+    return {k: v for k, v in data.items() if k not in _UNCACHED_FIELDS}
+
+
+def _similarity(a: frozenset[str], b: frozenset[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class DecisionCache:
+    def __init__(self, *, max_size: int, ttl_seconds: float, max_turns: int, similarity: float) -> None:
+        self._items: TTLCache[_Key, _Entry] = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._max_turns = max_turns
+        self._similarity = similarity
+        self._lock = threading.Lock()
+        self._stats: dict[str, int] = {"exact_hits": 0, "similar_hits": 0, "misses": 0, "stores": 0, "bypassed": 0}
+
+    def make_key(
+        self,
+        *,
+        settings: dict[str, Any],
+        conversation: list[dict[str, Any]],
+        current_category: str | None,
+        admin_instruction: str | None,
+    ) -> _Key | None:
+        """캐시 대상이 아니면 None."""
+        if not self._items.enabled or (admin_instruction or "").strip():
+            self._count("bypassed")
+            return None
+        turns: list[tuple[str, str]] = []
+        for row in conversation:
+            sender = str(row.get("sender_type") or "")
+            if sender == "agent":
+                self._count("bypassed")
+                return None
+            text = _normalize(str(row.get("content") or ""))
+            # worker는 최신 발화를 포함한 rows에 같은 발화를 한 번 더 붙여 넘기므로 연속 중복은 합친다.
+            if turns and turns[-1] == (sender, text):
+                continue
+            turns.append((sender, text))
+        user_turns = sum(1 for sender, _ in turns if sender == "user")
+        if not turns or turns[-1][0] != "user" or not turns[-1][1] or user_turns > self._max_turns:
+            self._count("bypassed")
+            return None
+        return _Key(
+            settings_hash=settings_fingerprint(settings),
+            category=current_category or "",
+            prefix=tuple(turns[:-1]),
+            last_user=turns[-1][1],
+        )
+
+    def get(self, key: _Key) -> dict[str, Any] | None:
+        entry = self._items.get(key)
+        if entry is not None:
+            self._count("exact_hits")
+            return _shareable(entry.data)
+        if self._similarity > 0 and not _IDENTIFIER_RE.search(key.last_user):
+            grams = _grams(key.last_user)
+            best: tuple[float, _Key, _Entry] | None = None
+            for k, e in self._items.items():
+                if (k.settings_hash, k.category, k.prefix) != (key.settings_hash, key.category, key.prefix):
+                    continue
+                score = _similarity(grams, e.grams)
+                if score >= self._similarity and (best is None or score > best[0]):
+                    best = (score, k, e)
+            if best is not None:
+                self._items.touch(best[1])
+                self._count("similar_hits")
+                return _shareable(best[2].data)
+        self._count("misses")
+        return None
+
+    def put(self, key: _Key, data: dict[str, Any]) -> None:
+        self._items.set(key, _Entry(data=_shareable(data), grams=_grams(key.last_user)))
+        self._count("stores")
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            out: dict[str, Any] = dict(self._stats)
+        cache = self._items.stats()
+        out.update({"size": cache["size"], "max_size": cache["max_size"], "similarity": self._similarity})
+        return out
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+
+_cache: DecisionCache | None = None
+
+
+def get_decision_cache() -> DecisionCache:
+    global _cache
+    if _cache is None:
+        settings = load_settings()
+        _cache = DecisionCache(
+            max_size=settings.decision_cache_size,
+            ttl_seconds=settings.decision_cache_ttl_seconds,
+            max_turns=settings.decision_cache_max_turns,
+            similarity=settings.decision_cache_similarity,
+        )
+    return _cache
+
+
+def invalidate_decision_cache() -> None:
+    get_decision_cache().clear()
+
+
+def decision_cache_stats() -> dict[str, Any]:
+    return get_decision_cache().stats()
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+# (base_url, model)별로 "실제로 동작한" 엔드포인트/페이로드 형태/미지원 파라미터를 기억한다.
+# gpt_client는 매 호출마다 400 오류로 재탐색하지 않고 이 정보를 먼저 적용한다.
+# - TTL이 지나면 항목을 버리고 다시 탐색한다(모델/게이트웨이 변경 대응).
+# - GPT_CAPABILITY_CACHE_PATH를 지정하면 JSON 파일로 저장해 재시작 후에도 유지한다.
+
+
+def _logger() -> logging.Logger:
+    return logging.getLogger("uvicorn.error")
+
+
+@dataclass
+class ModelCapability:
+    text_endpoint: str | None = None  # "responses" | "chat"
+    responses_input: str | None = None  # "plain" | "input_text"
+    unsupported: dict[str, list[str]] = field(default_factory=dict)  # api("responses"|"chat") -> 파라미터 목록
+    checked_at: float = 0.0
+
+
+class CapabilityCache:
+    def __init__(self, *, ttl_seconds: float, path: str | None) -> None:
+        self._ttl = ttl_seconds
+        self._path = path
+        self._lock = threading.Lock()
+        self._items: dict[str, ModelCapability] = {}
+        self._loaded = False
+
+    @staticmethod
+    def _key(base_url: str, model: str) -> str:
+        return f"{base_url.rstrip('/')}|{model}"
+
+    def get(self, base_url: str, model: str) -> ModelCapability | None:
+        key = self._key(base_url, model)
+        with self._lock:
+            self._load_locked()
+            cap = self._items.get(key)
+            if cap is None:
+                return None
+            if self._ttl > 0 and time.time() - cap.checked_at >= self._ttl:
+                self._items.pop(key, None)
+                return None
+            return ModelCapability(
+                text_endpoint=cap.text_endpoint,
+                responses_input=cap.responses_input,
+                unsupported={k: list(v) for k, v in cap.unsupported.items()},
+                checked_at=cap.checked_at,
+            )
+
+    def record_text_endpoint(self, base_url: str, model: str, *, endpoint: str, responses_input: str | None = None) -> None:
+        def apply(cap: ModelCapability) -> bool:
+            if cap.text_endpoint == endpoint and cap.responses_input == responses_input:
+                return False
+            cap.text_endpoint = endpoint
+            cap.responses_input = responses_input
+            return True
+
+        self._update(base_url, model, apply)
+
+    def mark_unsupported(self, base_url: str, model: str, api: str, param: str) -> None:
+        def apply(cap: ModelCapability) -> bool:
+            params = cap.unsupported.setdefault(api, [])
+            if param in params:
+                return False
+            params.append(param)
+            return True
+
+        self._update(base_url, model, apply)
+
+    def invalidate(self, base_url: str, model: str) -> None:
+        with self._lock:
+            self._load_locked()
+            if self._items.pop(self._key(base_url, model), None) is not None:
+                self._save_locked()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._loaded = True
+            self._save_locked()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            self._load_locked()
+            return {k: asdict(v) for k, v in self._items.items()}
+
+    def _update(self, base_url: str, model: str, apply: Callable[[ModelCapability], bool]) -> None:
+        key = self._key(base_url, model)
+        with self._lock:
+            self._load_locked()
+            cap = self._items.get(key)
+            if cap is None or (self._ttl > 0 and time.time() - cap.checked_at >= self._ttl):
+                cap = ModelCapability(checked_at=time.time())
+                self._items[key] = cap
+                changed = True
+            else:
+                changed = False
+            if apply(cap) or changed:
+                self._save_locked()
+
+    def _load_locked(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self._path or not os.path.exists(self._path):
+            return
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                raw = json.load(f)
+            for key, value in (raw or {}).items():
+                if isinstance(value, dict):
+                    self._items[key] = ModelCapability(
+                        text_endpoint=value.get("text_endpoint"),
+                        responses_input=value.get("responses_input"),
+                        unsupported={k: list(v) for k, v in (value.get("unsupported") or {}).items()},
+                        checked_at=float(value.get("checked_at") or 0.0),
+                    )
+        except Exception as e:
+            _logger().warning(f"[GPT] capability cache load failed path={self._path} reason={e}")
+
+    def _save_locked(self) -> None:
+        if not self._path:
+            return
+        tmp = f"{self._path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({k: asdict(v) for k, v in self._items.items()}, f, ensure_ascii=False)
+            os.replace(tmp, self._path)
+        except Exception as e:
+            _logger().warning(f"[GPT] capability cache save failed path={self._path} reason={e}")
+
+
+_cache: CapabilityCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_capability_cache() -> CapabilityCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    ttl = float(os.getenv("GPT_CAPABILITY_TTL_SECONDS") or 6 * 60 * 60)
+                except ValueError:
+                    ttl = 6 * 60 * 60
+                path = (os.getenv("GPT_CAPABILITY_CACHE_PATH") or "").strip() or None
+                _cache = CapabilityCache(ttl_seconds=ttl, path=path)
+    return _cache
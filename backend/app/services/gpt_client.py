@@ -1,13 +1,19 @@
 from __future__ import annotations
 
+import asyncio
+import importlib.util
 import json
 import os
 import re
 import logging
-import urllib.error
-import urllib.request
+import threading
+from collections.abc import Awaitable, Callable, Generator
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, TypeVar
+
+import httpx
+
+from .gpt_capabilities import get_capability_cache
 
 
 DEFAULT_OPENAI_BASE_URL = "https://api.openai.com/v1"
@@ -159,27 +165,89 @@ def _debug_log(msg: str) -> None:
         _logger().warning(msg)
 
 
-def _post_json(*, endpoint: str, api_key: str, body: dict[str, Any]) -> dict[str, Any]:
-    req = urllib.request.Request(
-        endpoint,
-        data=json.dumps(body).encode("utf-8"),
-        headers={
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        },
-        method="POST",
-    )
+def _get_env_float(name: str, default: float) -> float:
+    raw = (os.getenv(name) or "").strip()
     try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            raw = resp.read().decode("utf-8")
-    except urllib.error.HTTPError as e:
-        detail = e.read().decode("utf-8", errors="ignore")
-        raise GptError(f"GPT API HTTPError: {e.code} {e.reason} {detail}") from e
-    except Exception as e:
-        raise GptError(f"GPT API 호출 실패: {e}") from e
+        return float(raw) if raw else default
+    except ValueError:
+        return default
+
+
+def _max_concurrency() -> int:
+    return max(1, int(_get_env_float("GPT_MAX_CONCURRENCY", 16)))
+
+
+def _http_timeout() -> httpx.Timeout:
+    connect = _get_env_float("GPT_CONNECT_TIMEOUT", 5.0)
+    read = _get_env_float("GPT_READ_TIMEOUT", 30.0)
+    return httpx.Timeout(connect=connect, read=read, write=read, pool=read)
+
+
+def _http_limits() -> httpx.Limits:
+    n = _max_concurrency()
+    return httpx.Limits(max_connections=n, max_keepalive_connections=n, keepalive_expiry=60.0)
+
+
+def _http2_enabled() -> bool:
+    # HTTP/2는 h2 패키지가 있을 때만 사용한다(없으면 HTTP/1.1 keep-alive).
+    if str(os.getenv("GPT_HTTP2") or "1").lower() in ("0", "false", "no", "n"):
+        return False
+    return importlib.util.find_spec("h2") is not None
+
+
+# 업스트림 커넥션 풀(keep-alive)과 동시 요청 상한.
+# 동기 호출(스크립트 등)과 async 호출은 각자의 클라이언트를 쓰고, 둘 다 GPT_MAX_CONCURRENCY로 제한한다.
+_client: httpx.Client | None = None
+_client_slots: threading.BoundedSemaphore | None = None
+_client_lock = threading.Lock()
+_async_client: httpx.AsyncClient | None = None
+_async_slots: asyncio.Semaphore | None = None
+_async_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _get_client() -> tuple[httpx.Client, threading.BoundedSemaphore]:
+    global _client, _client_slots
+    if _client is None or _client_slots is None:
+        with _client_lock:
+            if _client is None or _client_slots is None:
+                _client_slots = threading.BoundedSemaphore(_max_concurrency())
+                _client = httpx.Client(http2=_http2_enabled(), timeout=_http_timeout(), limits=_http_limits())
+    return _client, _client_slots
+
+
+def _get_async_client() -> tuple[httpx.AsyncClient, asyncio.Semaphore]:
+    global _async_client, _async_slots, _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop:
+        _async_client = httpx.AsyncClient(http2=_http2_enabled(), timeout=_http_timeout(), limits=_http_limits())
+        _async_slots = asyncio.Semaphore(_max_concurrency())
+        _async_loop = loop
+    assert _async_slots is not None
+    return _async_client, _async_slots
+
 
+async def aclose_http_clients() -> None:
+    global _client, _async_client, _async_loop
+    client, _client = _client, None
+    async_client, _async_client, _async_loop = _async_client, None, None
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.aclose()
+
+
+def _request_headers(api_key: str) -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+
+
+def _parse_payload(resp: httpx.Response) -> dict[str, Any]:
+    if resp.status_code >= 400:
+        raise GptError(f"GPT API HTTPError: {resp.status_code} {resp.reason_phrase} {resp.text}")
     try:
-        payload = json.loads(raw)
+        payload = json.loads(resp.content.decode("utf-8"))
     except Exception as e:
         raise GptError(f"GPT 응답 JSON 파싱 실패: {e}") from e
     if isinstance(payload.get("error"), dict):
@@ -189,6 +257,152 @@ def _post_json(*, endpoint: str, api_key: str, body: dict[str, Any]) -> dict[str
     return payload
 
 
+def _post_json(*, endpoint: str, api_key: str, body: dict[str, Any]) -> dict[str, Any]:
+    client, slots = _get_client()
+    try:
+        with slots:
+            resp = client.post(endpoint, content=json.dumps(body).encode("utf-8"), headers=_request_headers(api_key))
+    except Exception as e:
+        raise GptError(f"GPT API 호출 실패: {e}") from e
+    return _parse_payload(resp)
+
+
+async def _apost_json(*, endpoint: str, api_key: str, body: dict[str, Any]) -> dict[str, Any]:
+    client, slots = _get_async_client()
+    try:
+        async with slots:
+            resp = await client.post(endpoint, content=json.dumps(body).encode("utf-8"), headers=_request_headers(api_key))
+    except Exception as e:
+        raise GptError(f"GPT API 호출 실패: {e}") from e
+    return _parse_payload(resp)
+
+
+_DeltaCallback = Callable[[str], Awaitable[None]]
+
+
+class _ChatStreamAccumulator:
+    """chat.completions 스트림 청크를 모아 비스트리밍 응답과 같은 payload로 복원한다."""
+
+    def __init__(self) -> None:
+        self._content: list[str] = []
+        self._tool_calls: dict[int, dict[str, Any]] = {}
+        self._finish_reason: str | None = None
+        self._usage: dict[str, Any] | None = None
+
+    def add(self, chunk: dict[str, Any]) -> str:
+        if isinstance(chunk.get("usage"), dict):
+            self._usage = chunk["usage"]
+        choices = chunk.get("choices")
+        if not isinstance(choices, list) or not choices or not isinstance(choices[0], dict):
+            return ""
+        choice = choices[0]
+        if choice.get("finish_reason"):
+            self._finish_reason = choice["finish_reason"]
+        delta = choice.get("delta")
+        if not isinstance(delta, dict):
+            return ""
+        for tc in delta.get("tool_calls") or []:
+            if not isinstance(tc, dict):
+                continue
+            slot = self._tool_calls.setdefault(
+                int(tc.get("index") or 0), {"id": "", "type": "function", "function": {"name": "", "arguments": ""}}
+            )
+            if tc.get("id"):
+                slot["id"] = tc["id"]
+            fn = tc.get("function")
+            if isinstance(fn, dict):
+                slot["function"]["name"] += fn.get("name") or ""
+                slot["function"]["arguments"] += fn.get("arguments") or ""
+        text = delta.get("content")
+        if isinstance(text, str) and text:
+            self._content.append(text)
+            return text
+        return ""
+
+    def payload(self) -> dict[str, Any]:
+        message: dict[str, Any] = {"role": "assistant", "content": "".join(self._content)}
+        if self._tool_calls:
+            message["tool_calls"] = [self._tool_calls[i] for i in sorted(self._tool_calls)]
+        out: dict[str, Any] = {"choices": [{"index": 0, "message": message, "finish_reason": self._finish_reason}]}
+        if self._usage is not None:
+            out["usage"] = self._usage
+        return out
+
+
+async def _apost_stream(
+    *, endpoint: str, api_key: str, body: dict[str, Any], on_delta: _DeltaCallback
+) -> dict[str, Any]:
+    # SSE(data: {...}) 스트림을 읽으면서 content 조각을 on_delta로 넘기고, 끝나면 전체 payload를 돌려준다.
+    client, slots = _get_async_client()
+    acc = _ChatStreamAccumulator()
+    try:
+        async with slots:
+            async with client.stream(
+                "POST", endpoint, content=json.dumps(body).encode("utf-8"), headers=_request_headers(api_key)
+            ) as resp:
+                if resp.status_code >= 400:
+                    await resp.aread()
+                    return _parse_payload(resp)
+                async for line in resp.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    if isinstance(chunk.get("error"), dict):
+                        raise GptError(f"GPT API error payload: {chunk['error'].get('message')}")
+                    text = acc.add(chunk)
+                    if text:
+                        try:
+                            await on_delta(text)
+                        except Exception as e:
+                            # 중간 전송 실패는 최종 응답 생성에 영향을 주지 않는다.
+                            _debug_log(f"[GPT] stream delta callback failed: {type(e).__name__}: {e}")
+    except GptError:
+        raise
+    except Exception as e:
+        raise GptError(f"GPT API 호출 실패: {e}") from e
+    return acc.payload()
+
+
+# 엔드포인트/파라미터 폴백 로직은 (endpoint, body)를 yield하고 응답 payload를 받는 제너레이터(flow)로 작성한다.
+# 같은 flow를 동기(_run_flow)/비동기(_arun_flow) 드라이버가 각각 실행한다. 요청 실패는 GptError로 flow에 던진다.
+T = TypeVar("T")
+_Flow = Generator[tuple[str, dict[str, Any]], dict[str, Any], T]
+
+
+def _run_flow(flow: _Flow[T], api_key: str) -> T:
+    try:
+        endpoint, body = next(flow)
+        while True:
+            try:
+                payload = _post_json(endpoint=endpoint, api_key=api_key, body=body)
+            except GptError as e:
+                endpoint, body = flow.throw(e)
+            else:
+                endpoint, body = flow.send(payload)
+    except StopIteration as stop:
+        return stop.value
+
+
+async def _arun_flow(flow: _Flow[T], api_key: str, on_delta: _DeltaCallback | None = None) -> T:
+    try:
+        endpoint, body = next(flow)
+        while True:
+            try:
+                if on_delta is not None and body.get("stream"):
+                    payload = await _apost_stream(endpoint=endpoint, api_key=api_key, body=body, on_delta=on_delta)
+                else:
+                    payload = await _apost_json(endpoint=endpoint, api_key=api_key, body=body)
+            except GptError as e:
+                endpoint, body = flow.throw(e)
+            else:
+                endpoint, body = flow.send(payload)
+    except StopIteration as stop:
+        return stop.value
+
+
 def _remove_keys(body: dict[str, Any], keys: list[str]) -> dict[str, Any]:
     out = dict(body)
     for k in keys:
@@ -206,75 +420,126 @@ def _wants_low_reasoning(model: str) -> bool:
     return model.startswith("gpt-5")
 
 
-def call_gpt_text(
+def _base_url(base_url: str | None) -> str:
+    return (base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_OPENAI_BASE_URL).rstrip("/")
+
+
+# 구조화 출력(json_schema)을 지원하지 않는 모델은 "Invalid parameter: 'response_format' ... not supported"로 거부한다.
+_UNSUPPORTED_PARAM_RE = re.compile(r"Unsupported parameter: '(\w+)'|Invalid parameter: '(response_format)'[^\n]*not supported")
+# 엔드포인트/입력 형태를 지원하지 않을 때의 응답(400/404/422)만 호환 문제로 본다.
+# 401/403(키·권한), 408/429(시간 초과·한도), 5xx는 일시 오류이므로 chat으로 확정하지 않는다.
+_INCOMPATIBLE_ERROR_RE = re.compile(r"HTTPError: (?:400|404|422)\b")
+_MAX_PARAM_RETRIES = 3
+
+
+def _apply_unsupported(body: dict[str, Any], params: list[str]) -> dict[str, Any]:
+    if not any(p in body for p in params):
+        return body
+    out = _remove_keys(body, params)
+    if "max_completion_tokens" in params and "max_completion_tokens" in body:
+        # 구형 모델/게이트웨이는 max_completion_tokens 대신 max_tokens만 받는다.
+        out["max_tokens"] = body["max_completion_tokens"]
+    return out
+
+
+def _post_adapting(
+    endpoint: str,
+    body: dict[str, Any],
+    *,
+    url: str,
+    model: str,
+    api: str,
+) -> _Flow[dict[str, Any]]:
+    # 캐시에 기록된 미지원 파라미터는 처음부터 빼고 보낸다.
+    # 새로 거부된 파라미터는 캐시에 기록한 뒤 제거하고 재시도한다.
+    cache = get_capability_cache()
+    cap = cache.get(url, model)
+    body = _apply_unsupported(body, (cap.unsupported.get(api) if cap else None) or [])
+    for _ in range(_MAX_PARAM_RETRIES):
+        try:
+            return (yield endpoint, body)
+        except GptError as e:
+            m = _UNSUPPORTED_PARAM_RE.search(str(e))
+            param = (m.group(1) or m.group(2)) if m else None
+            if not param or param not in body:
+                raise
+            _logger().info(f"[GPT] unsupported parameter cached model={model} api={api} param={param}")
+            cache.mark_unsupported(url, model, api, param)
+            body = _apply_unsupported(body, [param])
+    return (yield endpoint, body)
+
+
+def _responses_body(
     *,
     model: str,
     system: str,
     user: str,
-    max_output_tokens: int = 600,
-    temperature: float | None = None,
-    base_url: str | None = None,
-) -> GptResponse:
-    api_key = _get_api_key()
-    url = (base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_OPENAI_BASE_URL).rstrip("/")
-    responses_endpoint = f"{url}/responses"
-    completions_endpoint = f"{url}/chat/completions"
+    max_output_tokens: int,
+    temperature: float | None,
+    shape: str,
+) -> dict[str, Any]:
+    if shape == "input_text":
+        inputs: list[dict[str, Any]] = [
+            {"role": "system", "content": [{"type": "input_text", "text": system}]},
+            {"role": "user", "content": [{"type": "input_text", "text": user}]},
+        ]
+    else:
+        inputs = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ]
+    body: dict[str, Any] = {"model": model, "input": inputs, "max_output_tokens": max_output_tokens}
+    if temperature is not None and _supports_temperature(model):
+        body["temperature"] = temperature
+    if _wants_low_reasoning(model):
+        body["reasoning"] = {"effort": "minimal"}
+    return body
 
-    # 1) Responses API 먼저 시도
-    try:
-        body: dict[str, Any] = {
-            "model": model,
-            "input": [
-                {"role": "system", "content": system},
-                {"role": "user", "content": user},
-            ],
-            "max_output_tokens": max_output_tokens,
-        }
-        if temperature is not None and _supports_temperature(model):
-            body["temperature"] = temperature
-        if _wants_low_reasoning(model):
-            body["reasoning"] = {"effort": "minimal"}
 
+def _text_flow(
+    *,
+    model: str,
+    system: str,
+    user: str,
+    max_output_tokens: int,
+    temperature: float | None,
+    url: str,
+) -> _Flow[GptResponse]:
+    responses_endpoint = f"{url}/responses"
+    completions_endpoint = f"{url}/chat/completions"
+    cache = get_capability_cache()
+    cap = cache.get(url, model)
+    cached_chat = cap is not None and cap.text_endpoint == "chat"
+    fall_back_to_chat = False
+
+    # 1) Responses API 먼저 시도(이전에 chat으로 확정된 모델이면 건너뛴다)
+    if not cached_chat:
+        # 이전에 동작한 입력 형태가 있으면 그것만 쓰고, 없으면 plain -> input_text 순으로 탐색한다.
+        shapes = [cap.responses_input] if cap and cap.responses_input else ["plain", "input_text"]
         try:
-            _debug_log(f"[GPT] POST /responses model={model}")
-            payload = _post_json(endpoint=responses_endpoint, api_key=api_key, body=body)
-        except GptError as e:
-            # 모델이 특정 파라미터를 거부하는 경우 한 번 더 제거 후 재시도
-            if "Unsupported parameter: 'temperature'" in str(e) and "temperature" in body:
-                payload = _post_json(endpoint=responses_endpoint, api_key=api_key, body=_remove_keys(body, ["temperature"]))
-            elif "Unsupported parameter: 'reasoning'" in str(e) and "reasoning" in body:
-                payload = _post_json(endpoint=responses_endpoint, api_key=api_key, body=_remove_keys(body, ["reasoning"]))
-            else:
-                raise
-        text = _extract_output_text(payload)
-        if text.strip():
-            return GptResponse(raw=payload, output_text=text)
-
-        # 응답은 왔지만 텍스트 추출이 안 되는 경우가 있어, input_text 포맷으로 한 번 더 시도한다.
-        _logger().warning(f"[GPT] empty output from /responses payload={_safe_json_preview(payload)}")
-        _logger().warning(f"[GPT] retry /responses with input_text content blocks model={model}")
-
-        body2: dict[str, Any] = {
-            "model": model,
-            "input": [
-                {"role": "system", "content": [{"type": "input_text", "text": system}]},
-                {"role": "user", "content": [{"type": "input_text", "text": user}]},
-            ],
-            "max_output_tokens": max_output_tokens,
-        }
-        if temperature is not None and _supports_temperature(model):
-            body2["temperature"] = temperature
-        if _wants_low_reasoning(model):
-            body2["reasoning"] = {"effort": "minimal"}
-        payload2 = _post_json(endpoint=responses_endpoint, api_key=api_key, body=body2)
-        text2 = _extract_output_text(payload2)
-        if not text2.strip():
-            _logger().warning(f"[GPT] empty output from /responses (retry) payload={_safe_json_preview(payload2)}")
+            for shape in shapes:
+                body = _responses_body(
+                    model=model,
+                    system=system,
+                    user=user,
+                    max_output_tokens=max_output_tokens,
+                    temperature=temperature,
+                    shape=shape,
+                )
+                _debug_log(f"[GPT] POST /responses model={model} input={shape}")
+                payload = yield from _post_adapting(responses_endpoint, body, url=url, model=model, api="responses")
+                text = _extract_output_text(payload)
+                if text.strip():
+                    cache.record_text_endpoint(url, model, endpoint="responses", responses_input=shape)
+                    return GptResponse(raw=payload, output_text=text)
+                # 응답은 왔지만 텍스트 추출이 안 되는 경우가 있어, 다른 입력 형태로 한 번 더 시도한다.
+                _logger().warning(f"[GPT] empty output from /responses input={shape} payload={_safe_json_preview(payload)}")
+            fall_back_to_chat = True
             raise GptError("GPT 응답이 비어 있습니다.")
-        return GptResponse(raw=payload2, output_text=text2)
-    except GptError as e:
-        # 모델/엔드포인트 호환 이슈일 수 있어 Chat Completions도 시도
-        _logger().warning(f"[GPT] /responses failed, retry /chat/completions: {str(e)[:240]}")
+        except GptError as e:
+            # 모델/엔드포인트 호환 이슈(400/404/422, 빈 응답)일 때만 chat으로 확정한다. 일시 오류는 기록하지 않는다.
+            fall_back_to_chat = fall_back_to_chat or bool(_INCOMPATIBLE_ERROR_RE.search(str(e)))
+            _logger().warning(f"[GPT] /responses failed, retry /chat/completions: {str(e)[:240]}")
 
     # 2) Chat Completions (호환용 폴백)
     body = {
@@ -292,28 +557,65 @@ def call_gpt_text(
         # 일부 모델은 chat.completions에서 reasoning_effort를 지원한다.
         body["reasoning_effort"] = "minimal"
 
+    _debug_log(f"[GPT] POST /chat/completions model={model}")
     try:
-        _debug_log(f"[GPT] POST /chat/completions model={model}")
-        payload = _post_json(endpoint=completions_endpoint, api_key=api_key, body=body)
-    except GptError as e:
-        if "Unsupported parameter: 'max_completion_tokens'" in str(e):
-            body2 = dict(body)
-            body2.pop("max_completion_tokens", None)
-            body2["max_tokens"] = max_output_tokens
-            payload = _post_json(endpoint=completions_endpoint, api_key=api_key, body=body2)
-        elif "Unsupported parameter: 'temperature'" in str(e) and "temperature" in body:
-            payload = _post_json(endpoint=completions_endpoint, api_key=api_key, body=_remove_keys(body, ["temperature"]))
-        elif "Unsupported parameter: 'reasoning_effort'" in str(e) and "reasoning_effort" in body:
-            payload = _post_json(endpoint=completions_endpoint, api_key=api_key, body=_remove_keys(body, ["reasoning_effort"]))
-        else:
-            raise
+        payload = yield from _post_adapting(completions_endpoint, body, url=url, model=model, api="chat")
+    except GptError:
+        if cached_chat:
+            # 캐시된 경로가 더 이상 동작하지 않으면 다음 호출에서 처음부터 다시 탐색한다.
+            cache.invalidate(url, model)
+        raise
     text = _extract_output_text(payload)
     if not text.strip():
         _logger().warning(f"[GPT] empty output from /chat/completions payload={_safe_json_preview(payload)}")
         raise GptError("GPT 응답이 비어 있습니다.")
+    if fall_back_to_chat:
+        cache.record_text_endpoint(url, model, endpoint="chat")
     return GptResponse(raw=payload, output_text=text)
 
 
+def call_gpt_text(
+    *,
+    model: str,
+    system: str,
+    user: str,
+    max_output_tokens: int = 600,
+    temperature: float | None = None,
+    base_url: str | None = None,
+) -> GptResponse:
+    api_key = _get_api_key()
+    flow = _text_flow(
+        model=model,
+        system=system,
+        user=user,
+        max_output_tokens=max_output_tokens,
+        temperature=temperature,
+        url=_base_url(base_url),
+    )
+    return _run_flow(flow, api_key)
+
+
+async def call_gpt_text_async(
+    *,
+    model: str,
+    system: str,
+    user: str,
+    max_output_tokens: int = 600,
+    temperature: float | None = None,
+    base_url: str | None = None,
+) -> GptResponse:
+    api_key = _get_api_key()
+    flow = _text_flow(
+        model=model,
+        system=system,
+        user=user,
+        max_output_tokens=max_output_tokens,
+        temperature=temperature,
+        url=_base_url(base_url),
+    )
+    return await _arun_flow(flow, api_key)
+
+
 def _parse_tool_calls(msg: dict[str, Any]) -> list[ToolCall]:
     calls: list[ToolCall] = []
     tool_calls = msg.get("tool_calls")
@@ -343,46 +645,41 @@ def _parse_tool_calls(msg: dict[str, Any]) -> list[ToolCall]:
     return calls
 
 
-def call_gpt_with_tools(
+def _tools_flow(
     *,
     messages: list[dict[str, Any]],
     tools: list[dict[str, Any]],
     model: str,
-    max_output_tokens: int = 600,
-    temperature: float | None = None,
-    base_url: str | None = None,
-) -> GptToolResponse:
-    api_key = _get_api_key()
-    url = (base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_OPENAI_BASE_URL).rstrip("/")
+    max_output_tokens: int,
+    temperature: float | None,
+    url: str,
+    stream: bool = False,
+    response_format: dict[str, Any] | None = None,
+    tool_choice: str = "auto",
+    parallel_tool_calls: bool | None = None,
+) -> _Flow[GptToolResponse]:
     completions_endpoint = f"{url}/chat/completions"
 
     body: dict[str, Any] = {
         "model": model,
         "messages": messages,
         "tools": tools,
-        "tool_choice": "auto",
+        "tool_choice": tool_choice,
         "max_completion_tokens": max_output_tokens,
     }
+    if parallel_tool_calls is not None:
+        body["parallel_tool_calls"] = parallel_tool_calls
     if temperature is not None and _supports_temperature(model):
         body["temperature"] = temperature
     if _wants_low_reasoning(model):
         body["reasoning_effort"] = "minimal"
+    if response_format is not None:
+        body["response_format"] = response_format
+    if stream:
+        body["stream"] = True
 
-    try:
-        _debug_log(f"[GPT] POST /chat/completions (tools) model={model}")
-        payload = _post_json(endpoint=completions_endpoint, api_key=api_key, body=body)
-    except GptError as e:
-        if "Unsupported parameter: 'max_completion_tokens'" in str(e):
-            body2 = dict(body)
-            body2.pop("max_completion_tokens", None)
-            body2["max_tokens"] = max_output_tokens
-            payload = _post_json(endpoint=completions_endpoint, api_key=api_key, body=body2)
-        elif "Unsupported parameter: 'temperature'" in str(e) and "temperature" in body:
-            payload = _post_json(endpoint=completions_endpoint, api_key=api_key, body=_remove_keys(body, ["temperature"]))
-        elif "Unsupported parameter: 'reasoning_effort'" in str(e) and "reasoning_effort" in body:
-            payload = _post_json(endpoint=completions_endpoint, api_key=api_key, body=_remove_keys(body, ["reasoning_effort"]))
-        else:
-            raise
+    _debug_log(f"[GPT] POST /chat/completions (tools) model={model} stream={stream}")
+    payload = yield from _post_adapting(completions_endpoint, body, url=url, model=model, api="chat")
 
     choices = payload.get("choices")
     if not isinstance(choices, list) or not choices:
@@ -400,6 +697,95 @@ def call_gpt_with_tools(
     return GptToolResponse(raw=payload, message_text=content or "", tool_calls=tool_calls)
 
 
+def call_gpt_with_tools(
+    *,
+    messages: list[dict[str, Any]],
+    tools: list[dict[str, Any]],
+    model: str,
+    max_output_tokens: int = 600,
+    temperature: float | None = None,
+    base_url: str | None = None,
+    response_format: dict[str, Any] | None = None,
+    tool_choice: str = "auto",
+    parallel_tool_calls: bool | None = None,
+) -> GptToolResponse:
+    api_key = _get_api_key()
+    flow = _tools_flow(
+        messages=messages,
+        tools=tools,
+        model=model,
+        max_output_tokens=max_output_tokens,
+        temperature=temperature,
+        url=_base_url(base_url),
+        response_format=response_format,
+        tool_choice=tool_choice,
+        parallel_tool_calls=parallel_tool_calls,
+    )
+    return _run_flow(flow, api_key)
+
+
+async def call_gpt_with_tools_async(
+    *,
+    messages: list[dict[str, Any]],
+    tools: list[dict[str, Any]],
+    model: str,
+    max_output_tokens: int = 600,
+    temperature: float | None = None,
+    base_url: str | None = None,
+    response_format: dict[str, Any] | None = None,
+    tool_choice: str = "auto",
+    parallel_tool_calls: bool | None = None,
+) -> GptToolResponse:
+    api_key = _get_api_key()
+    flow = _tools_flow(
+        messages=messages,
+        tools=tools,
+        model=model,
+        max_output_tokens=max_output_tokens,
+        temperature=temperature,
+        url=_base_url(base_url),
+        response_format=response_format,
+        tool_choice=tool_choice,
+        parallel_tool_calls=parallel_tool_calls,
+    )
+    return await _arun_flow(flow, api_key)
+
+
+async def call_gpt_with_tools_stream_async(
+    *,
+    messages: list[dict[str, Any]],
+    tools: list[dict[str, Any]],
+    model: str,
+    on_delta: Callable[[str], Awaitable[None]],
+    max_output_tokens: int = 600,
+    temperature: float | None = None,
+    base_url: str | None = None,
+    response_format: dict[str, Any] | None = None,
+    tool_choice: str = "auto",
+    parallel_tool_calls: bool | None = None,
+) -> GptToolResponse:
+    """
+    call_gpt_with_tools_async와 같지만 응답을 스트리밍으로 받으며 content 조각마다 on_delta를 호출한다.
+    게이트웨이가 stream을 거부하면 일반 호출로 돌아간다(capability 캐시에 기록).
+    response_format(json_schema)을 거부하는 모델은 그 파라미터 없이 다시 보낸다(마찬가지로 기록).
+    parallel_tool_calls도 거부되면 같은 방식으로 빼고 보낸다.
+    """
+    api_key = _get_api_key()
+    flow = _tools_flow(
+        messages=messages,
+        tools=tools,
+        model=model,
+        max_output_tokens=max_output_tokens,
+        temperature=temperature,
+        url=_base_url(base_url),
+        response_format=response_format,
+        tool_choice=tool_choice,
+        parallel_tool_calls=parallel_tool_calls,
+        stream=True,
+    )
+    return await _arun_flow(flow, api_key, on_delta)
+
+
 def _extract_first_json_object(text: str) -> str | None:
     # 모델이 JSON만 출력하도록 유도하지만, 실패할 수 있으므로 첫 JSON object만 복구한다.
     start = text.find("{")
@@ -463,3 +849,94 @@ def parse_json_from_model(text: str) -> dict[str, Any]:
             return obj
 
     raise GptError("GPT JSON 응답 파싱에 실패했습니다.")
+
+
+_JSON_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class JsonFieldStreamer:
+    """
+    모델이 출력 중인 JSON 텍스트에서 최상위 문자열 필드 하나(예: "response")의 값을 조각 단위로 꺼낸다.
+    - feed(chunk)는 이번 조각으로 새로 확정된(이스케이프 해석된) 값 문자열을 돌려준다.
+    - 첫 '{' 이전 텍스트(```json 펜스 등)는 무시하고, 필드 값이 끝나면 이후 입력은 무시한다.
+    """
+
+    def __init__(self, field: str) -> None:
+        self._field = field
+        self._depth = 0
+        self._in_str = False
+        self._target = False
+        self._capture_key = False
+        self._key: list[str] = []
+        self._last_key: str | None = None
+        self._expect_value = False
+        self._escape: str | None = None
+        self._high_surrogate: str | None = None
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        out: list[str] = []
+        for ch in chunk:
+            if self.done:
+                break
+            if self._in_str:
+                self._feed_string_char(ch, out)
+                continue
+            if ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+            elif self._depth == 1 and ch == ":":
+                self._expect_value = True
+            elif self._depth == 1 and ch == ",":
+                self._expect_value = False
+            elif ch == '"' and self._depth >= 1:
+                self._in_str = True
+                at_top = self._depth == 1
+                self._target = at_top and self._expect_value and self._last_key == self._field
+                self._capture_key = at_top and not self._expect_value
+                self._key = []
+        return "".join(out)
+
+    def _emit(self, text: str, out: list[str]) -> None:
+        if self._target:
+            out.append(text)
+        elif self._capture_key:
+            self._key.append(text)
+
+    def _feed_string_char(self, ch: str, out: list[str]) -> None:
+        if self._escape is not None:
+            self._escape += ch
+            if self._escape[0] == "u":
+                if len(self._escape) < 5:
+                    return
+                code = int(self._escape[1:], 16) if all(c in "0123456789abcdefABCDEF" for c in self._escape[1:]) else 0xFFFD
+                self._escape = None
+                if 0xD800 <= code <= 0xDBFF:
+                    self._high_surrogate = chr(code)
+                    return
+                if 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+                    pair = self._high_surrogate + chr(code)
+                    self._high_surrogate = None
+                    self._emit(pair.encode("utf-16", "surrogatepass").decode("utf-16"), out)
+                    return
+                self._emit(chr(code), out)
+                return
+            self._emit(_JSON_ESCAPES.get(self._escape, self._escape), out)
+            self._escape = None
+            return
+        if ch == "\\":
+            self._escape = ""
+            return
+        if ch == '"':
+            self._in_str = False
+            if self._target:
+                self.done = True
+            elif self._capture_key:
+                self._last_key = "".join(self._key)
+            else:
+                self._expect_value = False
+            self._target = False
+            self._capture_key = False
+            return
+        self._emit(ch, out)
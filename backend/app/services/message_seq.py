@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import pymysql
+
+# 세션별 메시지 순번(messages.seq).
+# chat_session_metadata.last_seq를 LAST_INSERT_ID(expr)로 올려 받아온다. 이 UPDATE가 메타데이터 행을 잠그므로
+# 같은 세션에 동시에 들어오는 메시지도 트랜잭션 커밋 순서대로 겹치지 않는 번호를 받는다.
+# (롤백되면 번호가 비지만 순서/커서 용도에는 문제없다.)
+
+
+def next_message_seq(conn: pymysql.Connection, session_id: str) -> int:
+    """메시지 INSERT와 같은 트랜잭션 안에서 호출한다."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "UPDATE chat_session_metadata SET last_seq=LAST_INSERT_ID(last_seq+1) WHERE session_id=%s",
+            (session_id,),
+        )
+        if cur.rowcount:
+            return int(cur.lastrowid)
+        # 메타데이터 행이 없는 예전 세션: 기존 메시지의 최대 순번 다음 번호로 행을 만든다.
+        cur.execute("SELECT COALESCE(MAX(seq), 0) + 1 AS seq FROM messages WHERE session_id=%s", (session_id,))
+        seq = int(cur.fetchone()["seq"])
+        cur.execute(
+            "INSERT INTO chat_session_metadata (session_id, unread_count, last_seq) VALUES (%s,0,%s)",
+            (session_id, seq),
+        )
+        return seq
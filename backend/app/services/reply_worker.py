@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any
+
+from .. import db_async as adb
+from ..config import load_settings
+from ..db import json_loads, utc_now
+from ..routes.chatbot import get_settings_map
+from ..schemas import MessageOut
+from ..ws import manager
+from .chat_ai import decide_ai_reply
+from .chat_summary import format_pending_summary
+from .context_window import build_context_window, estimate_tokens, schedule_context_fold
+from .message_seq import next_message_seq
+from .session_cache import evict_session, load_session_context, record_message
+from .summary_worker import SummaryKind, enqueue_summary_job, submit_summary_job
+from .workers import KeyedWorkerPool
+
+# 고객 메시지에 대한 AI 응답은 HTTP 요청 밖에서 생성한다.
+# - ai_reply_jobs(세션당 1행)에 작업을 기록해 재시작 시에도 대기 중인 응답을 잃지 않는다.
+# - 같은 세션의 연속 메시지는 하나의 작업으로 합쳐지고, 최신 대화 전체를 보고 한 번 응답한다.
+
+STALE_RUNNING_MINUTES = 5
+
+
+def _logger() -> logging.Logger:
+    return logging.getLogger("uvicorn.error")
+
+
+def _dt_to_iso(dt: datetime | None) -> str | None:
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.isoformat()
+
+
+def _to_message_out(row: dict) -> dict:
+    created_at = row.get("created_at")
+    if isinstance(created_at, datetime) and created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return MessageOut(
+        id=row["id"],
+        session_id=row.get("session_id"),
+        seq=row.get("seq"),
+        sender_type=row["sender_type"],
+        sender_id=row.get("sender_id"),
+        content=row["content"],
+        attachments=json_loads(row.get("attachments")) if row.get("attachments") is not None else None,
+        is_read=bool(row.get("is_read")) if row.get("is_read") is not None else None,
+        created_at=created_at,
+    ).model_dump()
+
+
+async def enqueue_reply_job(conn, session_id: str, message_id: str) -> None:
+    """send_message 트랜잭션 안에서 호출해 작업을 영속화한다. 커밋 후 submit_reply_job을 호출할 것."""
+    await adb.execute(
+        conn,
+        "INSERT INTO ai_reply_jobs (session_id, status, requested_message_id, attempts, last_error, requested_at) "
+        "VALUES (%s,'queued',%s,0,NULL,%s) "
+        "ON DUPLICATE KEY UPDATE status='queued', requested_message_id=VALUES(requested_message_id), "
+        "attempts=0, last_error=NULL, requested_at=VALUES(requested_at)",
+        (session_id, message_id, utc_now()),
+    )
+
+
+def submit_reply_job(session_id: str) -> None:
+    _get_pool().submit(session_id)
+
+
+async def _mark_failed(session_id: str, error: Exception) -> None:
+    async with adb.db_conn() as conn:
+        await adb.execute(
+            conn,
+            "UPDATE ai_reply_jobs SET status='failed', last_error=%s WHERE session_id=%s AND status='running'",
+            (f"{type(error).__name__}: {str(error)[:500]}", session_id),
+        )
+
+
+async def _discard_draft(customer_id: str, session_id: str, message_id: str) -> None:
+    # 스트리밍으로 이미 보낸 초안이 저장되지 않았으면 고객 화면에서 지우게 한다.
+    await manager.send_to_user(
+        customer_id, {"type": "ai_message_discarded", "data": {"session_id": session_id, "message_id": message_id}}
+    )
+
+
+async def _process_reply_job(session_id: str) -> None:
+    try:
+        await _generate_reply(session_id)
+    except Exception as e:
+        _logger().warning(f"[AI] reply job failed session_id={session_id} reason={type(e).__name__}: {str(e)[:180]}")
+        await _mark_failed(session_id, e)
+
+
+async def _generate_reply(session_id: str) -> None:
+    # 1) 작업 선점 + 맥락 조회(짧은 트랜잭션)
+    async with adb.db_conn() as conn:
+        claimed = await adb.execute(
+            conn,
+            "UPDATE ai_reply_jobs SET status='running', attempts=attempts+1 WHERE session_id=%s AND status='queued'",
+            (session_id,),
+        )
+        if not claimed:
+            return
+        # 진행 중인 세션은 메모리 캐시에서 대화/지침/프로필을 가져오고, 새 메시지만 DB에서 읽는다.
+        ctx = await load_session_context(conn, session_id)
+        session = ctx.session if ctx else None
+        if not ctx or session["handler_type"] == "agent" or session["status"] != "active":
+            # pending/completed 상태에서는 AI가 추가 응답하지 않는다(사람/처리 대기 흐름 유지).
+            await adb.execute(conn, "UPDATE ai_reply_jobs SET status='done' WHERE session_id=%s AND status='running'", (session_id,))
+            return
+
+        settings = await adb.run_in_db(get_settings_map, conn)
+    conversation_rows = ctx.rows
+    stored_summary = ctx.stored_summary
+    admin_instruction = ctx.admin_instruction
+    customer_profile = ctx.customer_profile
+
+    user_message = ""
+    for r in reversed(conversation_rows):
+        if r.get("sender_type") == "user":
+            user_message = (r.get("content") or "").strip()
+            break
+    if not user_message:
+        async with adb.db_conn() as conn:
+            await adb.execute(conn, "UPDATE ai_reply_jobs SET status='done' WHERE session_id=%s AND status='running'", (session_id,))
+        return
+
+    context = build_context_window(conversation_rows, stored_summary, reserve_tokens=estimate_tokens(user_message))
+    if context.needs_fold:
+        # 오래된 메시지가 쌓였으면 다음 턴부터 쓸 요약을 백그라운드에서 갱신한다.
+        schedule_context_fold(session_id)
+
+    # 2) 커넥션 없이 AI 판단.
+    #    스트리밍이 켜져 있으면 생성 중인 응답을 ai_message_delta로 고객에게 먼저 보낸다(저장은 마지막에 한 번).
+    #    조각은 마지막 new_message로 대체되므로 seq 없이 보내고 재전송 버퍼에 남기지 않는다.
+    ai_msg_id = uuid.uuid4().hex
+    customer_id = session["customer_id"]
+    streamed = False
+
+    async def on_response_delta(delta: str, reset: bool) -> None:
+        nonlocal streamed
+        streamed = True
+        await manager.send_to_user(
+            customer_id,
+            {
+                "type": "ai_message_delta",
+                "data": {"session_id": session_id, "message_id": ai_msg_id, "delta": delta, "reset": reset},
+            },
+            transient=True,
+        )
+
+    decision = await decide_ai_reply(
+        session_id=session_id,
+        user_message=user_message,
+        conversation_rows=conversation_rows,
+        current_category=session.get("category"),
+        settings=settings,
+        customer_id=session.get("customer_id"),
+        customer_profile=customer_profile,
+        admin_instruction=admin_instruction,
+        context=context,
+        on_response_delta=on_response_delta if load_settings().ai_reply_stream else None,
+    )
+
+    # 판단 응답에 담긴 요약을 그대로 쓰고, 비었거나 'pending' 같은 자리표시자면 요약 작업으로 넘긴다(응답은 기다리지 않는다).
+    pending_summary = ""
+    completed_summary = ""
+    summary_job: SummaryKind | None = None
+    if decision.needs_human:
+        pending_summary = format_pending_summary(decision.summary, decision.action_items)
+        if not pending_summary:
+            summary_job = "pending"
+    if decision.complete:
+        completed_summary = (decision.summary or "").strip()
+        if not completed_summary:
+            summary_job = "completed"
+
+    # 3) 판단 결과 반영(짧은 트랜잭션).
+    #    - 그 사이 새 고객 메시지가 들어와 작업이 다시 queued가 되었으면 이 응답은 버리고 재실행에 맡긴다.
+    #    - 상담원 개입/종료 등으로 세션 상태가 바뀌었으면(낙관적 동시성) AI 응답을 버린다.
+    reply_at = utc_now()
+    category = decision.category or session.get("category")
+    expected_status = "active"
+    next_admin_bucket = "active"
+    ai_out: dict[str, Any] | None = None
+    try:
+        async with adb.db_conn() as conn:
+            applied = await adb.execute(
+                conn,
+                "UPDATE ai_reply_jobs SET status='done', last_error=NULL WHERE session_id=%s AND status='running'",
+                (session_id,),
+            )
+            if applied and decision.complete:
+                started_at = session.get("started_at")
+                duration = 0
+                if started_at:
+                    now_naive = reply_at.astimezone(timezone.utc).replace(tzinfo=None) if reply_at.tzinfo is not None else reply_at
+                    started_at_naive = (
+                        started_at.astimezone(timezone.utc).replace(tzinfo=None) if started_at.tzinfo is not None else started_at
+                    )
+                    duration = int((now_naive - started_at_naive).total_seconds() // 60)
+                applied = await adb.execute(
+                    conn,
+                    "UPDATE chat_sessions SET status='completed', completed_at=%s, duration_minutes=%s, summary=%s, category=%s "
+                    "WHERE id=%s AND status='active' AND handler_type='ai'",
+                    (reply_at, duration, completed_summary or None, category, session_id),
+                )
+                expected_status = "completed"
+            elif applied and decision.needs_human:
+                applied = await adb.execute(
+                    conn,
+                    "UPDATE chat_sessions SET status='pending', pending_at=%s, summary=COALESCE(%s, summary), category=%s "
+                    "WHERE id=%s AND status='active' AND handler_type='ai'",
+                    (reply_at, pending_summary or None, category, session_id),
+                )
+                expected_status = "pending"
+                next_admin_bucket = "pending"
+            elif applied and category != session.get("category"):
+                await adb.execute(
+                    conn,
+                    "UPDATE chat_sessions SET category=%s WHERE id=%s AND status='active' AND handler_type='ai'",
+                    (category, session_id),
+                )
+
+            if applied:
+                # 상태 전환이 없는 일반 응답도 세션이 여전히 AI 응대 중일 때만 저장한다.
+                seq = await adb.run_in_db(next_message_seq, conn, session_id)
+                applied = await adb.execute(
+                    conn,
+                    "INSERT INTO messages (id, session_id, seq, sender_type, sender_id, content, attachments, is_read, created_at) "
+                    "SELECT %s, id, %s, 'ai', NULL, %s, NULL, TRUE, %s FROM chat_sessions WHERE id=%s AND status=%s AND handler_type='ai'",
+                    (ai_msg_id, seq, decision.response, reply_at, session_id, expected_status),
+                )
+            if applied:
+                await adb.execute(
+                    conn,
+                    "UPDATE chat_session_metadata SET last_message=%s, last_message_at=%s WHERE session_id=%s",
+                    (decision.response, reply_at, session_id),
+                )
+                # 방금 넣은 값으로 응답 행을 만든다(다시 SELECT하지 않는다).
+                ai_out = _to_message_out(
+                    {
+                        "id": ai_msg_id,
+                        "session_id": session_id,
+                        "seq": seq,
+                        "sender_type": "ai",
+                        "sender_id": None,
+                        "content": decision.response,
+                        "attachments": None,
+                        "is_read": True,
+                        "created_at": reply_at,
+                    }
+                )
+                if summary_job:
+                    await enqueue_summary_job(conn, session_id, summary_job)
+    except Exception:
+        if streamed:
+            await _discard_draft(customer_id, session_id, ai_msg_id)
+        raise
+
+    if ai_out is None:
+        if streamed:
+            await _discard_draft(customer_id, session_id, ai_msg_id)
+        return
+    if decision.complete:
+        evict_session(session_id)
+    else:
+        record_message(session_id, ai_out)
+    if summary_job:
+        submit_summary_job(session_id)
+
+    if decision.needs_human:
+        await manager.broadcast_to_admins(
+            {
+                "type": "session_status_changed",
+                "data": {"session_id": session_id, "status": "pending", "handler_type": "ai"},
+            }
+        )
+        await manager.broadcast_to_admins(
+            {
+                "type": "new_chat_session",
+                "data": {
+                    "session": {
+                        "id": session_id,
+                        "customer_name": ctx.customer_email,
+                        "category": decision.category,
+                        "started_at": _dt_to_iso(session.get("started_at")),
+                    }
+                },
+            },
+            require_subscription="pending",
+        )
+
+    # AI가 종료를 판단한 경우: 종료 멘트 + 세션 완료 처리(고객 입력 잠금/자동 로그아웃 UX 트리거)
+    if decision.complete:
+        await manager.send_to_user(
+            customer_id,
+            {
+                "type": "session_completed",
+                "data": {"session_id": session_id, "message": decision.response, "message_id": ai_msg_id},
+            },
+        )
+        await manager.broadcast_to_admins(
+            {"type": "session_status_changed", "data": {"session_id": session_id, "status": "completed", "handler_type": "ai"}}
+        )
+        return
+
+    await manager.send_to_user(customer_id, {"type": "new_message", "data": {"message": ai_out}})
+    await manager.publish_message(session_id, ai_out, bucket=next_admin_bucket)
+
+
+async def _recover_pending_jobs() -> None:
+    # 재시작 전 대기/실행 중이던 작업을 다시 큐에 넣는다.
+    # running은 다른 프로세스가 처리 중일 수 있으므로 충분히 오래된 것만 되살린다.
+    # updated_at(ON UPDATE CURRENT_TIMESTAMP)은 DB 세션 시간대 값이므로 DB의 NOW()와 비교한다.
+    async with adb.db_conn() as conn:
+        await adb.execute(
+            conn,
+            "UPDATE ai_reply_jobs SET status='queued' WHERE status='running' AND updated_at < NOW() - INTERVAL %s MINUTE",
+            (STALE_RUNNING_MINUTES,),
+        )
+        rows = await adb.fetch_all(conn, "SELECT session_id FROM ai_reply_jobs WHERE status='queued'", ())
+    for r in rows:
+        submit_reply_job(r["session_id"])
+
+
+async def start_reply_worker() -> None:
+    await _get_pool().start()
+    try:
+        await _recover_pending_jobs()
+    except Exception as e:
+        _logger().warning(f"[AI] reply job recovery skipped reason={type(e).__name__}: {str(e)[:180]}")
+
+
+async def stop_reply_worker() -> None:
+    await _get_pool().stop()
+
+
+def reply_worker_stats() -> dict[str, Any]:
+    return _get_pool().stats()
+
+
+_pool: KeyedWorkerPool | None = None
+
+
+def _get_pool() -> KeyedWorkerPool:
+    global _pool
+    if _pool is None:
+        settings = load_settings()
+        _pool = KeyedWorkerPool(
+            "ai-reply",
+            _process_reply_job,
+            concurrency=settings.ai_reply_concurrency,
+            debounce_seconds=settings.ai_reply_debounce_ms / 1000,
+        )
+    return _pool
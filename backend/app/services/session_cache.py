@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from .. import db_async as adb
+from ..cache import TTLCache
+from ..config import load_settings
+from .context_window import StoredSummary
+
+# 진행 중인 세션의 대화 맥락 캐시(프로세스 메모리).
+# - 세션별로 메시지 목록(seq 순), 최신 관리자 지침, 고객 프로필을 들고 있다.
+# - 세션 행, 메타데이터(last_seq, 누적 요약), 고객 이메일/이름은 매번 한 번의 조인 조회로 확인하고,
+#   캐시된 last_seq보다 새 메시지가 있을 때만 그 뒤의 메시지를 읽어 붙인다(다른 프로세스에서 저장된 메시지 포함).
+# - 이 프로세스에서 저장한 메시지는 record_message로 바로 붙인다(write-through).
+# - 세션이 종료되면 evict_session으로 버리고, hot_session_idle_seconds 동안 쓰이지 않으면 만료된다.
+
+_MESSAGE_FIELDS = ("seq", "sender_type", "content", "created_at")
+
+
+@dataclass
+class HotSession:
+    customer_id: str
+    rows: list[dict[str, Any]]
+    last_seq: int
+    customer_email: str | None = None
+    customer_name: str | None = None
+    admin_instruction: str | None = None
+
+    def append(self, row: dict[str, Any]) -> None:
+        seq = int(row.get("seq") or 0)
+        if seq and seq <= self.last_seq:
+            # 조회와 write-through가 겹쳐 같은 메시지가 두 번 들어오는 경우
+            return
+        self.rows.append({k: row.get(k) for k in _MESSAGE_FIELDS})
+        self.last_seq = seq or self.last_seq
+        if row.get("sender_type") == "agent":
+            self.admin_instruction = row.get("content")
+
+    @property
+    def customer_profile(self) -> str:
+        if self.customer_email is None and self.customer_name is None:
+            return f"id={self.customer_id}"
+        return f"id={self.customer_id}, email={self.customer_email}, name={self.customer_name}"
+
+
+@dataclass(frozen=True)
+class SessionContext:
+    session: dict[str, Any]
+    rows: list[dict[str, Any]]
+    admin_instruction: str | None
+    customer_profile: str
+    customer_email: str | None
+    stored_summary: StoredSummary | None
+
+
+_stats: dict[str, int] = {"hits": 0, "delta_loads": 0, "full_loads": 0, "write_through": 0, "evictions": 0}
+_cache: TTLCache[str, HotSession] | None = None
+
+
+def _get_cache() -> TTLCache[str, HotSession]:
+    global _cache
+    if _cache is None:
+        settings = load_settings()
+        _cache = TTLCache(max_size=settings.hot_session_cache_size, ttl_seconds=settings.hot_session_idle_seconds)
+    return _cache
+
+
+async def _load_full(conn, session_id: str, customer_id: str) -> HotSession:
+    rows = await adb.fetch_all(
+        conn,
+        "SELECT seq, sender_type, content, created_at FROM messages WHERE session_id=%s ORDER BY seq ASC",
+        (session_id,),
+    )
+    hot = HotSession(customer_id=customer_id, rows=[], last_seq=0)
+    for r in rows:
+        hot.append(r)
+    return hot
+
+
+async def load_session_context(conn, session_id: str) -> SessionContext | None:
+    """
+    세션이 없으면 None. 반환하는 rows는 복사본이다.
+    캐시가 최신이면 쿼리 1번, 새 메시지가 있거나 처음 읽는 세션이면 2번.
+    """
+    head = await adb.fetch_one(
+        conn,
+        """
+        SELECT s.*, md.last_seq AS md_last_seq, md.context_summary AS md_context_summary,
+               md.context_summary_seq AS md_context_summary_seq,
+               u.email AS customer_email, u.name AS customer_name
+        FROM chat_sessions s
+        LEFT JOIN chat_session_metadata md ON md.session_id=s.id
+        LEFT JOIN users u ON u.id=s.customer_id
+        WHERE s.id=%s
+        """,
+        (session_id,),
+    )
+    if not head:
+        return None
+    md_last_seq = head.pop("md_last_seq")
+    summary_text = (head.pop("md_context_summary") or "").strip()
+    summary_seq = int(head.pop("md_context_summary_seq") or 0)
+    stored = StoredSummary(text=summary_text, seq=summary_seq) if summary_text else None
+    customer_email = head.pop("customer_email")
+    customer_name = head.pop("customer_name")
+
+    cache = _get_cache()
+    customer_id = str(head.get("customer_id") or "")
+    hot = cache.get(session_id)
+    if (
+        hot is None
+        or md_last_seq is None
+        or hot.customer_id != customer_id
+        or hot.last_seq > int(md_last_seq)
+    ):
+        _stats["full_loads"] += 1
+        hot = await _load_full(conn, session_id, customer_id)
+    elif hot.last_seq < int(md_last_seq):
+        _stats["delta_loads"] += 1
+        delta = await adb.fetch_all(
+            conn,
+            "SELECT seq, sender_type, content, created_at FROM messages WHERE session_id=%s AND seq > %s ORDER BY seq ASC",
+            (session_id, hot.last_seq),
+        )
+        for r in delta:
+            hot.append(r)
+    else:
+        _stats["hits"] += 1
+    hot.customer_email = customer_email
+    hot.customer_name = customer_name
+
+    if head.get("status") == "completed" or md_last_seq is None or len(hot.rows) > load_settings().hot_session_max_messages:
+        evict_session(session_id)
+    else:
+        # 다시 넣어 유휴 만료 시간을 연장한다.
+        cache.set(session_id, hot)
+
+    return SessionContext(
+        session=head,
+        rows=list(hot.rows),
+        admin_instruction=hot.admin_instruction,
+        customer_profile=hot.customer_profile,
+        customer_email=hot.customer_email,
+        stored_summary=stored,
+    )
+
+
+def record_message(session_id: str, row: dict[str, Any] | None) -> None:
+    """커밋된 메시지를 캐시에 바로 반영한다. 순번이 이어지지 않으면 다음 조회 때 DB에서 채운다."""
+    if not row:
+        return
+    hot = _get_cache().get(session_id)
+    if hot is not None and int(row.get("seq") or 0) == hot.last_seq + 1:
+        hot.append(row)
+        _stats["write_through"] += 1
+
+
+def evict_session(session_id: str) -> None:
+    if _get_cache().pop(session_id) is not None:
+        _stats["evictions"] += 1
+
+
+def session_cache_stats() -> dict[str, Any]:
+    out: dict[str, Any] = dict(_stats)
+    cache = _get_cache().stats()
+    out.update({"size": cache["size"], "max_size": cache["max_size"]})
+    return out
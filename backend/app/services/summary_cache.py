@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from .. import db_async as adb
+from ..cache import TTLCache
+from ..config import load_settings
+from ..routes.chatbot import get_settings_version
+from .chat_summary import AdminSummary, build_admin_summary
+
+# 관리자 요약 패널(GET /api/admin/chats/{id}/summary) 캐시.
+# - 키: (마지막 메시지 seq, 설정 버전). 새 메시지가 없고 설정이 그대로면 GPT를 다시 부르지 않는다.
+# - 같은 키를 동시에 요청하면 한 번만 생성하고 결과를 나눠 쓴다(single-flight).
+# - 키가 바뀌었어도 summary_cache_stale_seconds 이내의 이전 요약이 있으면 그것을 바로 돌려주고
+#   백그라운드에서 새로 만든다(stale-while-revalidate).
+# - GPT 실패로 만든 대체 요약은 캐시하지 않는다.
+
+
+def _logger() -> logging.Logger:
+    return logging.getLogger("uvicorn.error")
+
+
+@dataclass(frozen=True)
+class _Entry:
+    version: tuple[int, int]
+    summary: AdminSummary
+    created_at: float
+
+
+@dataclass(frozen=True)
+class CachedSummary:
+    summary: AdminSummary
+    stale: bool
+
+
+class SummaryCache:
+    def __init__(self, *, max_size: int, ttl_seconds: float, stale_seconds: float) -> None:
+        self._items: TTLCache[str, _Entry] = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._stale_seconds = stale_seconds
+        self._inflight: dict[tuple[str, tuple[int, int]], asyncio.Task[AdminSummary]] = {}
+        self._stats: dict[str, int] = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "builds": 0}
+
+    async def get(self, session_id: str) -> CachedSummary:
+        """세션이 없으면 ValueError(build_admin_summary와 같다)."""
+        version = await _current_version(session_id)
+        entry = self._items.get(session_id)
+        if entry is not None and entry.version == version:
+            self._stats["hits"] += 1
+            return CachedSummary(summary=entry.summary, stale=False)
+        if entry is not None and time.monotonic() - entry.created_at < self._stale_seconds:
+            self._stats["stale_hits"] += 1
+            self._start(session_id, version)
+            return CachedSummary(summary=entry.summary, stale=True)
+        self._stats["misses"] += 1
+        # 다른 요청이 취소돼도 생성은 계속되도록 shield로 기다린다.
+        summary = await asyncio.shield(self._start(session_id, version))
+        return CachedSummary(summary=summary, stale=False)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> dict[str, Any]:
+        out: dict[str, Any] = dict(self._stats)
+        cache = self._items.stats()
+        out.update({"size": cache["size"], "max_size": cache["max_size"], "inflight": len(self._inflight)})
+        return out
+
+    def _start(self, session_id: str, version: tuple[int, int]) -> asyncio.Task[AdminSummary]:
+        key = (session_id, version)
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats["coalesced"] += 1
+            return task
+        self._stats["builds"] += 1
+        task = asyncio.create_task(self._build(session_id, version), name=f"admin-summary-{session_id}")
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._done(key, t))
+        return task
+
+    def _done(self, key: tuple[str, tuple[int, int]], task: asyncio.Task[AdminSummary]) -> None:
+        self._inflight.pop(key, None)
+        # 백그라운드 갱신에서 난 예외는 기다리는 쪽이 없을 수 있으므로 여기서 소비해 둔다.
+        exc = None if task.cancelled() else task.exception()
+        if exc is not None and not isinstance(exc, ValueError):
+            _logger().warning(f"[SUMMARY] cache build failed session_id={key[0]} reason={type(exc).__name__}: {str(exc)[:180]}")
+
+    async def _build(self, session_id: str, version: tuple[int, int]) -> AdminSummary:
+        summary = await build_admin_summary(session_id)
+        if not summary.fallback:
+            current = self._items.get(session_id)
+            # 더 새로운 키로 이미 채워졌으면 덮어쓰지 않는다.
+            if current is None or current.version <= version:
+                self._items.set(session_id, _Entry(version=version, summary=summary, created_at=time.monotonic()))
+        return summary
+
+
+async def _current_version(session_id: str) -> tuple[int, int]:
+    async with adb.db_conn() as conn:
+        row = await adb.fetch_one(conn, "SELECT last_seq FROM chat_session_metadata WHERE session_id=%s", (session_id,))
+        settings_version = await adb.run_in_db(get_settings_version, conn)
+    return (int((row or {}).get("last_seq") or 0), settings_version)
+
+
+_cache: SummaryCache | None = None
+
+
+def get_summary_cache() -> SummaryCache:
+    global _cache
+    if _cache is None:
+        settings = load_settings()
+        _cache = SummaryCache(
+            max_size=settings.summary_cache_size,
+            ttl_seconds=settings.summary_cache_ttl_seconds,
+            stale_seconds=settings.summary_cache_stale_seconds,
+        )
+    return _cache
+
+
+async def get_admin_summary(session_id: str) -> CachedSummary:
+    return await get_summary_cache().get(session_id)
+
+
+def summary_cache_stats() -> dict[str, Any]:
+    return get_summary_cache().stats()
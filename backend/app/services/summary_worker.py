@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Literal
+
+from .. import db_async as adb
+from ..config import load_settings
+from ..db import utc_now
+from ..ws import manager
+from .chat_summary import build_completed_summary_text, build_pending_summary_text
+from .workers import KeyedWorkerPool
+
+# 처리 대기/종료 요약은 HTTP 요청 밖에서 생성한다.
+# - summary_jobs(세션당 1행)에 작업과 상태를 기록해 재시작 시에도 잃지 않는다. 같은 세션에 새 작업이 오면 덮어쓴다.
+# - 세션 상태를 바꾸는 트랜잭션 안에서 enqueue_summary_job을 호출하고, 커밋 후 submit_summary_job을 호출한다.
+# - 요약이 준비되면 chat_sessions.summary를 갱신하고 관리자에게 summary_updated 이벤트를 보낸다.
+# - GPT 실패는 summary_job_max_attempts회까지 지수 백오프로 다시 시도하고, 그래도 실패하면 기존 summary를 유지한다.
+
+SummaryKind = Literal["pending", "completed"]
+
+STALE_RUNNING_MINUTES = 5
+_RETRY_BASE_SECONDS = 2.0
+
+
+def _logger() -> logging.Logger:
+    return logging.getLogger("uvicorn.error")
+
+
+async def enqueue_summary_job(conn, session_id: str, kind: SummaryKind) -> None:
+    await adb.execute(
+        conn,
+        "INSERT INTO summary_jobs (session_id, kind, status, attempts, last_error, requested_at) "
+        "VALUES (%s,%s,'queued',0,NULL,%s) "
+        "ON DUPLICATE KEY UPDATE kind=VALUES(kind), status='queued', attempts=0, last_error=NULL, "
+        "requested_at=VALUES(requested_at)",
+        (session_id, kind, utc_now()),
+    )
+
+
+def submit_summary_job(session_id: str) -> None:
+    _get_pool().submit(session_id)
+
+
+async def _build(session_id: str, kind: str) -> str:
+    if kind == "pending":
+        return await build_pending_summary_text(session_id, fallback=False)
+    return await build_completed_summary_text(session_id, fallback=False)
+
+
+async def _process_summary_job(session_id: str) -> None:
+    async with adb.db_conn() as conn:
+        claimed = await adb.execute(
+            conn,
+            "UPDATE summary_jobs SET status='running', attempts=attempts+1 WHERE session_id=%s AND status='queued'",
+            (session_id,),
+        )
+        if not claimed:
+            return
+        job = await adb.fetch_one(conn, "SELECT kind, attempts FROM summary_jobs WHERE session_id=%s", (session_id,))
+    kind = str((job or {}).get("kind") or "completed")
+    attempts = int((job or {}).get("attempts") or 1)
+
+    try:
+        summary = (await _build(session_id, kind)).strip()
+    except Exception as e:
+        await _retry_or_fail(session_id, kind, attempts, e)
+        return
+
+    async with adb.db_conn() as conn:
+        # 그 사이 같은 세션에 새 작업이 들어왔으면(queued) 이 결과는 버리고 새 작업에 맡긴다.
+        applied = await adb.execute(
+            conn,
+            "UPDATE summary_jobs SET status='done', last_error=NULL WHERE session_id=%s AND status='running' AND kind=%s",
+            (session_id, kind),
+        )
+        if applied and summary:
+            applied = await adb.execute(
+                conn,
+                "UPDATE chat_sessions SET summary=%s WHERE id=%s AND status=%s",
+                (summary, session_id, kind),
+            )
+    if applied and summary:
+        await manager.broadcast_to_admins(
+            {"type": "summary_updated", "data": {"session_id": session_id, "kind": kind, "summary": summary}}
+        )
+
+
+async def _retry_or_fail(session_id: str, kind: str, attempts: int, error: Exception) -> None:
+    reason = f"{type(error).__name__}: {str(error)[:500]}"
+    retry = attempts < load_settings().summary_job_max_attempts
+    async with adb.db_conn() as conn:
+        updated = await adb.execute(
+            conn,
+            "UPDATE summary_jobs SET status=%s, last_error=%s WHERE session_id=%s AND status='running' AND kind=%s",
+            ("queued" if retry else "failed", reason, session_id, kind),
+        )
+    if not updated:
+        return
+    if not retry:
+        _logger().warning(f"[SUMMARY] job failed session_id={session_id} kind={kind} attempts={attempts} reason={reason[:180]}")
+        return
+    delay = _RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+    _logger().info(f"[SUMMARY] retry session_id={session_id} kind={kind} attempt={attempts} in {delay:.0f}s")
+    asyncio.get_running_loop().call_later(delay, submit_summary_job, session_id)
+
+
+async def _recover_summary_jobs() -> None:
+    # updated_at은 DB 세션 시간대 값이므로 DB의 NOW()와 비교한다.
+    async with adb.db_conn() as conn:
+        await adb.execute(
+            conn,
+            "UPDATE summary_jobs SET status='queued' WHERE status='running' AND updated_at < NOW() - INTERVAL %s MINUTE",
+            (STALE_RUNNING_MINUTES,),
+        )
+        rows = await adb.fetch_all(conn, "SELECT session_id FROM summary_jobs WHERE status='queued'", ())
+    for r in rows:
+        submit_summary_job(r["session_id"])
+
+
+async def start_summary_worker() -> None:
+    await _get_pool().start()
+    try:
+        await _recover_summary_jobs()
+    except Exception as e:
+        _logger().warning(f"[SUMMARY] job recovery skipped reason={type(e).__name__}: {str(e)[:180]}")
+
+
+async def stop_summary_worker() -> None:
+    await _get_pool().stop()
+
+
+def summary_worker_stats() -> dict[str, Any]:
+    return _get_pool().stats()
+
+
+_pool: KeyedWorkerPool | None = None
+
+
+def _get_pool() -> KeyedWorkerPool:
+    global _pool
+    if _pool is None:
+        _pool = KeyedWorkerPool("summary", _process_summary_job, concurrency=load_settings().summary_job_concurrency)
+    return _pool
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Callable
+from typing import Any
+
+import pymysql
+
+from .. import db_async as adb
+from .gpt_client import ToolCall
+
+# 판단 한 턴 동안 모델이 요청한 도구(주문 조회 등)를 실행한다.
+# - 한 응답에 담긴 여러 호출은 동시에 실행한다. 호출마다 풀에서 커넥션을 하나씩 빌려 DB executor에서 돌린다
+#   (동시에 쓰는 커넥션 수는 db_async의 슬롯 세마포어가 제한한다).
+#   그래서 판단을 부르는 쪽(reply_worker, admin.provide_info)은 커넥션을 잡지 않은 채로 호출해야 한다.
+# - 같은 턴 안에서 이름/인자가 같은 호출은 한 번만 실행하고 결과를 나눠 쓴다(라운드가 달라도 마찬가지).
+# - 도구별 호출 수/오류/지연 시간을 기록한다(GET /health/db의 ai_tools).
+
+# 도구 함수: (커넥션, 호출, 기본 고객 ID) -> 모델에 돌려줄 결과
+ToolRunner = Callable[[pymysql.Connection, ToolCall, "str | None"], dict[str, Any]]
+
+_TOOL_ERROR_RESULT: dict[str, Any] = {"ok": False, "message": "조회 중 오류가 발생했습니다. 잠시 후 다시 시도해 주세요."}
+
+
+def _logger() -> logging.Logger:
+    return logging.getLogger("uvicorn.error")
+
+
+_stats: dict[str, dict[str, float]] = {}
+
+
+def _entry(name: str) -> dict[str, float]:
+    return _stats.setdefault(name, {"calls": 0, "errors": 0, "memo_hits": 0, "total_ms": 0.0, "max_ms": 0.0})
+
+
+def _record(name: str, elapsed_ms: float, *, error: bool) -> None:
+    s = _entry(name)
+    s["calls"] += 1
+    if error:
+        s["errors"] += 1
+    s["total_ms"] += elapsed_ms
+    s["max_ms"] = max(s["max_ms"], elapsed_ms)
+
+
+def tool_stats() -> dict[str, Any]:
+    out: dict[str, Any] = {}
+    for name, s in _stats.items():
+        calls = int(s["calls"])
+        out[name] = {
+            "calls": calls,
+            "errors": int(s["errors"]),
+            "memo_hits": int(s["memo_hits"]),
+            "avg_ms": round(s["total_ms"] / calls, 1) if calls else 0.0,
+            "max_ms": round(s["max_ms"], 1),
+        }
+    return out
+
+
+def _memo_key(tc: ToolCall, default_customer_id: str | None) -> str:
+    args = dict(tc.arguments or {})
+    # customer_id를 생략한 호출과 현재 고객을 명시한 호출은 같은 조회다.
+    args["customer_id"] = str(args.get("customer_id") or default_customer_id or "").strip()
+    return f"{tc.name}:{json.dumps(args, ensure_ascii=False, sort_keys=True, default=str)}"
+
+
+class ToolExecutor:
+    """판단 한 턴 동안 쓴다(메모이즈 결과는 턴이 끝나면 버린다)."""
+
+    def __init__(self, runner: ToolRunner, default_customer_id: str | None) -> None:
+        self._runner = runner
+        self._customer_id = default_customer_id
+        self._memo: dict[str, asyncio.Task[dict[str, Any]]] = {}
+
+    async def run_all(self, calls: list[ToolCall]) -> list[dict[str, Any]]:
+        """calls 순서대로 결과를 돌려준다. 도구 오류는 예외 대신 실패 결과로 담는다."""
+        return list(await asyncio.gather(*(self._run(tc) for tc in calls)))
+
+    async def _run(self, tc: ToolCall) -> dict[str, Any]:
+        key = _memo_key(tc, self._customer_id)
+        task = self._memo.get(key)
+        if task is None:
+            task = asyncio.create_task(self._execute(tc), name=f"tool-{tc.name}")
+            self._memo[key] = task
+        else:
+            _entry(tc.name)["memo_hits"] += 1
+        return await task
+
+    async def _execute(self, tc: ToolCall) -> dict[str, Any]:
+        started = time.perf_counter()
+        error = False
+        try:
+            async with adb.db_conn() as conn:
+                return await adb.run_in_db(self._runner, conn, tc, self._customer_id)
+        except Exception as e:
+            error = True
+            _logger().warning(f"[AI] tool failed name={tc.name} reason={type(e).__name__}: {str(e)[:180]}")
+            return dict(_TOOL_ERROR_RESULT)
+        finally:
+            _record(tc.name, (time.perf_counter() - started) * 1000, error=error)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+
+def _logger() -> logging.Logger:
+    return logging.getLogger("uvicorn.error")
+
+
+class KeyedWorkerPool:
+    """
+    키(세션 ID 등) 단위로 합쳐지는 asyncio 작업 풀.
+    - 동시에 실행되는 작업 수는 concurrency개로 제한한다.
+    - 같은 키는 한 번에 하나만 실행된다. 대기 중인 키를 다시 submit하면 무시되고,
+      실행 중인 키를 submit하면 끝난 뒤 한 번만 다시 실행한다(연속 메시지 합치기).
+    - handler는 실행 시점의 최신 상태(DB)를 읽어 처리해야 한다.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[str], Awaitable[None]],
+        *,
+        concurrency: int,
+        debounce_seconds: float = 0.0,
+    ) -> None:
+        self._name = name
+        self._handler = handler
+        self._concurrency = max(1, concurrency)
+        self._debounce = max(0.0, debounce_seconds)
+        self._queue: asyncio.Queue[str] | None = None
+        self._queued: set[str] = set()
+        self._running: set[str] = set()
+        self._dirty: set[str] = set()
+        self._tasks: list[asyncio.Task[None]] = []
+        self._stats: dict[str, int] = {"submitted": 0, "coalesced": 0, "completed": 0, "failed": 0}
+
+    def submit(self, key: str) -> None:
+        self._stats["submitted"] += 1
+        if key in self._running:
+            self._dirty.add(key)
+            self._stats["coalesced"] += 1
+            return
+        if key in self._queued:
+            self._stats["coalesced"] += 1
+            return
+        self._queued.add(key)
+        self._get_queue().put_nowait(key)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        for i in range(self._concurrency):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"{self._name}-{i}"))
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict[str, Any]:
+        out: dict[str, Any] = dict(self._stats)
+        out.update({"queued": len(self._queued), "running": len(self._running), "concurrency": self._concurrency})
+        return out
+
+    def _get_queue(self) -> asyncio.Queue[str]:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    async def _worker(self) -> None:
+        queue = self._get_queue()
+        while True:
+            key = await queue.get()
+            try:
+                if self._debounce:
+                    # 짧은 시간 안에 이어지는 메시지를 한 번에 처리하도록 잠시 모은다.
+                    await asyncio.sleep(self._debounce)
+                self._queued.discard(key)
+                self._running.add(key)
+                try:
+                    await self._handler(key)
+                    self._stats["completed"] += 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._stats["failed"] += 1
+                    _logger().warning(f"[{self._name}] job failed key={key} reason={type(e).__name__}: {str(e)[:180]}")
+                finally:
+                    self._running.discard(key)
+                if key in self._dirty:
+                    self._dirty.discard(key)
+                    self.submit(key)
+            finally:
+                queue.task_done()
@@ -1,20 +1,129 @@
 from __future__ import annotations
 
 import asyncio
-from collections import defaultdict
+import logging
+import time
+import uuid
+from collections import defaultdict, deque
+from collections.abc import Callable
 from dataclasses import dataclass, field
 from typing import Any
 
-from fastapi.encoders import jsonable_encoder
 from starlette.websockets import WebSocket
 
+from .config import load_settings
+from .ws_bus import Envelope, EventBus, OutboundEvent, create_event_bus
+
+# 송신은 연결마다 둔 큐와 writer 태스크가 맡는다.
+# - send_to_user/broadcast_to_admins는 각 연결의 큐에 넣기만 하고 바로 돌아온다.
+#   느린 연결 하나가 다른 관리자에게 가는 이벤트나, 이벤트를 보낸 HTTP 요청을 붙잡지 않는다.
+# - 큐가 ws_send_queue_size를 넘으면 ws_slow_consumer_policy에 따라 처리한다.
+#   drop_oldest: 가장 오래된 이벤트를 버린다.
+#   coalesce: 같은 세션의 같은 상태성 이벤트(unread_count_updated 등)가 큐에 있으면 그것을 새 값으로 대체하고,
+#             없으면 가장 오래된 이벤트를 버린다.
+#   disconnect: 연결을 끊는다(클라이언트는 재연결 후 REST로 다시 불러온다).
+# - 전송 한 건이 ws_send_timeout_seconds를 넘기면 멈춘 연결로 보고 끊는다.
+# - 관리자 구독은 토픽 인덱스(토픽 -> 연결 id 집합)로 관리해 수신자를 O(1)로 찾는다.
+#   bucket:<active|pending|completed>: 목록 화면(subscribe_chats), session:<id>: 열어 둔 상담(subscribe_session).
+#   메시지 본문(new_message)은 그 세션을 보고 있는 관리자에게만, 목록에는 미리보기(chat_preview)만 보낸다.
+# - 이벤트는 OutboundEvent로 감싸 받는 연결 수와 관계없이 한 번만 JSON 텍스트로 만들고, 모든 연결에 같은 텍스트 프레임을 보낸다.
+# - send_to_user/broadcast_to_admins/publish는 이벤트를 버스(ws_bus)에 올리고, 각 워커는 자기 프로세스에 붙은
+#   연결에만 전달한다(_deliver). send(ack/error)는 요청을 받은 연결이 이 프로세스에 있으므로 버스를 거치지 않는다.
+# - 사용자에게 가는 이벤트에는 사용자별로 1씩 늘어나는 seq를 붙이고, 최근 ws_replay_buffer_size개를 사용자별 버퍼에 남긴다.
+#   재연결 시 /ws?resume_from=<마지막 seq>&epoch=<ws_hello의 epoch>&conn=<ws_hello의 conn>을 주면 놓친 이벤트를 다시 보내고,
+#   버퍼가 넘쳤거나 이 프로세스가 모르는 스트림(재시작, 다른 워커)이면 resync_required를 보낸다.
+#   끊긴 연결이 구독하던 토픽은 ws_resume_ttl_seconds 동안 스트림이 대신 받아 버퍼에 쌓는다(마지막 연결이 끊긴 뒤에도).
+#   버퍼 항목에는 대상 토픽을 남겨, 재전송은 그 연결이 끊길 때 구독하던 토픽의 이벤트와 사용자 전체 이벤트만 보낸다
+#   (같은 관리자의 다른 탭이 구독한 세션 본문은 보내지 않는다).
+#   ack/error, ws_hello, resync_required와 곧 대체되는 스트리밍 조각(ai_message_delta, transient)에는 seq가 없고 버퍼에도 남기지 않는다.
+
+SLOW_CONSUMER_POLICIES: tuple[str, ...] = ("drop_oldest", "coalesce", "disconnect")
+
+# 최신 값만 의미 있는 이벤트. (type, session_id)가 같으면 앞의 것을 버려도 된다.
+_COALESCIBLE_EVENTS = frozenset({"unread_count_updated", "session_status_changed", "summary_updated", "chat_preview"})
+
+# 연결 하나가 구독할 수 있는 토픽 수 상한
+MAX_TOPICS_PER_CLIENT = 100
+# 사용자별로 재연결을 기다리는 끊긴 연결 수 상한
+_MAX_DETACHED_CONNS = 16
+_PREVIEW_MAX_CHARS = 200
+
+# 1013: Try Again Later
+_SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+def _logger() -> logging.Logger:
+    return logging.getLogger("uvicorn.error")
+
+
+if hasattr(asyncio, "timeout"):
+
+    async def _send_text(websocket: WebSocket, text: str, timeout: float) -> None:
+        # 3.11+: 전송마다 태스크를 만드는 wait_for보다 가볍다.
+        async with asyncio.timeout(timeout):
+            await websocket.send_text(text)
+
+else:
+
+    async def _send_text(websocket: WebSocket, text: str, timeout: float) -> None:
+        await asyncio.wait_for(websocket.send_text(text), timeout=timeout)
+
+
+def bucket_topic(status: str) -> str:
+    return f"bucket:{status}"
+
+
+def session_topic(session_id: str) -> str:
+    return f"session:{session_id}"
+
+
+def _coalesce_key(payload: dict[str, Any]) -> tuple[str, str] | None:
+    event = payload.get("type")
+    if event not in _COALESCIBLE_EVENTS:
+        return None
+    data = payload.get("data")
+    session_id = data.get("session_id") if isinstance(data, dict) else None
+    return (str(event), str(session_id)) if session_id else None
+
+
+def _with_seq(text: str, seq: int) -> str:
+    # 직렬화된 텍스트 앞에 seq 필드만 붙인다(이벤트를 다시 직렬화하지 않는다).
+    if len(text) <= 2:
+        return f'{{"seq":{seq}}}'
+    return f'{{"seq":{seq},{text[1:]}'
+
+
+@dataclass
+class UserStream:
+    """사용자별 이벤트 순번과 재전송 버퍼. epoch는 스트림을 만들 때 정해지며 재시작/다른 워커와 구분한다."""
+
+    user_id: str
+    role: str
+    epoch: str
+    # (seq, 이벤트, 대상 토픽). 토픽이 None이면 사용자/관리자 전체에게 간 이벤트
+    ring: deque[tuple[int, OutboundEvent, frozenset[str] | None]]
+    seq: int = 0
+    sockets: int = 0
+    # 끊긴 연결 토큰 -> (끊길 때 구독하던 토픽, 끊긴 시각)
+    detached_conns: dict[str, tuple[frozenset[str], float]] = field(default_factory=dict)
+    retained_topics: set[str] = field(default_factory=set)
+
 
 @dataclass
 class Client:
     websocket: WebSocket
     user_id: str
     role: str
+    # 재연결 때 이 연결이 구독하던 토픽을 찾는 값(ws_hello의 conn)
+    token: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
     subscriptions: set[str] = field(default_factory=set)
+    # (seq, 이벤트). seq 0은 순번 없는 응답(ack 등)
+    queue: deque[tuple[int, OutboundEvent]] = field(default_factory=deque)
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+    writer: asyncio.Task[None] | None = None
+    closing: bool = False
+    close_code: int | None = None
+    max_depth: int = 0
 
 
 class ConnectionManager:
@@ -23,12 +132,89 @@ class ConnectionManager:
         self._clients: dict[int, Client] = {}
         self._user_sockets: defaultdict[str, set[int]] = defaultdict(set)
         self._admin_sockets: set[int] = set()
+        self._topics: defaultdict[str, set[int]] = defaultdict(set)
+        self._streams: dict[str, UserStream] = {}
+        self._admin_streams: set[str] = set()
+        # 연결이 모두 끊긴 스트림(user_id -> 끊긴 시각, 오래된 순)과, 그 스트림이 계속 받을 토픽(토픽 -> user_id 집합)
+        self._detached: dict[str, float] = {}
+        self._retained: defaultdict[str, set[str]] = defaultdict(set)
+        # 송신 설정은 첫 연결 때 읽어 둔다(.env는 앱 생성 시 로드된다).
+        self._queue_size = 0
+        self._policy = "drop_oldest"
+        self._send_timeout = 10.0
+        self._replay_size = 0
+        self._resume_ttl = 0.0
+        self._stats: dict[str, int] = {
+            "enqueued": 0,
+            "sent": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "slow_disconnects": 0,
+            "send_errors": 0,
+            "resumes": 0,
+            "replayed": 0,
+            "resyncs": 0,
+        }
+        self._bus: EventBus | None = None
+        # 소켓으로 보내지 않는 Envelope(kind -> 처리 함수(targets)). 캐시 무효화 등 모든 노드가 받아야 하는 알림
+        self._control: dict[str, Callable[[tuple[str, ...]], None]] = {}
 
-    async def connect(self, websocket: WebSocket, *, user_id: str, role: str) -> int:
+    async def start_bus(self) -> None:
+        """앱 시작 시 호출. 시작 전(또는 종료 후)에 보낸 이벤트는 이 프로세스의 연결에만 전달한다."""
+        if self._bus is not None:
+            return
+        bus = create_event_bus()
+        await bus.start(self._deliver)
+        self._bus = bus
+        _logger().info(f"[WS-BUS] started backend={bus.name} node_id={bus.node_id}")
+
+    def on_control(self, kind: str, handler: Callable[[tuple[str, ...]], None]) -> None:
+        """버스에서 kind Envelope를 받으면 소켓에 보내지 않고 handler(targets)를 부른다."""
+        self._control[kind] = handler
+
+    async def stop_bus(self) -> None:
+        bus, self._bus = self._bus, None
+        if bus is not None:
+            await bus.stop()
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        *,
+        user_id: str,
+        role: str,
+        resume_from: int | None = None,
+        epoch: str | None = None,
+        conn_token: str | None = None,
+    ) -> int:
+        """
+        resume_from이 있으면 그 뒤의 이벤트를 다시 보내고, 불가능하면 resync_required를 보낸다.
+        없으면 ws_hello(현재 epoch/seq)만 보낸다.
+        """
         await websocket.accept()
+        if not self._queue_size:
+            self._configure()
         client_id = id(websocket)
         client = Client(websocket=websocket, user_id=user_id, role=role)
+        client.writer = asyncio.create_task(self._writer(client), name=f"ws-writer-{client_id}")
         async with self._lock:
+            self._prune_streams()
+            stream, held_topics = self._attach(user_id, role, conn_token if resume_from is not None else None)
+            # 재전송과 등록을 한 번의 잠금 안에서 해서, 재전송 뒤의 새 이벤트가 빠지거나 앞서지 않게 한다.
+            if resume_from is None:
+                self._enqueue(client, (0, self._hello(stream, client, resumed=False, replayed=0)))
+            else:
+                missed = self._missed(stream, epoch, resume_from, held_topics)
+                if missed is None:
+                    self._stats["resyncs"] += 1
+                    resync = {"type": "resync_required", "data": {"epoch": stream.epoch, "seq": stream.seq, "conn": client.token}}
+                    self._enqueue(client, (0, OutboundEvent(resync)))
+                else:
+                    self._stats["resumes"] += 1
+                    self._stats["replayed"] += len(missed)
+                    self._enqueue(client, (0, self._hello(stream, client, resumed=True, replayed=len(missed))))
+                    for item in missed:
+                        self._enqueue(client, item)
             self._clients[client_id] = client
             self._user_sockets[user_id].add(client_id)
             if role == "admin":
@@ -36,49 +222,364 @@ class ConnectionManager:
         return client_id
 
     async def disconnect(self, websocket: WebSocket) -> None:
+        async with self._lock:
+            client = self._remove(id(websocket))
+        if client is None or client.writer is None:
+            return
+        # 이미 끊긴 연결이므로 close는 보내지 않는다. 취소가 wait_for에 묻혀도 writer가 closing을 보고 끝난다.
+        client.closing = True
+        client.wakeup.set()
+        client.writer.cancel()
+        try:
+            await client.writer
+        except (asyncio.CancelledError, Exception):
+            pass
+
+    async def set_subscription(self, websocket: WebSocket, chat_type: str) -> None:
+        await self.subscribe(websocket, bucket_topic(chat_type))
+
+    async def subscribe(self, websocket: WebSocket, topic: str) -> bool:
+        """구독 수 상한을 넘으면 False."""
         client_id = id(websocket)
         async with self._lock:
-            client = self._clients.pop(client_id, None)
+            client = self._clients.get(client_id)
             if client is None:
-                return
-            self._user_sockets[client.user_id].discard(client_id)
-            if client.role == "admin":
-                self._admin_sockets.discard(client_id)
+                return False
+            if topic not in client.subscriptions and len(client.subscriptions) >= MAX_TOPICS_PER_CLIENT:
+                return False
+            client.subscriptions.add(topic)
+            self._topics[topic].add(client_id)
+        return True
 
-    async def set_subscription(self, websocket: WebSocket, chat_type: str) -> None:
+    async def unsubscribe(self, websocket: WebSocket, topic: str) -> None:
         client_id = id(websocket)
         async with self._lock:
             client = self._clients.get(client_id)
             if client is None:
                 return
-            client.subscriptions.add(chat_type)
+            client.subscriptions.discard(topic)
+            self._discard_topic(topic, client_id)
 
-    async def send_to_user(self, user_id: str, payload: dict[str, Any]) -> None:
+    async def send(self, websocket: WebSocket, payload: dict[str, Any]) -> None:
+        """이 연결 하나에 보낸다(ack/error 응답 등). 연결의 다른 이벤트와 같은 큐를 거쳐 순서가 유지된다."""
         async with self._lock:
-            socket_ids = list(self._user_sockets.get(user_id, set()))
-            clients = [self._clients.get(sid) for sid in socket_ids]
-        for client in clients:
-            if client is None:
-                continue
-            await self._safe_send(client.websocket, payload)
+            client = self._clients.get(id(websocket))
+        if client is not None:
+            self._enqueue(client, (0, OutboundEvent(payload)))
+
+    async def send_to_user(self, user_id: str, payload: dict[str, Any], *, transient: bool = False) -> None:
+        """transient=True면 seq 없이 보내고 재전송 버퍼에 남기지 않는다(곧 대체되는 ai_message_delta 등)."""
+        await self._dispatch("user", (user_id,), payload, transient=transient)
 
     async def broadcast_to_admins(self, payload: dict[str, Any], *, require_subscription: str | None = None) -> None:
+        """require_subscription이 있으면 그 상태 목록(bucket)을 구독한 관리자에게만 보낸다."""
+        if require_subscription:
+            await self.publish([bucket_topic(require_subscription)], payload)
+            return
+        await self._dispatch("admins", (), payload)
+
+    async def publish(self, topics: list[str], payload: dict[str, Any]) -> None:
+        """topics 중 하나라도 구독한 연결에 한 번씩 보낸다(다른 워커에 붙은 연결 포함)."""
+        await self._dispatch("topics", tuple(topics), payload)
+
+    async def publish_message(self, session_id: str, message: dict[str, Any], *, bucket: str | None) -> None:
+        """
+        새 메시지를 관리자에게 알린다.
+        그 세션을 보고 있는 관리자는 new_message(본문 전체), bucket 목록 구독자는 chat_preview(목록 갱신용)를 받는다.
+        """
+        await self.publish([session_topic(session_id)], {"type": "new_message", "data": {"session_id": session_id, "message": message}})
+        if bucket:
+            content = str(message.get("content") or "")
+            await self.publish(
+                [bucket_topic(bucket)],
+                {
+                    "type": "chat_preview",
+                    "data": {
+                        "session_id": session_id,
+                        "sender_type": message.get("sender_type"),
+                        "last_message": content[:_PREVIEW_MAX_CHARS],
+                        "last_message_at": message.get("created_at"),
+                    },
+                },
+            )
+
+    def _configure(self) -> None:
+        settings = load_settings()
+        self._queue_size = max(1, settings.ws_send_queue_size)
+        policy = settings.ws_slow_consumer_policy
+        self._policy = policy if policy in SLOW_CONSUMER_POLICIES else "drop_oldest"
+        self._send_timeout = float(settings.ws_send_timeout_seconds)
+        self._replay_size = max(0, settings.ws_replay_buffer_size)
+        self._resume_ttl = max(0.0, float(settings.ws_resume_ttl_seconds))
+
+    async def _dispatch(self, kind: str, targets: tuple[str, ...], payload: dict[str, Any], *, transient: bool = False) -> None:
+        bus = self._bus
+        envelope = Envelope(
+            kind=kind, targets=targets, event=OutboundEvent(payload), origin=bus.node_id if bus else "", transient=transient
+        )
+        if bus is None:
+            await self._deliver(envelope)
+        else:
+            await bus.publish(envelope)
+
+    async def _deliver(self, envelope: Envelope) -> None:
+        """이 프로세스에 붙은 연결 중 envelope 대상에게 큐에 넣고, 대상 사용자 스트림에 seq를 매겨 남긴다."""
+        control = self._control.get(envelope.kind)
+        if control is not None:
+            control(envelope.targets)
+            return
+        event = envelope.event
         async with self._lock:
-            socket_ids = list(self._admin_sockets)
-            clients = [self._clients.get(sid) for sid in socket_ids]
-        for client in clients:
-            if client is None:
-                continue
-            if require_subscription and require_subscription not in client.subscriptions:
+            self._prune_streams()
+            if envelope.kind == "user":
+                socket_ids: set[int] = set()
+                for user_id in envelope.targets:
+                    socket_ids.update(self._user_sockets.get(user_id, ()))
+                user_ids = {u for u in envelope.targets if u in self._streams}
+            elif envelope.kind == "admins":
+                socket_ids = set(self._admin_sockets)
+                user_ids = set(self._admin_streams)
+            else:
+                socket_ids = set()
+                user_ids = set()
+                for topic in envelope.targets:
+                    socket_ids.update(self._topics.get(topic, ()))
+                    user_ids.update(self._retained.get(topic, ()))
+            clients = [c for c in (self._clients.get(sid) for sid in socket_ids) if c is not None]
+            if envelope.transient:
+                for client in clients:
+                    self._enqueue(client, (0, event))
+                return
+            user_ids.update(c.user_id for c in clients)
+            entry_topics = frozenset(envelope.targets) if envelope.kind == "topics" else None
+            seqs: dict[str, int] = {}
+            for user_id in user_ids:
+                stream = self._streams.get(user_id)
+                if stream is None:
+                    continue
+                stream.seq += 1
+                stream.ring.append((stream.seq, event, entry_topics))
+                seqs[user_id] = stream.seq
+            for client in clients:
+                self._enqueue(client, (seqs.get(client.user_id, 0), event))
+
+    @staticmethod
+    def _hello(stream: UserStream, client: Client, *, resumed: bool, replayed: int) -> OutboundEvent:
+        return OutboundEvent(
+            {
+                "type": "ws_hello",
+                "data": {"epoch": stream.epoch, "seq": stream.seq, "conn": client.token, "resumed": resumed, "replayed": replayed},
+            }
+        )
+
+    def _missed(
+        self, stream: UserStream, epoch: str | None, resume_from: int, topics: frozenset[str] | None
+    ) -> list[tuple[int, OutboundEvent]] | None:
+        """
+        resume_from 뒤의 이벤트 중 이 연결이 받았어야 할 것(topics: 끊길 때 구독하던 토픽).
+        버퍼에 빠짐없이 남아 있지 않거나, 한 번에 큐에 못 넣거나, 토픽 이벤트가 있는데 어떤 연결이었는지 모르면 None.
+        """
+        if epoch != stream.epoch or resume_from < 0 or resume_from > stream.seq:
+            return None
+        oldest = stream.ring[0][0] if stream.ring else stream.seq + 1
+        if resume_from + 1 < oldest:
+            return None
+        missed: list[tuple[int, OutboundEvent]] = []
+        for seq, event, entry_topics in stream.ring:
+            if seq <= resume_from:
                 continue
-            await self._safe_send(client.websocket, payload)
+            if entry_topics is not None:
+                if topics is None:
+                    return None
+                if not entry_topics & topics:
+                    continue
+            missed.append((seq, event))
+        if len(missed) >= self._queue_size:
+            return None
+        return missed
 
-    async def _safe_send(self, websocket: WebSocket, payload: dict[str, Any]) -> None:
-        try:
-            await websocket.send_json(jsonable_encoder(payload))
-        except Exception:
-            # 클라이언트가 이미 끊긴 경우 등은 조용히 무시
-            pass
+    def _attach(self, user_id: str, role: str, conn_token: str | None) -> tuple[UserStream, frozenset[str] | None]:
+        """conn_token이 끊긴 연결이면 그 연결이 구독하던 토픽도 돌려준다(그 연결 몫의 대신 받기는 여기서 끝난다)."""
+        stream = self._streams.get(user_id)
+        if stream is not None and stream.role != role:
+            self._drop_stream(user_id)
+            stream = None
+        if stream is None:
+            stream = UserStream(user_id=user_id, role=role, epoch=uuid.uuid4().hex[:12], ring=deque(maxlen=self._replay_size))
+            self._streams[user_id] = stream
+            if role == "admin":
+                self._admin_streams.add(user_id)
+        self._detached.pop(user_id, None)
+        held = stream.detached_conns.pop(conn_token, None) if conn_token else None
+        self._refresh_retained(stream)
+        stream.sockets += 1
+        return stream, held[0] if held is not None else None
+
+    def _detach(self, client: Client) -> None:
+        stream = self._streams.get(client.user_id)
+        if stream is None:
+            return
+        stream.sockets = max(0, stream.sockets - 1)
+        # 끊긴 연결이 구독하던 토픽은 재연결(resume) 전까지 스트림이 대신 받아 버퍼에 쌓는다.
+        stream.detached_conns[client.token] = (frozenset(client.subscriptions), time.monotonic())
+        while len(stream.detached_conns) > _MAX_DETACHED_CONNS:
+            del stream.detached_conns[next(iter(stream.detached_conns))]
+        self._refresh_retained(stream)
+        if stream.sockets == 0:
+            if self._resume_ttl <= 0:
+                self._drop_stream(client.user_id)
+            else:
+                self._detached[client.user_id] = time.monotonic()
+
+    def _refresh_retained(self, stream: UserStream) -> None:
+        # 오래된 끊긴 연결은 버리고, 남은 연결들의 토픽으로 대신 받을 토픽 인덱스를 다시 맞춘다.
+        now = time.monotonic()
+        for token, (_, detached_at) in list(stream.detached_conns.items()):
+            if now - detached_at >= self._resume_ttl:
+                del stream.detached_conns[token]
+        self._release_topics(stream)
+        for topics, _ in stream.detached_conns.values():
+            for topic in topics:
+                stream.retained_topics.add(topic)
+                self._retained[topic].add(stream.user_id)
+
+    def _release_topics(self, stream: UserStream) -> None:
+        for topic in stream.retained_topics:
+            users = self._retained.get(topic)
+            if users is not None:
+                users.discard(stream.user_id)
+                if not users:
+                    del self._retained[topic]
+        stream.retained_topics.clear()
+
+    def _drop_stream(self, user_id: str) -> None:
+        stream = self._streams.pop(user_id, None)
+        if stream is None:
+            return
+        self._admin_streams.discard(user_id)
+        self._detached.pop(user_id, None)
+        stream.detached_conns.clear()
+        self._release_topics(stream)
+
+    def _prune_streams(self) -> None:
+        # _detached는 끊긴 순서대로 들어 있으므로 앞에서부터 만료된 것만 본다.
+        now = time.monotonic()
+        while self._detached:
+            user_id, detached_at = next(iter(self._detached.items()))
+            if now - detached_at < self._resume_ttl:
+                break
+            self._drop_stream(user_id)
+
+    def stats(self) -> dict[str, Any]:
+        depths = [len(c.queue) for c in self._clients.values()]
+        out: dict[str, Any] = dict(self._stats)
+        out.update(
+            {
+                "clients": len(self._clients),
+                "admins": len(self._admin_sockets),
+                "topics": len(self._topics),
+                "streams": len(self._streams),
+                "detached_streams": len(self._detached),
+                "queued": sum(depths),
+                "max_depth": max(depths, default=0),
+                "max_depth_seen": max((c.max_depth for c in self._clients.values()), default=0),
+                "queue_size": self._queue_size,
+                "policy": self._policy,
+                "bus": self._bus.stats() if self._bus is not None else {"backend": "local"},
+            }
+        )
+        return out
+
+    def _remove(self, client_id: int) -> Client | None:
+        client = self._clients.pop(client_id, None)
+        if client is None:
+            return None
+        self._user_sockets[client.user_id].discard(client_id)
+        if not self._user_sockets[client.user_id]:
+            del self._user_sockets[client.user_id]
+        if client.role == "admin":
+            self._admin_sockets.discard(client_id)
+        for topic in client.subscriptions:
+            self._discard_topic(topic, client_id)
+        self._detach(client)
+        return client
+
+    def _discard_topic(self, topic: str, client_id: int) -> None:
+        subscribers = self._topics.get(topic)
+        if subscribers is None:
+            return
+        subscribers.discard(client_id)
+        if not subscribers:
+            del self._topics[topic]
+
+    def _enqueue(self, client: Client, item: tuple[int, OutboundEvent]) -> None:
+        if client.closing:
+            return
+        queue = client.queue
+        if len(queue) >= self._queue_size:
+            policy = self._policy
+            if policy == "disconnect":
+                self._stats["slow_disconnects"] += 1
+                _logger().warning(f"[WS] slow consumer disconnected user_id={client.user_id} role={client.role} queued={len(queue)}")
+                self._close(client, _SLOW_CONSUMER_CLOSE_CODE)
+                return
+            if policy == "coalesce" and self._coalesce(client, item):
+                return
+            queue.popleft()
+            self._stats["dropped"] += 1
+        queue.append(item)
+        self._stats["enqueued"] += 1
+        client.max_depth = max(client.max_depth, len(queue))
+        client.wakeup.set()
+
+    def _coalesce(self, client: Client, item: tuple[int, OutboundEvent]) -> bool:
+        key = _coalesce_key(item[1].payload)
+        if key is None:
+            return False
+        for i, (_, queued) in enumerate(client.queue):
+            if _coalesce_key(queued.payload) == key:
+                # 앞의 값을 지우고 새 값을 뒤에 붙여, 같은 세션의 다른 이벤트보다 앞서지 않게 한다.
+                del client.queue[i]
+                client.queue.append(item)
+                self._stats["coalesced"] += 1
+                client.wakeup.set()
+                return True
+        return False
+
+    def _close(self, client: Client, code: int) -> None:
+        # 더 이상 이벤트를 받지 않도록 목록에서 먼저 빼고, 실제 close는 writer가 한다.
+        client.closing = True
+        client.queue.clear()
+        self._remove(id(client.websocket))
+        client.close_code = code
+        client.wakeup.set()
+
+    async def _writer(self, client: Client) -> None:
+        websocket = client.websocket
+        timeout = self._send_timeout
+        while True:
+            while not client.queue and not client.closing:
+                client.wakeup.clear()
+                await client.wakeup.wait()
+            if client.closing:
+                if client.close_code is not None:
+                    try:
+                        await websocket.close(code=client.close_code)
+                    except Exception:
+                        pass
+                return
+            seq, event = client.queue.popleft()
+            try:
+                await _send_text(websocket, _with_seq(event.text, seq) if seq else event.text, timeout)
+                self._stats["sent"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 끊긴 연결이거나 전송이 멈춘 경우: 이 연결만 정리하고 다른 연결에는 영향을 주지 않는다.
+                self._stats["send_errors"] += 1
+                if isinstance(e, asyncio.TimeoutError):
+                    _logger().warning(f"[WS] send timed out user_id={client.user_id} role={client.role}")
+                self._close(client, _SLOW_CONSUMER_CLOSE_CODE)
 
 
 manager = ConnectionManager()
@@ -0,0 +1,406 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import errno
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import unquote, urlparse
+
+from fastapi.encoders import jsonable_encoder
+
+from .config import load_settings
+
+try:
+    import orjson
+except ImportError:  # requirements.txt에 포함. 휠이 없는 플랫폼 등에서 빠졌으면 표준 json으로 직렬화한다.
+    orjson = None  # type: ignore[assignment]
+
+# WebSocket 이벤트 버스. 여러 uvicorn 워커(프로세스)가 같은 이벤트를 나눠 받게 한다.
+# - ConnectionManager는 보낼 이벤트를 Envelope로 만들어 버스에 올리고, 각 노드(프로세스)는 받은 Envelope를
+#   자기 프로세스에 붙은 소켓에만 전달한다.
+# - 백엔드(WS_BUS)
+#   inprocess: 단일 프로세스. 직렬화 없이 바로 전달한다(기본).
+#   unix: 같은 호스트의 워커끼리 Unix 도메인 데이터그램 소켓으로 주고받는다(브로커 없음).
+#         워커마다 WS_BUS_UNIX_DIR 아래에 소켓을 하나 열고, 발행할 때 디렉터리의 다른 소켓에 보낸다.
+#   redis: Redis 프로토콜(RESP)의 PUBLISH/SUBSCRIBE. 여러 호스트에 걸친 배포용.
+#          backend/scripts/ws_bus_standin.py로 Redis 없이 로컬에서 띄워 볼 수 있다.
+# - 원격 백엔드도 자기 노드에는 바로 전달하고, 버스에서 돌아온 자기 Envelope는 무시한다.
+# - 원격 전송은 최선 노력(best effort)이다. 놓친 이벤트는 클라이언트가 REST로 다시 불러와 맞춘다.
+
+EnvelopeHandler = Callable[["Envelope"], Awaitable[None]]
+
+BUS_BACKENDS: tuple[str, ...] = ("inprocess", "unix", "redis")
+
+# Unix 데이터그램 한 개 크기 상한(리눅스 기본 송신 버퍼보다 작게)
+_MAX_DATAGRAM_BYTES = 200_000
+_PEER_REFRESH_SECONDS = 1.0
+_RECONNECT_MAX_SECONDS = 10.0
+
+
+def _logger() -> logging.Logger:
+    return logging.getLogger("uvicorn.error")
+
+
+def _dumps(payload: dict[str, Any]) -> str:
+    # datetime 등 JSON 기본 타입이 아닌 값만 jsonable_encoder로 바꾼다(페이로드 전체를 다시 훑지 않는다).
+    if orjson is not None:
+        return orjson.dumps(payload, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(payload, default=jsonable_encoder, ensure_ascii=False, separators=(",", ":"))
+
+
+class OutboundEvent:
+    """
+    보낼 이벤트 하나. 직렬화한 텍스트는 처음 필요할 때 만들어 모든 수신자가 같이 쓴다.
+    다른 노드에서 받은 이벤트는 텍스트로 만들고, payload는 필요할 때(coalesce 등)만 파싱한다.
+    """
+
+    __slots__ = ("_payload", "_text")
+
+    def __init__(self, payload: dict[str, Any] | None = None, *, text: str | None = None) -> None:
+        self._payload = payload
+        self._text = text
+
+    @property
+    def payload(self) -> dict[str, Any]:
+        if self._payload is None:
+            self._payload = json.loads(self._text or "{}")
+        return self._payload
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = _dumps(self._payload or {})
+        return self._text
+
+
+@dataclass(frozen=True)
+class Envelope:
+    """
+    kind: user(targets=[user_id]) | admins(전체 관리자) | topics(targets=토픽 목록)
+          | 그 밖의 값은 소켓에 보내지 않는 알림(ConnectionManager.on_control, 예: auth_invalidate)
+    transient: 순번 없이 보내고 재전송 버퍼에 남기지 않는 이벤트(스트리밍 조각 등)
+    """
+
+    kind: str
+    targets: tuple[str, ...]
+    event: OutboundEvent
+    origin: str
+    transient: bool = False
+
+    def encode(self) -> bytes:
+        header: dict[str, Any] = {"o": self.origin, "k": self.kind, "t": list(self.targets)}
+        if self.transient:
+            header["x"] = 1
+        return json.dumps(header, separators=(",", ":")).encode() + b"\n" + self.event.text.encode()
+
+    @classmethod
+    def decode(cls, raw: bytes) -> Envelope:
+        header_raw, _, body = raw.partition(b"\n")
+        header = json.loads(header_raw)
+        return cls(
+            kind=str(header["k"]),
+            targets=tuple(str(t) for t in header.get("t") or ()),
+            event=OutboundEvent(text=body.decode()),
+            origin=str(header.get("o") or ""),
+            transient=bool(header.get("x")),
+        )
+
+
+class EventBus:
+    """백엔드 공통 동작: 자기 노드에는 바로 전달하고, 원격 백엔드는 _send로 다른 노드에 보낸다."""
+
+    name = "inprocess"
+
+    def __init__(self) -> None:
+        self.node_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handler: EnvelopeHandler | None = None
+        self._stats: dict[str, int] = {"published": 0, "received": 0, "send_errors": 0, "decode_errors": 0}
+
+    async def start(self, handler: EnvelopeHandler) -> None:
+        self._handler = handler
+
+    async def stop(self) -> None:
+        self._handler = None
+
+    async def publish(self, envelope: Envelope) -> None:
+        self._stats["published"] += 1
+        if self._handler is not None:
+            await self._handler(envelope)
+        await self._send(envelope)
+
+    def stats(self) -> dict[str, Any]:
+        out: dict[str, Any] = dict(self._stats)
+        out.update({"backend": self.name, "node_id": self.node_id})
+        return out
+
+    async def _send(self, envelope: Envelope) -> None:
+        return None
+
+    async def _receive(self, raw: bytes) -> None:
+        try:
+            envelope = Envelope.decode(raw)
+        except Exception:
+            self._stats["decode_errors"] += 1
+            return
+        if envelope.origin == self.node_id or self._handler is None:
+            return
+        self._stats["received"] += 1
+        try:
+            await self._handler(envelope)
+        except Exception as e:
+            _logger().warning(f"[WS-BUS] delivery failed backend={self.name} reason={type(e).__name__}: {str(e)[:180]}")
+
+
+class InProcessBus(EventBus):
+    name = "inprocess"
+
+
+class _DatagramReceiver(asyncio.DatagramProtocol):
+    def __init__(self, bus: UnixSocketBus) -> None:
+        self._bus = bus
+
+    def datagram_received(self, data: bytes, addr: Any) -> None:
+        asyncio.ensure_future(self._bus._receive(data))
+
+
+class UnixSocketBus(EventBus):
+    name = "unix"
+
+    def __init__(self, directory: str) -> None:
+        super().__init__()
+        self._dir = directory
+        self._path = os.path.join(directory, f"{self.node_id}.sock")
+        self._transport: asyncio.DatagramTransport | None = None
+        self._sender: socket.socket | None = None
+        self._peers: list[str] = []
+        self._peers_at = 0.0
+        self._stats.update({"dropped": 0, "peers_removed": 0})
+
+    async def start(self, handler: EnvelopeHandler) -> None:
+        await super().start(handler)
+        os.makedirs(self._dir, exist_ok=True)
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self._path)
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DatagramReceiver(self), local_addr=self._path, family=socket.AF_UNIX
+        )
+        sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sender.setblocking(False)
+        self._sender = sender
+
+    async def stop(self) -> None:
+        await super().stop()
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        if self._sender is not None:
+            self._sender.close()
+            self._sender = None
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self._path)
+
+    def stats(self) -> dict[str, Any]:
+        out = super().stats()
+        out["peers"] = len(self._peers)
+        return out
+
+    def _peer_paths(self) -> list[str]:
+        now = time.monotonic()
+        if now - self._peers_at >= _PEER_REFRESH_SECONDS:
+            try:
+                names = os.listdir(self._dir)
+            except OSError:
+                names = []
+            self._peers = [os.path.join(self._dir, n) for n in names if n.endswith(".sock") and os.path.join(self._dir, n) != self._path]
+            self._peers_at = now
+        return self._peers
+
+    async def _send(self, envelope: Envelope) -> None:
+        sender = self._sender
+        if sender is None:
+            return
+        data = envelope.encode()
+        if len(data) > _MAX_DATAGRAM_BYTES:
+            self._stats["dropped"] += 1
+            _logger().warning(f"[WS-BUS] event too large for unix datagram bytes={len(data)}")
+            return
+        for path in list(self._peer_paths()):
+            try:
+                sender.sendto(data, path)
+            except BlockingIOError:
+                # 받는 쪽 버퍼가 가득 참(멈춘 워커). 기다리지 않고 버린다.
+                self._stats["dropped"] += 1
+            except OSError as e:
+                if e.errno in (errno.ECONNREFUSED, errno.ENOENT):
+                    # 종료된 워커가 남긴 소켓 파일
+                    with contextlib.suppress(OSError):
+                        os.unlink(path)
+                    with contextlib.suppress(ValueError):
+                        self._peers.remove(path)
+                    self._stats["peers_removed"] += 1
+                else:
+                    self._stats["send_errors"] += 1
+
+
+def _resp_command(*parts: str | bytes) -> bytes:
+    out = [b"*%d\r\n" % len(parts)]
+    for p in parts:
+        b = p if isinstance(p, bytes) else p.encode()
+        out.append(b"$%d\r\n%s\r\n" % (len(b), b))
+    return b"".join(out)
+
+
+async def _read_resp(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Redis 연결이 닫혔습니다.")
+    prefix, rest = line[:1], line[1:-2]
+    if prefix == b"+":
+        return rest.decode()
+    if prefix == b"-":
+        raise RuntimeError(f"Redis 오류: {rest.decode(errors='replace')}")
+    if prefix == b":":
+        return int(rest)
+    if prefix == b"$":
+        size = int(rest)
+        if size < 0:
+            return None
+        data = await reader.readexactly(size + 2)
+        return data[:-2]
+    if prefix == b"*":
+        count = int(rest)
+        if count < 0:
+            return None
+        return [await _read_resp(reader) for _ in range(count)]
+    raise RuntimeError(f"알 수 없는 RESP 응답: {line[:40]!r}")
+
+
+class RedisBus(EventBus):
+    """PUBLISH용 연결과 SUBSCRIBE용 연결을 하나씩 쓰는 최소 RESP 클라이언트."""
+
+    name = "redis"
+
+    def __init__(self, url: str, channel: str) -> None:
+        super().__init__()
+        parsed = urlparse(url)
+        self._host = parsed.hostname or "127.0.0.1"
+        self._port = parsed.port or 6379
+        self._password = unquote(parsed.password) if parsed.password else None
+        self._username = unquote(parsed.username) if parsed.username else None
+        self._channel = channel
+        self._pub: tuple[asyncio.StreamReader, asyncio.StreamWriter] | None = None
+        self._pub_lock = asyncio.Lock()
+        self._sub_task: asyncio.Task[None] | None = None
+        self._stats.update({"reconnects": 0})
+
+    async def start(self, handler: EnvelopeHandler) -> None:
+        await super().start(handler)
+        self._sub_task = asyncio.create_task(self._subscribe_loop(), name="ws-bus-redis-sub")
+
+    async def stop(self) -> None:
+        await super().stop()
+        if self._sub_task is not None:
+            self._sub_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await self._sub_task
+            self._sub_task = None
+        await self._close_pub()
+
+    async def _open(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(self._host, self._port)
+        if self._password is not None:
+            auth = ("AUTH", self._username, self._password) if self._username else ("AUTH", self._password)
+            writer.write(_resp_command(*auth))
+            await writer.drain()
+            await _read_resp(reader)
+        return reader, writer
+
+    async def _close_pub(self) -> None:
+        pub, self._pub = self._pub, None
+        if pub is not None:
+            pub[1].close()
+            with contextlib.suppress(Exception):
+                await pub[1].wait_closed()
+
+    async def _send(self, envelope: Envelope) -> None:
+        data = _resp_command("PUBLISH", self._channel, envelope.encode())
+        async with self._pub_lock:
+            for attempt in range(2):
+                try:
+                    if self._pub is None:
+                        self._pub = await self._open()
+                    reader, writer = self._pub
+                    writer.write(data)
+                    await writer.drain()
+                    await _read_resp(reader)
+                    return
+                except (OSError, ConnectionError, asyncio.IncompleteReadError, RuntimeError) as e:
+                    await self._close_pub()
+                    if attempt:
+                        self._stats["send_errors"] += 1
+                        _logger().warning(f"[WS-BUS] redis publish failed reason={type(e).__name__}: {str(e)[:180]}")
+
+    async def _subscribe_loop(self) -> None:
+        delay = 0.5
+        while True:
+            writer: asyncio.StreamWriter | None = None
+            try:
+                reader, writer = await self._open()
+                writer.write(_resp_command("SUBSCRIBE", self._channel))
+                await writer.drain()
+                delay = 0.5
+                while True:
+                    reply = await _read_resp(reader)
+                    if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+                        await self._receive(reply[2])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["reconnects"] += 1
+                _logger().warning(f"[WS-BUS] redis subscribe lost reason={type(e).__name__}: {str(e)[:180]} retry_in={delay:.1f}s")
+            finally:
+                if writer is not None:
+                    writer.close()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _RECONNECT_MAX_SECONDS)
+
+
+def create_event_bus() -> EventBus:
+    settings = load_settings()
+    backend = settings.ws_bus
+    if backend == "unix":
+        return UnixSocketBus(settings.ws_bus_unix_dir)
+    if backend == "redis":
+        return RedisBus(settings.ws_bus_redis_url, settings.ws_bus_channel)
+    if backend != "inprocess":
+        _logger().warning(f"[WS-BUS] unknown WS_BUS={backend}, using inprocess")
+    return InProcessBus()
+
+
+async def publish_from_outside(kind: str, targets: tuple[str, ...]) -> dict[str, Any] | None:
+    """
+    서버 밖(scripts/*)에서 설정된 버스로 알림 Envelope 하나를 보낸다. 보낸 버스의 stats를 돌려준다.
+    inprocess면 받을 워커가 없으므로 보내지 않고 None.
+    """
+    bus = create_event_bus()
+    if isinstance(bus, InProcessBus):
+        return None
+
+    async def _ignore(_: Envelope) -> None:
+        return None
+
+    await bus.start(_ignore)
+    try:
+        await bus.publish(Envelope(kind=kind, targets=targets, event=OutboundEvent({}), origin=bus.node_id))
+    finally:
+        await bus.stop()
+    return bus.stats()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.encoders import jsonable_encoder
+
+from app import ws_bus
+from app.ws import ConnectionManager
+
+# 관리자 수별로 new_message 브로드캐스트 1건에 드는 CPU 시간을 잰다(DB/네트워크 없이 메모리 소켓 사용).
+# - legacy: 예전 방식처럼 수신자마다 jsonable_encoder + json 직렬화
+# - manager: ConnectionManager(이벤트당 한 번 직렬화 후 같은 텍스트 프레임 전송)
+
+
+class _NullWebSocket:
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, text: str) -> None:
+        pass
+
+    async def send_json(self, data: Any) -> None:
+        # starlette WebSocket.send_json과 같은 직렬화
+        json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+
+def _payload(i: int) -> dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    message = {
+        "id": f"msg-{i:08d}",
+        "session_id": "bench-session",
+        "seq": i,
+        "sender_type": "user",
+        "sender_id": "bench-customer",
+        "content": "주문한 상품이 아직 배송 준비 중으로 나오는데 언제 출발하나요? 주문번호는 ORD-2025-0001 입니다.",
+        "attachments": None,
+        "is_read": False,
+        "created_at": now,
+    }
+    return {"type": "new_message", "data": {"session_id": "bench-session", "message": message}}
+
+
+async def _bench_legacy(sockets: list[_NullWebSocket], rounds: int) -> float:
+    started = time.process_time()
+    for i in range(rounds):
+        payload = _payload(i)
+        for ws in sockets:
+            await ws.send_json(jsonable_encoder(payload))
+    return (time.process_time() - started) / rounds
+
+
+async def _bench_manager(sockets: list[_NullWebSocket], rounds: int) -> float:
+    manager = ConnectionManager()
+    for n, ws in enumerate(sockets):
+        await manager.connect(ws, user_id=f"admin-{n}", role="admin")  # type: ignore[arg-type]
+    started = time.process_time()
+    for i in range(rounds):
+        await manager.broadcast_to_admins(_payload(i))
+        # writer 태스크가 큐를 비울 때까지 양보(전송 CPU 시간까지 포함해 잰다)
+        while manager.stats()["queued"]:
+            await asyncio.sleep(0)
+    elapsed = (time.process_time() - started) / rounds
+    for ws in sockets:
+        await manager.disconnect(ws)  # type: ignore[arg-type]
+    return elapsed
+
+
+async def _run(admin_counts: list[int], rounds: int) -> None:
+    print(f"json encoder: {'orjson' if ws_bus.orjson is not None else 'json'}  rounds={rounds}")
+    print(f"{'admins':>7} {'legacy(us)':>12} {'manager(us)':>12} {'speedup':>8}")
+    for count in admin_counts:
+        sockets = [_NullWebSocket() for _ in range(count)]
+        legacy = await _bench_legacy(sockets, rounds)
+        current = await _bench_manager(sockets, rounds)
+        speedup = legacy / current if current else float("inf")
+        print(f"{count:>7} {legacy * 1e6:>12.1f} {current * 1e6:>12.1f} {speedup:>7.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="WebSocket 브로드캐스트 1건당 CPU 시간을 관리자 수별로 측정합니다.")
+    parser.add_argument("--admins", default="1,10,25,50,100,200", help="관리자 연결 수 목록(쉼표 구분)")
+    parser.add_argument("--rounds", type=int, default=500, help="관리자 수마다 보낼 브로드캐스트 수")
+    parser.add_argument("--encoder", choices=["orjson", "json"], default="orjson", help="manager 쪽 직렬화(json: 표준 json과 비교)")
+    args = parser.parse_args()
+    if args.encoder == "json":
+        ws_bus.orjson = None
+    elif ws_bus.orjson is None:
+        raise SystemExit("orjson이 설치돼 있지 않습니다(pip install -r requirements.txt). 표준 json으로 재려면 --encoder json")
+    counts = [int(x) for x in args.admins.split(",") if x.strip()]
+    asyncio.run(_run(counts, max(1, args.rounds)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
 import os
 import sys
 import uuid
@@ -10,7 +11,24 @@ from dotenv import load_dotenv
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
 from app.db import db_conn, execute, fetch_one
+from app.routes.auth import PRINCIPAL_INVALIDATE_KIND
 from app.security import hash_password
+from app.ws_bus import publish_from_outside
+
+
+def _invalidate_server_cache(user_id: str) -> None:
+    # 서버와 같은 WS_BUS 설정(.env)으로 알림을 보내면 모든 워커가 그 사용자의 인증 캐시를 비운다.
+    try:
+        stats = asyncio.run(publish_from_outside(PRINCIPAL_INVALIDATE_KIND, (user_id,)))
+    except Exception as e:
+        print(f"서버 캐시 무효화 알림을 보내지 못했습니다({type(e).__name__}). AUTH_CACHE_TTL_SECONDS 이내에 반영됩니다.")
+        return
+    if stats is None:
+        print("WS_BUS=inprocess라 알릴 수 없습니다. 실행 중인 서버에는 AUTH_CACHE_TTL_SECONDS(기본 60초) 이내에 반영됩니다.")
+    elif stats.get("send_errors"):
+        print(f"서버 캐시 무효화 알림을 보내지 못했습니다(WS_BUS={stats['backend']}). AUTH_CACHE_TTL_SECONDS 이내에 반영됩니다.")
+    else:
+        print(f"실행 중인 서버의 인증 사용자 캐시 무효화를 알렸습니다(WS_BUS={stats['backend']}).")
 
 
 def main() -> None:
@@ -37,15 +55,22 @@ def main() -> None:
                 (password_hash, name, args.role, existing["id"]),
             )
             print(f"사용자 계정을 갱신했습니다: {email} (role={args.role})")
-            return
-
-        user_id = uuid.uuid4().hex
-        execute(
-            conn,
-            "INSERT INTO users (id, email, password_hash, name, role) VALUES (%s,%s,%s,%s,%s)",
-            (user_id, email, password_hash, name, args.role),
-        )
-        print(f"사용자 계정을 생성했습니다: {email} (role={args.role})")
+            updated_id = str(existing["id"])
+        else:
+            # 새 사용자 ID는 캐시에 있을 수 없으므로 무효화할 것이 없다.
+            updated_id = None
+            user_id = uuid.uuid4().hex
+            execute(
+                conn,
+                "INSERT INTO users (id, email, password_hash, name, role) VALUES (%s,%s,%s,%s,%s)",
+                (user_id, email, password_hash, name, args.role),
+            )
+            print(f"사용자 계정을 생성했습니다: {email} (role={args.role})")
+
+    if updated_id is None:
+        return
+    # 실행 중인 서버는 인증 사용자 캐시를 쓰므로 커밋 뒤에 비운다(못 보내면 AUTH_CACHE_TTL_SECONDS 안에 반영).
+    _invalidate_server_cache(updated_id)
 
 
 if __name__ == "__main__":
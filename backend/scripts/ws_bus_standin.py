@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import defaultdict
+
+# WS_BUS=redis를 Redis 없이 로컬에서 확인하기 위한 최소 pub/sub 서버.
+# RESP의 PING/AUTH/SUBSCRIBE/UNSUBSCRIBE/PUBLISH만 처리한다(저장, 패턴 구독, 영속성 없음).
+#   python scripts/ws_bus_standin.py --port 6390
+#   WS_BUS=redis WS_BUS_REDIS_URL=redis://127.0.0.1:6390/0 uvicorn app.main:app --workers 2
+
+
+def _bulk(b: bytes) -> bytes:
+    return b"$%d\r\n%s\r\n" % (len(b), b)
+
+
+def _array(*items: bytes) -> bytes:
+    return b"*%d\r\n" % len(items) + b"".join(items)
+
+
+class StandInServer:
+    def __init__(self, *, verbose: bool = False) -> None:
+        self._channels: defaultdict[bytes, set[asyncio.StreamWriter]] = defaultdict(set)
+        self._verbose = verbose
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        subscribed: set[bytes] = set()
+        try:
+            while True:
+                command = await self._read_command(reader)
+                if command is None:
+                    return
+                name = command[0].upper() if command else b""
+                args = command[1:]
+                if name == b"PING":
+                    writer.write(b"+PONG\r\n")
+                elif name == b"AUTH":
+                    writer.write(b"+OK\r\n")
+                elif name == b"SUBSCRIBE":
+                    for channel in args:
+                        subscribed.add(channel)
+                        self._channels[channel].add(writer)
+                        writer.write(_array(_bulk(b"subscribe"), _bulk(channel), b":%d\r\n" % len(subscribed)))
+                elif name == b"UNSUBSCRIBE":
+                    for channel in args or list(subscribed):
+                        subscribed.discard(channel)
+                        self._channels[channel].discard(writer)
+                        writer.write(_array(_bulk(b"unsubscribe"), _bulk(channel), b":%d\r\n" % len(subscribed)))
+                elif name == b"PUBLISH" and len(args) == 2:
+                    channel, message = args
+                    receivers = list(self._channels.get(channel, ()))
+                    frame = _array(_bulk(b"message"), _bulk(channel), _bulk(message))
+                    for w in receivers:
+                        w.write(frame)
+                    writer.write(b":%d\r\n" % len(receivers))
+                    if self._verbose:
+                        print(f"PUBLISH {channel.decode(errors='replace')} bytes={len(message)} receivers={len(receivers)}")
+                else:
+                    writer.write(b"-ERR unsupported command\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            return
+        finally:
+            for channel in subscribed:
+                self._channels[channel].discard(writer)
+            writer.close()
+
+    @staticmethod
+    async def _read_command(reader: asyncio.StreamReader) -> list[bytes] | None:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # 인라인 명령(redis-cli 없이 nc 등으로 보낸 경우)
+            return line.strip().split()
+        parts: list[bytes] = []
+        for _ in range(int(line[1:-2])):
+            header = await reader.readline()
+            size = int(header[1:-2])
+            data = await reader.readexactly(size + 2)
+            parts.append(data[:-2])
+        return parts
+
+
+async def _serve(host: str, port: int, verbose: bool) -> None:
+    server = await asyncio.start_server(StandInServer(verbose=verbose).handle, host, port)
+    print(f"ws bus stand-in listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="WS_BUS=redis 확인용 최소 pub/sub 서버를 띄웁니다(Redis 대용).")
+    parser.add_argument("--host", default="127.0.0.1", help="바인드 주소")
+    parser.add_argument("--port", type=int, default=6390, help="포트")
+    parser.add_argument("--verbose", action="store_true", help="PUBLISH마다 출력")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args.host, args.port, args.verbose))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
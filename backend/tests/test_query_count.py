@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import sys
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Any
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app import db_async as adb
+from app.db import query_count
+from app.routes import admin, chats
+from app.schemas import ProvideInfoRequest, SendMessageRequest, UserOut
+from app.services import session_cache
+from app.services.chat_ai import ChatAiDecision
+
+# 메시지 파이프라인의 DB 왕복 수를 센다(MySQL 없이 메모리 DB로 흉내 낸다).
+# FakeConnection.cursor()는 _CountingCursor처럼 실행마다 conn.query_count를 올리므로 db.query_count(conn)로 확인한다.
+
+SESSION_ID = "s-1"
+CUSTOMER = UserOut(id="c-1", email="customer@example.com", name="customer", role="customer")
+ADMIN = UserOut(id="a-1", email="admin@example.com", name="admin", role="admin")
+
+
+class FakeDb:
+    def __init__(self) -> None:
+        started = datetime(2025, 1, 1, 9, 0, 0)
+        self.session: dict[str, Any] = {
+            "id": SESSION_ID,
+            "customer_id": CUSTOMER.id,
+            "status": "active",
+            "handler_type": "ai",
+            "category": "주문 문의",
+            "started_at": started,
+            "pending_at": None,
+            "completed_at": None,
+            "summary": None,
+        }
+        self.metadata: dict[str, Any] = {"last_seq": 0, "unread_count": 0, "context_summary": None, "context_summary_seq": 0}
+        self.messages: list[dict[str, Any]] = []
+        self.open_connections = 0
+        self.connections: list[FakeConnection] = []
+
+    def add_message(self, sender_type: str, content: str) -> None:
+        """다른 프로세스가 저장한 메시지처럼 DB에만 넣는다."""
+        self.metadata["last_seq"] += 1
+        self.messages.append(
+            {"seq": self.metadata["last_seq"], "sender_type": sender_type, "content": content, "created_at": datetime(2025, 1, 1, 9, 1)}
+        )
+
+    def run(self, sql: str, params: tuple[Any, ...]) -> tuple[list[dict[str, Any]], int, int]:
+        """(결과 행, rowcount, lastrowid)"""
+        q = " ".join(sql.split())
+        md = self.metadata
+        if q.startswith("SELECT s.*, md.last_seq AS md_last_seq"):
+            row = dict(self.session)
+            row.update(
+                {
+                    "md_last_seq": md["last_seq"],
+                    "md_context_summary": md["context_summary"],
+                    "md_context_summary_seq": md["context_summary_seq"],
+                    "customer_email": CUSTOMER.email,
+                    "customer_name": CUSTOMER.name,
+                }
+            )
+            return [row], 1, 0
+        if q.startswith("SELECT seq, sender_type, content, created_at FROM messages"):
+            after = int(params[1]) if "seq > %s" in q else 0
+            return [dict(m) for m in self.messages if m["seq"] > after], 0, 0
+        if q.startswith("SELECT * FROM chat_sessions WHERE id=%s"):
+            return [dict(self.session)], 1, 0
+        if q.startswith("UPDATE chat_session_metadata SET last_seq=LAST_INSERT_ID(last_seq+1)"):
+            md["last_seq"] += 1
+            return [], 1, md["last_seq"]
+        if "unread_count=LAST_INSERT_ID(unread_count + 1)" in q:
+            md["unread_count"] += 1
+            return [], 1, md["unread_count"]
+        if q.startswith("INSERT INTO messages"):
+            if " SELECT " in q:
+                # INSERT ... SELECT ... WHERE status=%s AND handler_type='ai'
+                msg_id, seq, content, created_at, _, status = params
+                if (self.session["status"], self.session["handler_type"]) != (status, "ai"):
+                    return [], 0, 0
+                sender_type = "ai"
+            else:
+                msg_id, _, seq, *rest = params
+                sender_type = "agent" if "'agent'" in q else rest[0]
+                content = rest[0] if "'agent'" in q else rest[2]
+                created_at = params[-1]
+            self.messages.append({"seq": seq, "sender_type": sender_type, "content": content, "created_at": created_at})
+            return [], 1, 0
+        if q.startswith("UPDATE chat_sessions SET status='active'"):
+            self.session.update({"status": "active", "handler_type": "ai", "pending_at": None})
+            return [], 1, 0
+        if q.startswith("UPDATE chat_sessions"):
+            if "AND status='active' AND handler_type='ai'" in q and (self.session["status"], self.session["handler_type"]) != ("active", "ai"):
+                return [], 0, 0
+            if "status='completed'" in q:
+                self.session["status"] = "completed"
+            return [], 1, 0
+        if q.startswith(("INSERT", "UPDATE")):
+            return [], 1, 0
+        raise AssertionError(f"예상하지 못한 쿼리: {q[:120]}")
+
+
+class FakeCursor:
+    def __init__(self, conn: FakeConnection) -> None:
+        self.connection = conn
+        self._rows: list[dict[str, Any]] = []
+        self.rowcount = 0
+        self.lastrowid = 0
+
+    def __enter__(self) -> FakeCursor:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def execute(self, sql: str, params: tuple[Any, ...] = ()) -> int:
+        conn = self.connection
+        conn.query_count = getattr(conn, "query_count", 0) + 1
+        conn.queries.append(" ".join(sql.split()))
+        self._rows, self.rowcount, self.lastrowid = conn.db.run(sql, tuple(params or ()))
+        return self.rowcount
+
+    def fetchone(self) -> dict[str, Any] | None:
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self) -> list[dict[str, Any]]:
+        return list(self._rows)
+
+
+class FakeConnection:
+    def __init__(self, db: FakeDb) -> None:
+        self.db = db
+        self.query_count = 0
+        self.queries: list[str] = []
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self)
+
+    def commit(self) -> None:
+        return None
+
+    def rollback(self) -> None:
+        return None
+
+
+@pytest.fixture
+def fake_db(monkeypatch: pytest.MonkeyPatch) -> FakeDb:
+    db = FakeDb()
+
+    @contextlib.asynccontextmanager
+    async def db_conn() -> AsyncIterator[FakeConnection]:
+        conn = FakeConnection(db)
+        db.connections.append(conn)
+        db.open_connections += 1
+        try:
+            yield conn
+        finally:
+            db.open_connections -= 1
+
+    async def run_in_db(fn, *args):
+        return fn(*args)
+
+    monkeypatch.setattr(adb, "db_conn", db_conn)
+    monkeypatch.setattr(adb, "run_in_db", run_in_db)
+    monkeypatch.setattr(session_cache, "_cache", None)
+    # 설정은 프로세스 캐시에서 읽으므로(버전 확인 주기마다 1번) 파이프라인 쿼리 수에서 뺀다.
+    monkeypatch.setattr(admin, "get_settings_map", lambda conn: {"auto_close": True})
+    monkeypatch.setattr(chats, "submit_reply_job", lambda session_id: None)
+    monkeypatch.setattr(admin, "submit_summary_job", lambda session_id: None)
+    return db
+
+
+async def _load(db: FakeDb) -> tuple[int, session_cache.SessionContext | None]:
+    async with adb.db_conn() as conn:
+        ctx = await session_cache.load_session_context(conn, SESSION_ID)
+        return query_count(conn), ctx
+
+
+def test_session_context_is_one_query_when_hot(fake_db: FakeDb) -> None:
+    fake_db.add_message("user", "배송 언제 와요?")
+
+    count, ctx = asyncio.run(_load(fake_db))
+    assert count == 2  # 처음 읽는 세션: 조인 조회 + 메시지 전체
+    assert ctx is not None and [r["content"] for r in ctx.rows] == ["배송 언제 와요?"]
+    assert ctx.customer_email == CUSTOMER.email
+
+    count, _ = asyncio.run(_load(fake_db))
+    assert count == 1  # 캐시가 최신: 조인 조회만
+
+    fake_db.add_message("ai", "확인해 드릴게요.")
+    count, ctx = asyncio.run(_load(fake_db))
+    assert count == 2  # 새 메시지: 조인 조회 + 그 뒤의 메시지만
+    assert ctx is not None and [r["seq"] for r in ctx.rows] == [1, 2]
+
+    count, _ = asyncio.run(_load(fake_db))
+    assert count == 1
+
+
+def test_send_message_does_not_reselect_inserted_rows(fake_db: FakeDb) -> None:
+    res = asyncio.run(chats.send_message(SendMessageRequest(session_id=SESSION_ID, content="환불하고 싶어요"), current_user=CUSTOMER))
+
+    assert res.success
+    assert res.data["message"]["seq"] == 1
+    (conn,) = fake_db.connections
+    # 세션 조회, 순번, 메시지 INSERT, 메타데이터 UPDATE(unread_count 포함), AI 응답 작업 등록
+    assert query_count(conn) == 5
+    assert not any(q.startswith("SELECT") and "FROM messages" in q for q in conn.queries)
+    assert not any("FROM chat_session_metadata" in q for q in conn.queries)
+
+    # 저장한 메시지는 세션 캐시에 바로 반영되어 워커의 맥락 조회는 1번으로 끝난다.
+    asyncio.run(_load(fake_db))
+    count, ctx = asyncio.run(_load(fake_db))
+    assert count == 1
+    assert ctx is not None and ctx.rows[-1]["content"] == "환불하고 싶어요"
+
+
+def test_provide_info_query_counts_and_no_connection_during_decision(fake_db: FakeDb, monkeypatch: pytest.MonkeyPatch) -> None:
+    fake_db.session.update({"status": "pending", "handler_type": "ai"})
+    fake_db.add_message("user", "주문번호 1234 환불해 주세요")
+    asyncio.run(_load(fake_db))  # 세션 캐시를 채워 둔다(hot)
+    fake_db.connections.clear()
+
+    open_during_decision: list[int] = []
+
+    async def fake_decide(**kwargs: Any) -> ChatAiDecision:
+        open_during_decision.append(fake_db.open_connections)
+        assert kwargs["admin_instruction"] == "환불 접수 완료"
+        return ChatAiDecision(
+            category="환불 요청",
+            needs_human=False,
+            response="환불 접수가 완료되었습니다.",
+            wait_time_minutes=None,
+            reason=None,
+            complete=False,
+            summary=None,
+            action_items=(),
+        )
+
+    monkeypatch.setattr(admin, "decide_ai_reply", fake_decide)
+    res = asyncio.run(admin.provide_info(SESSION_ID, ProvideInfoRequest(info="환불 접수 완료"), current_user=ADMIN))
+
+    assert res.success
+    # 판단(GPT, 도구 호출) 동안에는 커넥션을 잡고 있지 않는다.
+    assert open_during_decision == [0]
+    first, second = fake_db.connections
+    # 1) 맥락(hot이면 조인 조회 1번), active 복귀, 순번, 관리자 메시지 INSERT, 메타데이터
+    assert query_count(first) == 5
+    # 2) 카테고리, 순번, AI 메시지 INSERT, 메타데이터
+    assert query_count(second) == 4
+    assert [m["sender_type"] for m in fake_db.messages] == ["user", "agent", "ai"]
+
+
+def test_provide_info_discards_reply_when_session_changed(fake_db: FakeDb, monkeypatch: pytest.MonkeyPatch) -> None:
+    fake_db.add_message("user", "문의드려요")
+
+    async def fake_decide(**kwargs: Any) -> ChatAiDecision:
+        # 판단하는 동안 다른 관리자가 상담을 가져간 경우
+        fake_db.session["handler_type"] = "agent"
+        return ChatAiDecision(
+            category=None,
+            needs_human=False,
+            response="안내드립니다.",
+            wait_time_minutes=None,
+            reason=None,
+            complete=False,
+            summary=None,
+            action_items=(),
+        )
+
+    monkeypatch.setattr(admin, "decide_ai_reply", fake_decide)
+    res = asyncio.run(admin.provide_info(SESSION_ID, ProvideInfoRequest(info="안내 부탁"), current_user=ADMIN))
+
+    assert res.success
+    assert [m["sender_type"] for m in fake_db.messages] == ["user", "agent"]
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import os
+import sys
+from collections.abc import AsyncIterator, Callable
+from typing import Any
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from app.routes import auth
+from app.schemas import UserOut
+from app.ws import ConnectionManager, bucket_topic, session_topic
+from app.ws_bus import publish_from_outside
+from ws_bus_standin import StandInServer
+
+# 두 ConnectionManager(워커 두 개)를 같은 버스에 붙여, 한쪽에서 보낸 이벤트가 다른 쪽의 대상 소켓에만 가는지 본다.
+# redis는 scripts/ws_bus_standin.py를 로컬 포트에 띄워 확인한다.
+
+
+class FakeWebSocket:
+    def __init__(self) -> None:
+        self.received: list[dict[str, Any]] = []
+
+    async def accept(self) -> None:
+        return None
+
+    async def send_text(self, text: str) -> None:
+        self.received.append(json.loads(text))
+
+    async def close(self, code: int = 1000) -> None:
+        return None
+
+    def types(self) -> list[str]:
+        return [e["type"] for e in self.received if e["type"] != "ws_hello"]
+
+
+async def _wait_until(cond: Callable[[], bool], timeout: float = 3.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not cond():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("시간 안에 이벤트가 도착하지 않았습니다.")
+        await asyncio.sleep(0.01)
+
+
+@contextlib.asynccontextmanager
+async def _nodes(backend: str, monkeypatch: pytest.MonkeyPatch, tmp_path: Any) -> AsyncIterator[tuple[ConnectionManager, ConnectionManager]]:
+    monkeypatch.setenv("WS_BUS", backend)
+    server: asyncio.Server | None = None
+    standin = StandInServer()
+    if backend == "unix":
+        monkeypatch.setenv("WS_BUS_UNIX_DIR", str(tmp_path / "bus"))
+    elif backend == "redis":
+        server = await asyncio.start_server(standin.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        monkeypatch.setenv("WS_BUS_REDIS_URL", f"redis://127.0.0.1:{port}/0")
+    nodes = (ConnectionManager(), ConnectionManager())
+    for node in nodes:
+        await node.start_bus()
+    if backend == "redis":
+        # 두 노드의 SUBSCRIBE가 끝난 뒤에 발행한다.
+        await _wait_until(lambda: sum(len(w) for w in standin._channels.values()) == 2)
+    try:
+        yield nodes
+    finally:
+        for node in nodes:
+            await node.stop_bus()
+        if server is not None:
+            # 끊긴 연결의 핸들러가 먼저 끝나도록 잠깐 기다린 뒤 닫는다.
+            await _wait_until(lambda: not any(standin._channels.values()))
+            server.close()
+            await server.wait_closed()
+
+
+async def _connect(node: ConnectionManager, user_id: str, role: str, *topics: str) -> FakeWebSocket:
+    ws = FakeWebSocket()
+    await node.connect(ws, user_id=user_id, role=role)  # type: ignore[arg-type]
+    for topic in topics:
+        assert await node.subscribe(ws, topic)  # type: ignore[arg-type]
+    await _wait_until(lambda: bool(ws.received))
+    return ws
+
+
+async def _close(node: ConnectionManager, *sockets: FakeWebSocket) -> None:
+    for ws in sockets:
+        await node.disconnect(ws)  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize("backend", ["unix", "redis"])
+def test_envelope_reaches_only_matching_sockets_on_other_node(backend: str, monkeypatch: pytest.MonkeyPatch, tmp_path: Any) -> None:
+    async def scenario() -> None:
+        async with _nodes(backend, monkeypatch, tmp_path) as (a, b):
+            sender = await _connect(a, "admin-a", "admin", session_topic("s-1"))
+            watching = await _connect(b, "admin-b", "admin", session_topic("s-1"), bucket_topic("active"))
+            other = await _connect(b, "admin-c", "admin", bucket_topic("pending"))
+            customer = await _connect(b, "customer-1", "customer")
+            bystander = await _connect(b, "customer-2", "customer")
+
+            await a.publish_message("s-1", {"content": "환불해 주세요", "sender_type": "user"}, bucket="active")
+            await a.send_to_user("customer-1", {"type": "agent_connected", "data": {}})
+            await a.broadcast_to_admins({"type": "status_changed", "data": {}})
+
+            await _wait_until(lambda: len(other.types()) == 1 and len(watching.types()) == 3 and len(customer.types()) == 1)
+            await asyncio.sleep(0.1)  # 잘못 전달된 이벤트가 늦게 오는 경우까지 기다린다.
+
+            # 세션 본문은 그 세션을 구독한 소켓에만, 미리보기는 bucket 구독자에게만 간다.
+            assert watching.types() == ["new_message", "chat_preview", "status_changed"]
+            assert other.types() == ["status_changed"]
+            # 사용자 이벤트는 그 사용자에게만, 관리자 이벤트는 고객에게 가지 않는다.
+            assert customer.types() == ["agent_connected"]
+            assert bystander.types() == []
+            # 보낸 노드의 구독자도 (버스를 거치지 않고) 한 번씩만 받는다.
+            assert sender.types() == ["new_message", "status_changed"]
+            assert b._bus is not None and b._bus.stats()["received"] == 4
+
+            await _close(a, sender)
+            await _close(b, watching, other, customer, bystander)
+
+    asyncio.run(scenario())
+
+
+def test_inprocess_bus_stays_on_its_own_node(monkeypatch: pytest.MonkeyPatch, tmp_path: Any) -> None:
+    async def scenario() -> None:
+        async with _nodes("inprocess", monkeypatch, tmp_path) as (a, b):
+            local = await _connect(a, "admin-a", "admin", session_topic("s-1"))
+            unrelated = await _connect(a, "admin-c", "admin", session_topic("s-2"))
+            remote = await _connect(b, "admin-b", "admin", session_topic("s-1"))
+
+            await a.publish([session_topic("s-1")], {"type": "session_updated", "data": {}})
+
+            await _wait_until(lambda: bool(local.types()))
+            await asyncio.sleep(0.05)
+            assert local.types() == ["session_updated"]
+            assert unrelated.types() == []
+            assert remote.types() == []
+
+            await _close(a, local, unrelated)
+            await _close(b, remote)
+
+    asyncio.run(scenario())
+
+
+def test_transient_events_stay_out_of_replay_buffer(monkeypatch: pytest.MonkeyPatch, tmp_path: Any) -> None:
+    async def scenario() -> None:
+        async with _nodes("inprocess", monkeypatch, tmp_path) as (node, _):
+            customer = await _connect(node, "customer-1", "customer")
+            hello = customer.received[0]["data"]
+            await _close(node, customer)
+
+            # 스트리밍 응답 하나(버퍼보다 많은 조각)와 그 최종 메시지
+            for i in range(600):
+                await node.send_to_user("customer-1", {"type": "ai_message_delta", "data": {"delta": str(i)}}, transient=True)
+            await node.send_to_user("customer-1", {"type": "new_message", "data": {}})
+
+            resumed = FakeWebSocket()
+            await node.connect(resumed, user_id="customer-1", role="customer", resume_from=hello["seq"], epoch=hello["epoch"], conn_token=hello["conn"])  # type: ignore[arg-type]
+            await _wait_until(lambda: len(resumed.received) == 2)
+            assert resumed.received[0]["type"] == "ws_hello" and resumed.received[0]["data"]["replayed"] == 1
+            assert resumed.received[1]["type"] == "new_message" and resumed.received[1]["seq"] == hello["seq"] + 1
+
+            await node.send_to_user("customer-1", {"type": "ai_message_delta", "data": {"delta": "x"}}, transient=True)
+            await _wait_until(lambda: len(resumed.received) == 3)
+            assert "seq" not in resumed.received[-1]
+
+            await _close(node, resumed)
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("backend", ["unix", "redis"])
+def test_principal_invalidation_reaches_every_node(backend: str, monkeypatch: pytest.MonkeyPatch, tmp_path: Any) -> None:
+    # scripts/create_user.py처럼 서버 밖에서 보낸 무효화 알림을 모든 노드가 처리한다(소켓에는 보내지 않는다).
+    async def scenario() -> None:
+        evicted: list[tuple[str, tuple[str, ...]]] = []
+        async with _nodes(backend, monkeypatch, tmp_path) as nodes:
+            sockets = []
+            for name, node in zip(("a", "b"), nodes):
+                node.on_control(auth.PRINCIPAL_INVALIDATE_KIND, lambda targets, name=name: evicted.append((name, targets)))
+                sockets.append(await _connect(node, "user-1", "customer"))
+
+            stats = await publish_from_outside(auth.PRINCIPAL_INVALIDATE_KIND, ("user-1",))
+            assert stats is not None and stats["send_errors"] == 0
+
+            await _wait_until(lambda: len(evicted) == 2)
+            assert sorted(evicted) == [("a", ("user-1",)), ("b", ("user-1",))]
+            assert all(ws.types() == [] for ws in sockets)
+
+            for node, ws in zip(nodes, sockets):
+                await _close(node, ws)
+
+    asyncio.run(scenario())
+
+
+def test_invalidate_users_drops_cached_principals(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(auth, "_principals", None)
+    cache = auth._principal_cache()
+    for user_id in ("u-1", "u-2"):
+        cache.set(user_id, UserOut(id=user_id, email=f"{user_id}@example.com", name=user_id, role="customer"))
+
+    auth.invalidate_users(("u-1",))
+    assert cache.get("u-1") is None and cache.get("u-2") is not None
+    auth.invalidate_users(())
+    assert cache.get("u-2") is None
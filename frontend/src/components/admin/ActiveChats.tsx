@@ -273,22 +273,25 @@ export function ActiveChats({ user }: { user: AppUser }) {
   const onWsMessage = useCallback((payload: any) => {
     if (!payload?.type) return;
 
-    if (payload.type === 'new_message' && payload.data?.message) {
-      const sessionId = payload.data.session_id || payload.data.message.session_id;
-      const msg = payload.data.message as ApiMessage;
+    if (payload.type === 'chat_preview' && payload.data?.session_id) {
+      // 목록 갱신용 미리보기(active 목록 구독 시 모든 세션에 대해 도착)
+      const { session_id: sessionId, last_message: lastMessage, last_message_at: lastMessageAt } = payload.data;
       ensureChatVisible(sessionId);
-
       setChats((prev) =>
         prev.map((c) =>
           c.id === sessionId
             ? {
                 ...c,
-                last_message: msg.content,
-                timestamp: msg.created_at || c.timestamp,
+                last_message: lastMessage ?? c.last_message,
+                timestamp: lastMessageAt || c.timestamp,
               }
             : c
         )
       );
+    } else if (payload.type === 'new_message' && payload.data?.message) {
+      // 메시지 본문은 subscribe_session으로 연 세션에 대해서만 도착한다.
+      const sessionId = payload.data.session_id || payload.data.message.session_id;
+      const msg = payload.data.message as ApiMessage;
 
       if (selectedChat?.id === sessionId) {
         setMessages((prev) => {
@@ -335,13 +338,33 @@ export function ActiveChats({ user }: { user: AppUser }) {
     scrollToBottom();
   }, [messages, scrollToBottom]);
 
-  useWebSocket(onWsMessage, {
+  const selectedChatIdRef = useRef<string | null>(null);
+  const { sendJson } = useWebSocket(onWsMessage, {
     enabled: true,
     onOpen: (ws) => {
       ws.send(JSON.stringify({ type: 'subscribe_chats', data: { chat_type: 'active' } }));
+      // 재연결 시 열어 둔 상담을 다시 구독
+      if (selectedChatIdRef.current) {
+        ws.send(JSON.stringify({ type: 'subscribe_session', data: { session_id: selectedChatIdRef.current } }));
+      }
+    },
+    onResync: () => {
+      void fetchChats();
+      if (selectedChatIdRef.current) void fetchMessages(selectedChatIdRef.current);
     },
   });
 
+  const selectedChatId = selectedChat?.id ?? null;
+  useEffect(() => {
+    selectedChatIdRef.current = selectedChatId;
+    if (!selectedChatId) return;
+    sendJson({ type: 'subscribe_session', data: { session_id: selectedChatId } });
+    return () => {
+      sendJson({ type: 'unsubscribe', data: { session_id: selectedChatId } });
+    };
+    // sendJson은 렌더마다 새로 만들어지지만 같은 소켓을 쓰므로 의존성에서 뺀다.
+  }, [selectedChatId]);
+
   return (
     <div className="h-full flex overflow-hidden">
       {/* Chat list */}
@@ -1,6 +1,7 @@
 import { useCallback, useEffect, useMemo, useState } from 'react';
 import { Search, Calendar, Download, Paperclip } from 'lucide-react';
 import { apiCall } from '../../utils/api';
+import { useWebSocket } from '../../hooks/useWebSocket';
 import { API_BASE_URL } from '../../config';
 
 interface CompletedChat {
@@ -47,6 +48,8 @@ export function CompletedChats() {
   const [searchQuery, setSearchQuery] = useState('');
   const [dateRange, setDateRange] = useState<string>('all');
   const [loadingChats, setLoadingChats] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loadingMessages, setLoadingMessages] = useState(false);
   const formatFileSize = (size?: number) => {
     if (size == null) return '';
@@ -96,26 +99,52 @@ export function CompletedChats() {
   const buildFileUrl = (url?: string) =>
     url && url.startsWith('http') ? url : `${apiOrigin}${url || ''}`;
 
+  const completedChatsPath = useCallback(
+    (cursor?: string | null) =>
+      `/api/admin/chats/completed?category=${encodeURIComponent(
+        filterCategory
+      )}&handler=${encodeURIComponent(filterHandler)}&dateRange=${encodeURIComponent(
+        dateRange
+      )}&search=${encodeURIComponent(searchQuery)}${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}`,
+    [dateRange, filterCategory, filterHandler, searchQuery]
+  );
+
   const fetchCompletedChats = useCallback(async () => {
     try {
       setLoadingChats(true);
-      const res = await apiCall<{ chats: CompletedChat[] }>(
-        `/api/admin/chats/completed?category=${encodeURIComponent(
-          filterCategory
-        )}&handler=${encodeURIComponent(filterHandler)}&dateRange=${encodeURIComponent(
-          dateRange
-        )}&search=${encodeURIComponent(searchQuery)}`
-      );
+      const res = await apiCall<{ chats: CompletedChat[]; next_cursor?: string | null }>(completedChatsPath());
       setChats(res.data?.chats || []);
+      setNextCursor(res.data?.next_cursor || null);
     } finally {
       setLoadingChats(false);
     }
-  }, [dateRange, filterCategory, filterHandler, searchQuery]);
+  }, [completedChatsPath]);
+
+  const fetchMoreCompletedChats = useCallback(async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const res = await apiCall<{ chats: CompletedChat[]; next_cursor?: string | null }>(completedChatsPath(nextCursor));
+      const more = res.data?.chats || [];
+      setChats((prev) => [...prev, ...more.filter((c) => !prev.some((p) => p.id === c.id))]);
+      setNextCursor(res.data?.next_cursor || null);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [completedChatsPath, nextCursor]);
 
   useEffect(() => {
     void fetchCompletedChats();
   }, [fetchCompletedChats]);
 
+  // 종료 요약은 백그라운드에서 생성되어 summary_updated로 도착한다.
+  useWebSocket((payload: any) => {
+    if (payload?.type !== 'summary_updated' || payload.data?.kind !== 'completed') return;
+    const { session_id: sessionId, summary } = payload.data;
+    setChats((prev) => prev.map((c) => (c.id === sessionId ? { ...c, summary } : c)));
+    setSelectedChat((prev) => (prev && prev.id === sessionId ? { ...prev, summary } : prev));
+  }, { onResync: () => void fetchCompletedChats() });
+
   const filteredChats = useMemo(() => chats, [chats]);
 
   const mapApiMessage = useCallback((m: ApiMessage): ChatMessage => {
@@ -266,6 +295,15 @@ export function CompletedChats() {
               </button>
             ))
           )}
+          {!loadingChats && nextCursor && (
+            <button
+              onClick={() => void fetchMoreCompletedChats()}
+              disabled={loadingMore}
+              className="w-full p-3 text-center text-blue-600 hover:bg-gray-50 disabled:text-gray-400"
+            >
+              {loadingMore ? '불러오는 중...' : '더 보기'}
+            </button>
+          )}
         </div>
       </div>
 
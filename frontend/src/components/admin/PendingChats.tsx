@@ -102,6 +102,11 @@ export function PendingChats({ user, onSwitchToActive }: { user: AppUser; onSwit
       if (!payload?.type) return;
       if (payload.type === 'new_chat_session') {
         void fetchPendingChats();
+      } else if (payload.type === 'summary_updated' && payload.data?.kind === 'pending') {
+        // 처리 대기 요약은 백그라운드에서 생성되어 나중에 도착한다.
+        const { session_id: sessionId, summary } = payload.data;
+        setChats((prev) => prev.map((c) => (c.id === sessionId ? { ...c, issue: summary } : c)));
+        setSelectedChat((prev) => (prev && prev.id === sessionId ? { ...prev, issue: summary } : prev));
       } else if (payload.type === 'session_status_changed') {
         const status = payload.data?.status;
         if (status !== 'pending') {
@@ -118,6 +123,7 @@ export function PendingChats({ user, onSwitchToActive }: { user: AppUser; onSwit
       onOpen: (ws) => {
         ws.send(JSON.stringify({ type: 'subscribe_chats', data: { chat_type: 'pending' } }));
       },
+      onResync: () => void fetchPendingChats(),
     }
   );
 
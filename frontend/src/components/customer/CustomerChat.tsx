@@ -93,6 +93,22 @@ export function CustomerChat({ user, onLogout }: CustomerChatProps) {
     });
   }, [sortMessages]);
 
+  // 같은 id가 있으면 교체한다(스트리밍 초안 -> 저장된 최종 메시지).
+  const upsertMessage = useCallback((m: Message) => {
+    setMessages((prev) => sortMessages([...prev.filter((x) => x.id !== m.id), m]));
+  }, [sortMessages]);
+
+  const appendDelta = useCallback((id: string, delta: string, reset: boolean) => {
+    setMessages((prev) => {
+      const existing = prev.find((x) => x.id === id);
+      if (!existing) {
+        return sortMessages([...prev, { id, sender: 'ai', content: delta, timestamp: new Date() }]);
+      }
+      const content = reset ? delta : existing.content + delta;
+      return prev.map((x) => (x.id === id ? { ...x, content } : x));
+    });
+  }, [sortMessages]);
+
   const mapApiMessage = useCallback((m: ApiMessage): Message => {
     return {
       id: m.id,
@@ -149,23 +165,35 @@ export function CustomerChat({ user, onLogout }: CustomerChatProps) {
       if (!payload?.type) return;
 
       if (payload.type === 'new_message' && payload.data?.message) {
-        addMessage(mapApiMessage(payload.data.message as ApiMessage));
+        upsertMessage(mapApiMessage(payload.data.message as ApiMessage));
+      } else if (payload.type === 'ai_message_delta' && payload.data?.message_id) {
+        appendDelta(payload.data.message_id, payload.data.delta || '', Boolean(payload.data.reset));
+      } else if (payload.type === 'ai_message_discarded' && payload.data?.message_id) {
+        setMessages((prev) => prev.filter((x) => x.id !== payload.data.message_id));
       } else if (payload.type === 'session_completed') {
         const msg = payload.data?.message || '상담이 완료되었습니다.';
         setChatEnded(true);
         setLogoutCountdown(10);
-        addMessage({
-          id: `system-${Date.now()}`,
+        upsertMessage({
+          id: payload.data?.message_id || `system-${Date.now()}`,
           sender: 'ai',
           content: msg,
           timestamp: new Date(),
         });
       }
     },
-    [addMessage, mapApiMessage]
+    [appendDelta, mapApiMessage, upsertMessage]
   );
 
-  useWebSocket(onWsMessage, { enabled: true });
+  const resyncMessages = useCallback(async () => {
+    if (!sessionId) return;
+    const res = await apiCall<{ messages: ApiMessage[] }>(
+      `/api/chats/messages/${encodeURIComponent(sessionId)}`
+    );
+    if (res.data) setMessages(sortMessages(res.data.messages.map(mapApiMessage)));
+  }, [mapApiMessage, sessionId, sortMessages]);
+
+  useWebSocket(onWsMessage, { enabled: true, onResync: () => void resyncMessages() });
 
   const handleSend = async (content: string, attachments?: Attachment[]) => {
     if (!sessionId || !content.trim() || chatEnded) return;
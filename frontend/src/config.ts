@@ -7,8 +7,10 @@ function defaultWsBaseUrl(): string {
 
 export const WS_BASE_URL = import.meta.env.VITE_WS_URL || defaultWsBaseUrl();
 
-export function buildWsUrl(token: string): string {
+export function buildWsUrl(token: string, resume?: { epoch: string; seq: number; conn: string }): string {
   const base = WS_BASE_URL.replace(/\/$/, '');
-  return `${base}/ws?token=${encodeURIComponent(token)}`;
+  const url = `${base}/ws?token=${encodeURIComponent(token)}`;
+  if (!resume) return url;
+  return `${url}&epoch=${encodeURIComponent(resume.epoch)}&resume_from=${resume.seq}&conn=${encodeURIComponent(resume.conn)}`;
 }
 
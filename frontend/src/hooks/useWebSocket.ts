@@ -4,6 +4,8 @@ import { buildWsUrl } from '../config';
 type UseWebSocketOptions = {
   enabled?: boolean;
   onOpen?: (ws: WebSocket) => void;
+  // 재연결했지만 서버가 놓친 이벤트를 다시 보낼 수 없을 때(resync_required). 목록/메시지를 REST로 다시 불러온다.
+  onResync?: () => void;
   reconnectMs?: number;
 };
 
@@ -11,11 +13,14 @@ export function useWebSocket(
   onMessage: (data: any) => void,
   options: UseWebSocketOptions = {}
 ) {
-  const { enabled = true, onOpen, reconnectMs = 3000 } = options;
+  const { enabled = true, onOpen, onResync, reconnectMs = 3000 } = options;
   const wsRef = useRef<WebSocket | null>(null);
   const reconnectTimerRef = useRef<number | null>(null);
   const onMessageRef = useRef(onMessage);
   const onOpenRef = useRef(onOpen);
+  const onResyncRef = useRef(onResync);
+  // 서버 이벤트 스트림(ws_hello의 epoch), 마지막으로 받은 seq, 이 연결의 conn. 재연결 시 resume_from/conn으로 보낸다.
+  const streamRef = useRef<{ epoch: string; seq: number; conn: string } | null>(null);
 
   useEffect(() => {
     onMessageRef.current = onMessage;
@@ -25,6 +30,10 @@ export function useWebSocket(
     onOpenRef.current = onOpen;
   }, [onOpen]);
 
+  useEffect(() => {
+    onResyncRef.current = onResync;
+  }, [onResync]);
+
   useEffect(() => {
     if (!enabled) return;
 
@@ -32,23 +41,44 @@ export function useWebSocket(
       const token = localStorage.getItem('token');
       if (!token) return;
 
-      const ws = new WebSocket(buildWsUrl(token));
+      const ws = new WebSocket(buildWsUrl(token, streamRef.current ?? undefined));
       wsRef.current = ws;
 
       ws.onopen = () => onOpenRef.current?.(ws);
       ws.onmessage = (event) => {
+        let payload: any;
         try {
-          onMessageRef.current(JSON.parse(event.data));
+          payload = JSON.parse(event.data);
         } catch {
-          // ignore
+          return;
+        }
+        if (payload?.type === 'ws_hello') {
+          const { epoch, seq, conn, resumed } = payload.data || {};
+          // resumed면 이어서 오는 재전송 이벤트가 seq를 올린다. conn은 연결마다 새로 받는다.
+          if (!resumed || !streamRef.current) streamRef.current = { epoch, seq: Number(seq) || 0, conn };
+          else streamRef.current = { ...streamRef.current, conn };
+          return;
+        }
+        if (payload?.type === 'resync_required') {
+          const { epoch, seq, conn } = payload.data || {};
+          streamRef.current = { epoch, seq: Number(seq) || 0, conn };
+          onResyncRef.current?.();
+          return;
+        }
+        if (typeof payload?.seq === 'number' && streamRef.current) {
+          if (payload.seq <= streamRef.current.seq) return;
+          streamRef.current = { ...streamRef.current, seq: payload.seq };
         }
+        onMessageRef.current(payload);
       };
       ws.onclose = () => {
         if (!enabled) return;
         if (reconnectTimerRef.current) {
           window.clearTimeout(reconnectTimerRef.current);
         }
-        reconnectTimerRef.current = window.setTimeout(connect, reconnectMs);
+        // 서버 재시작 때 모든 클라이언트가 한꺼번에 붙지 않도록 대기 시간을 흩뜨린다.
+        const delay = reconnectMs * (0.5 + Math.random());
+        reconnectTimerRef.current = window.setTimeout(connect, delay);
       };
     };
 